@@ -1,2 +1,7 @@
 from .database import Database
+from .blobs import BlobStore
+from .messages import MessageStore
+from .sharding import ShardRouter
+from .maintenance import Maintenance
+from .audit import QueryAudit
 from .sixerr import SixerrDB
@@ -0,0 +1,236 @@
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+from .exceptions import *
+from .database import Database
+from .schema import Schema
+
+type Plan = dict[str, Any]
+
+class QueryAudit:
+    """
+    Audits the query plans of the statements generated for the registered classes
+
+    A scratch in-memory database with the audited schema is populated with synthetic rows,
+    then every registered class gets retrieved, stored, updated and deleted on it while its
+    statements are traced. Each traced statement is run trough EXPLAIN QUERY PLAN and any
+    full table SCAN is reported as a finding, as it means a lookup that should be served by
+    an index walks the whole table instead. Only the scans of the unconstrained listing are expected,
+    whatever the text of the statement, as every other operation targets specific rows.
+
+    Object hooks are suspended while auditing, so nothing reaches the real databases.
+    """
+    # Statements worth explaining
+    VERBS: tuple[str, ...] = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+    def __init__(self, schema: Schema, classes: Iterable[type] | None=None, rows: int=256, keys: tuple[str, ...]=('username',), extra: dict[str, Callable[[Database], Any]]={}) -> None:
+        """
+        QueryAudit object constructor
+
+        :param schema: (Schema) Schema of the database to audit
+        :param classes: (Iterable[type] | None) Registered classes to audit, defaults to every subscribed class whose tables are in the schema
+        :param rows: (int) Number of synthetic rows per table, defaults to 256
+        :param keys: (tuple[str, ...]) Non-key columns objects get also retrieved by, defaults to the shard key ('username',)
+        :param extra: (dict[str, Callable[[Database], Any]]) Other statement sources to audit by name, called with the scratch database
+        :raises ValueError: When the value of rows is invalid
+        """
+        # Check rows
+        if (rows <= 0):
+            raise ValueError('Invalid \'rows\' for query audit!')
+        # Set attributes
+        self.__schema: Schema = schema
+        self.__rows: int = rows
+        self.__keys: tuple[str, ...] = keys
+        self.__extra: dict[str, Callable[[Database], Any]] = extra
+        # Audited classes, sorted for stable reports
+        names = {table['name'] for table in schema.tables}
+        self.__classes: tuple[type, ...] = tuple(sorted(
+            (cl for cl in (Database.subscribed if classes is None else classes) if cl.__dict__.get('__db__', {}).get('__table__') in names),
+            key=lambda cl: cl.__qualname__
+        ))
+
+    def run(self) -> list[Plan]:
+        """
+        Audit every statement source
+
+        :returns: (list[Plan]) Plans as dicts with source, operation, query, plan, scans and expected keys
+        :raises ConnectionError: When the scratch database cannot be opened
+        :raises QueryError: When any underlying query operation fails
+        """
+        db = Database(f'file:audit_{id(self)}?mode=memory', self.__schema, uri=True)
+        try:
+            db.init()
+            self.__populate(db)
+            plans = []
+            with self.__suspended():
+                # Generated statements of each class
+                for cl in self.__classes:
+                    for operation, action in self.__operations(db, cl):
+                        plans += self.__audit(db, cl.__qualname__, operation, action)
+                # Other statement sources
+                for name, action in self.__extra.items():
+                    plans += self.__audit(db, name, 'extra', lambda: action(db))
+            return plans
+        finally:
+            db.close()
+
+    @staticmethod
+    def failures(plans: list[Plan]) -> list[Plan]:
+        """
+        Get the plans with unexpected scans
+
+        :param plans: (list[Plan]) Plans returned by :py:meth:`db.QueryAudit.run`
+        :returns: (list[Plan]) Plans of constrained statements that scan a table
+        """
+        return [plan for plan in plans if plan['scans'] and not plan['expected']]
+
+    @staticmethod
+    def report(plans: list[Plan]) -> str:
+        """
+        Get a readable report of audited plans
+
+        :param plans: (list[Plan]) Plans returned by :py:meth:`db.QueryAudit.run`
+        :returns: (str) One block per statement, ending with the count of findings
+        """
+        lines = []
+        for plan in plans:
+            # Mark unexpected scans
+            mark = 'SCAN' if (plan['scans'] and not plan['expected']) else ('scan' if plan['scans'] else 'ok')
+            lines.append(f'[{mark}] {plan['source']}.{plan['operation']}: {plan['query']}')
+            lines += [f'    {detail}' for detail in plan['plan']]
+        lines.append(f'{len(plans)} statements, {len(QueryAudit.failures(plans))} unexpected scans')
+        return '\n'.join(lines)
+
+    def __populate(self, db: Database) -> None:
+        """
+        Fill every table of the scratch database with synthetic rows
+
+        Referencing columns point to the parent rows with the same position, so joins match.
+
+        :param db: (Database) Scratch database to fill
+        """
+        for table in self.__schema.tables:
+            columns = [column['name'] for column in table['columns']]
+            db.query_many(
+                f'INSERT INTO {table['name']} ({','.join(columns)}) VALUES ({','.join(['?']*len(columns))});',
+                ([type(self).__value(column, i) for column in table['columns']] for i in range(1, self.__rows + 1))
+            )
+        # Planner statistics as on a live database
+        db.analyze()
+
+    @staticmethod
+    def __value(column: dict, i: int) -> Any:
+        """
+        Get a synthetic value for a column
+
+        :param column: (dict) Column definition as a dict
+        :param i: (int) Position of the row, starting at 1
+        :returns: (Any) Value unique to the row
+        """
+        match column['type']:
+            case 'INTEGER':
+                return i
+            case 'REAL':
+                return float(i)
+            case 'BLOB':
+                return i.to_bytes(8, 'big')
+            case 'LIST' | 'TUPLE':
+                return [i]
+            case _:
+                return f'{column['name']}_{i}'
+
+    def __operations(self, db: Database, cls: type) -> Iterator[tuple[str, Callable[[], Any]]]:
+        """
+        Get the operations that generate the statements of a class
+
+        :param db: (Database) Scratch database to operate on
+        :param cls: (type) Registered class to operate with
+        :returns: (Iterator[tuple[str, Callable[[], Any]]]) Pairs of operation name and action
+        """
+        # Every stored object, an unconstrained listing
+        yield 'retrieve', lambda: list(db.retrieve(cls))
+        # Nothing to operate with if the synthetic rows do not join
+        if not (obj := next(db.retrieve(cls), None)):
+            return
+        # Columns as mapped trough the whole mro
+        fmap = {}
+        for cl in cls.__mro__[::-1]:
+            if (cl in Database.subscribed) and getattr(cl, '__db__', None):
+                fmap |= cl.__db__['__map__']
+        # Lookups by key columns
+        for column, attr in fmap.items():
+            if (column in self.__keys) or any(column in (self.__schema.get_pkeys(cl.__db__['__table__']) or ()) for cl in cls.__mro__ if cl.__dict__.get('__db__')):
+                yield f'retrieve[{column}]', lambda column=column, attr=attr: list(db.retrieve(cls, {column: getattr(obj, attr)}))
+        # Existing object, updated
+        yield 'store[update]', lambda: db.store(obj)
+        # New object, inserted and then deleted
+        new = cls.__new__(cls)
+        for attr, value in Database.fields(obj).items():
+            Database.assign(new, attr, f'{value}_new' if (attr in fmap.values()) and isinstance(value, str) else value) # Bypass __setattr__
+        yield 'store[insert]', lambda: db.store(new)
+        yield 'delete', lambda: db.delete(new)
+
+    def __audit(self, db: Database, source: str, operation: str, action: Callable[[], Any]) -> list[Plan]:
+        """
+        Trace the statements of an action and explain them
+
+        :param db: (Database) Scratch database the action operates on
+        :param source: (str) Name of the class or source of the action
+        :param operation: (str) Name of the operation
+        :param action: (Callable[[], Any]) Function that executes the statements
+        :returns: (list[Plan]) Plans of the distinct statements traced
+        """
+        traced: dict[str, None] = {} # Ordered set
+        def _trace(query: str) -> None:
+            # Catalog lookups and transaction control are not generated statements
+            if query.lstrip().upper().startswith(type(self).VERBS) and not ('sqlite_master' in query):
+                traced.setdefault(' '.join(query.split()))
+        db.trace(_trace)
+        try:
+            action()
+        finally:
+            db.trace(None)
+        plans = []
+        for query in traced:
+            plan = db.explain(query)
+            plans.append({
+                'source': source,
+                'operation': operation,
+                'query': query,
+                'plan': plan,
+                # Parameter lists walked trough json_each are not tables
+                'scans': tuple(detail for detail in plan if detail.startswith('SCAN') and ('VIRTUAL TABLE' not in detail)),
+                # Only the unconstrained listing has to scan
+                'expected': (operation == 'retrieve')
+            })
+        return plans
+
+    @contextmanager
+    def __suspended(self) -> Iterator[None]:
+        """
+        Suspend the init and store hooks of the audited classes while in context
+        """
+        # Every registered class in the audited hierarchies
+        classes = {cl for cls in self.__classes for cl in cls.__mro__ if cl.__dict__.get('__db__')}
+        hooks = {cl: (cl.__db__['__init__'], cl.__db__['__store__']) for cl in classes}
+        try:
+            for cl in classes:
+                cl.__db__['__init__'] = cl.__db__['__store__'] = None
+            yield
+        finally:
+            # Restore hooks
+            for cl, (init, store) in hooks.items():
+                cl.__db__['__init__'], cl.__db__['__store__'] = init, store
+
+if __name__ == '__main__':
+    # Register every model
+    import user, post
+    from types import SimpleNamespace
+    from .sixerr import SixerrDB
+    schema = SixerrDB().schema
+    plans = QueryAudit(schema, extra={
+        'SixerrDB.get_user': lambda db: SixerrDB.get_user(db, SimpleNamespace(_username='username_1')),
+        'SixerrDB.get_usernames': lambda db: SixerrDB.get_usernames(db, (1, 2, 3)),
+    }).run()
+    print(QueryAudit.report(plans))
+    # Usable as a regression check
+    raise SystemExit(1 if QueryAudit.failures(plans) else 0)
@@ -0,0 +1,280 @@
+import sqlite3 as sql
+from hashlib import sha256
+from io import BytesIO
+import json
+from os import PathLike, fstat
+from typing import BinaryIO, Iterator
+from .exceptions import *
+
+type Source = bytes | bytearray | memoryview | BinaryIO | str | PathLike[str]
+
+class BlobStore:
+    """
+    Manages content-addressed binary data stored out of row in a database table
+
+    Contents are written and read in chunks trough SQLite incremental BLOB I/O,
+    so they never need to be held in memory as a whole. Rows of other tables
+    only keep the hex digest of the content as a reference to it.
+
+    Table format: {
+        'name': str,
+        'columns': (
+            {'name': 'id', 'type': 'INTEGER', 'mods': ('PRIMARY KEY',)},
+            {'name': 'digest', 'type': 'TEXT', 'mods': ('UNIQUE',)},
+            {'name': 'size', 'type': 'INTEGER', 'mods': ('NOT NULL',)},
+            {'name': 'data', 'type': 'BLOB', 'mods': ('NOT NULL',)}
+        )
+    }
+    """
+    def __init__(self, db: 'Database', table: str, refs: tuple[tuple[str, str], ...]=(), chunk: int=64*1024) -> None:
+        """
+        BlobStore object constructor
+
+        :param db: (Database) Database object whose table stores the contents
+        :param table: (str) Name of the table that stores the contents
+        :param refs: (tuple[tuple[str, str], ...]) Tuple of (table, column) pairs that hold references to the contents
+        :param chunk: (int) Size in bytes of the chunks used for incremental I/O, defaults to 64KiB
+        :raises ValueError: When the value of chunk is invalid
+        """
+        # Check chunk
+        if (chunk <= 0):
+            raise ValueError('Invalid \'chunk\' for blob store!')
+        # Set attributes
+        self.__db: 'Database' = db
+        self.__table: str = table
+        self.__refs: tuple[tuple[str, str], ...] = refs
+        self.__chunk: int = chunk
+        # Highest row id when the previous collection ended, newer contents are never collected
+        self.__watermark: int = 0
+
+    def __contains__(self, digest: str) -> bool:
+        """
+        Check if the store has a content
+
+        :param digest: (str) Digest of the content to check for
+        :returns: (bool) Whether the store has the content or not
+        :raises ConnectionError: When trying to query the database with no open connection
+        :raises QueryError: When the underlying query operation fails
+        """
+        return self.__rowid(digest) is not None
+
+    @property
+    def table(self) -> str:
+        """
+        Get the table that stores the contents
+
+        :returns: (str) The table name
+        """
+        return self.__table
+
+    def put(self, src: Source, size: int | None=None) -> str:
+        """
+        Store a content in the store
+
+        The content is streamed into a preallocated blob while its digest is computed.
+        If an equal content was already stored the old copy is discarded, so the content
+        counts as new and is not collected before the rows referencing it get stored.
+
+        :param src: (Source) Bytes, readable binary file object or path of the file to store
+        :param size: (int | None) Number of bytes to read from a file object, defaults to reading until its end
+        :returns: (str) The digest referencing the stored content
+        :raises ValueError: When the source provides less bytes than expected
+        :raises ConnectionError: When trying to store on the database with no open connection
+        :raises QueryError: When any underlying query or blob operation fails
+        """
+        # Path sources are opened and closed here
+        if isinstance(src, (str, PathLike)):
+            with open(src, 'rb') as file:
+                return self.put(file, fstat(file.fileno()).st_size if size is None else size)
+        # In memory sources are read as files
+        if isinstance(src, (bytes, bytearray, memoryview)):
+            src = BytesIO(src)
+        # Size until end of file
+        if size is None:
+            if src.seekable():
+                # Measure remaining bytes and rewind
+                pos = src.tell()
+                size = src.seek(0, 2) - pos
+                src.seek(pos)
+            else:
+                # Not seekable, spool it (last resort)
+                src = BytesIO(src.read())
+                size = len(src.getbuffer())
+        # Preallocate row with an empty blob, its id above the collection watermark
+        rowid = self.__db.query(
+            f'INSERT INTO {self.__table} (id, digest, size, data) VALUES (max(?, (SELECT coalesce(max(id), 0) FROM {self.__table})) + 1, NULL, ?, zeroblob(?));',
+            (self.__watermark, size, size)
+        ).lastrowid
+        try:
+            # Running digest and reusable buffer
+            hx, buffer = sha256(), memoryview(bytearray(self.__chunk))
+            # Stream content into the blob
+            with self.__db.blob(self.__table, 'data', rowid, readonly=False) as blob:
+                written = 0
+                while (written < size):
+                    n = src.readinto(buffer[:min(self.__chunk, size - written)])
+                    # Source exhausted before expected
+                    if not n:
+                        raise ValueError(f'Blob source ended after {written} of {size} bytes!')
+                    blob.write(buffer[:n])
+                    hx.update(buffer[:n])
+                    written += n
+            digest = hx.hexdigest()
+            # Deduplicate equal contents, keeping the newest copy
+            with self.__db.transaction():
+                self.__db.query(f'DELETE FROM {self.__table} WHERE digest=?;', (digest,))
+                self.__db.query(f'UPDATE {self.__table} SET digest=? WHERE id=?;', (digest, rowid))
+            return digest
+        except BaseException:
+            # Never leave half-written rows behind
+            self.__db.query(f'DELETE FROM {self.__table} WHERE id=?;', (rowid,))
+            raise
+
+    def open(self, digest: str) -> sql.Blob:
+        """
+        Open a stored content for reading
+
+        The returned blob is a file-like object and a context manager.
+
+        :param digest: (str) Digest of the content to open
+        :returns: (sql.Blob) Readonly blob handle for the content
+        :raises KeyError: When the content is not found in the store
+        :raises ConnectionError: When trying to open a blob with no open connection
+        :raises QueryError: When any underlying query or blob operation fails
+        """
+        if (rowid := self.__rowid(digest)) is None:
+            raise KeyError(f'Content \'{digest}\' not found in blob store!')
+        return self.__db.blob(self.__table, 'data', rowid)
+
+    def read(self, digest: str) -> Iterator[bytes]:
+        """
+        Read a stored content in chunks
+
+        :param digest: (str) Digest of the content to read
+        :returns: (Iterator[bytes]) Iterator over the chunks of the content
+        :raises KeyError: When the content is not found in the store
+        :raises ConnectionError: When trying to open a blob with no open connection
+        :raises QueryError: When any underlying query or blob operation fails
+        """
+        with self.open(digest) as blob:
+            while (chunk := blob.read(self.__chunk)):
+                yield chunk
+
+    def export(self, digest: str, dst: BinaryIO | str | PathLike[str]) -> int:
+        """
+        Write a stored content to a file
+
+        :param digest: (str) Digest of the content to write
+        :param dst: (BinaryIO | str | PathLike[str]) Writable binary file object or path of the file to write to
+        :returns: (int) Number of bytes written
+        :raises KeyError: When the content is not found in the store
+        :raises ConnectionError: When trying to open a blob with no open connection
+        :raises QueryError: When any underlying query or blob operation fails
+        """
+        # Path targets are opened and closed here
+        if isinstance(dst, (str, PathLike)):
+            with open(dst, 'wb') as file:
+                return self.export(digest, file)
+        written = 0
+        # Stream content into the file
+        for chunk in self.read(digest):
+            written += dst.write(chunk)
+        return written
+
+    def size(self, digest: str) -> int | None:
+        """
+        Get the size of a stored content without reading it
+
+        :param digest: (str) Digest of the content to get the size for
+        :returns: (int | None) Size in bytes of the content or None if not found
+        :raises ConnectionError: When trying to query the database with no open connection
+        :raises QueryError: When the underlying query operation fails
+        """
+        row = self.__db.query(f'SELECT size FROM {self.__table} WHERE digest=?;', (digest,)).fetchone()
+        return row['size'] if row else None
+
+    def delete(self, digest: str) -> None:
+        """
+        Delete a stored content
+
+        If the content is not found in the store the operation fails silently.
+        Contents may be shared, prefer :py:meth:`db.BlobStore.collect` unless sure it is unreferenced.
+
+        :param digest: (str) Digest of the content to delete
+        :raises ConnectionError: When trying to query the database with no open connection
+        :raises QueryError: When the underlying query operation fails
+        """
+        self.__db.query(f'DELETE FROM {self.__table} WHERE digest=?;', (digest,))
+
+    def collect(self) -> int:
+        """
+        Delete every stored content which is no longer referenced
+
+        Only contents stored before the previous collection are deleted, newer ones may be
+        referenced by rows still being stored, so the first collection deletes nothing.
+        When the database is sharded the references kept in every shard are taken into account.
+
+        :returns: (int) Number of contents deleted
+        :raises ConnectionError: When trying to query the database with no open connection
+        :raises QueryError: When the underlying query operation fails
+        """
+        # Union of referencing columns
+        refs = ' UNION '.join([f'SELECT {column} FROM {table} WHERE {column} IS NOT NULL' for table, column in self.__refs])
+        if not refs:
+            n = self.__db.query(f'DELETE FROM {self.__table} WHERE id<=? AND digest IS NULL;', (self.__watermark,)).rowcount
+        # Shard references are gathered first, then passed as a single JSON array
+        elif self.__db.router:
+            digests = {row[0] for db in self.__dbs() for row in db.query(f'{refs};').fetchall()}
+            n = self.__db.query(
+                f'DELETE FROM {self.__table} WHERE id<=? AND (digest IS NULL OR digest NOT IN (SELECT value FROM json_each(?)));', (self.__watermark, json.dumps(sorted(digests)))
+            ).rowcount
+        else:
+            n = self.__db.query(
+                f'DELETE FROM {self.__table} WHERE id<=? AND (digest IS NULL OR digest NOT IN ({refs}));', (self.__watermark,)
+            ).rowcount
+        # Contents stored from now on get ids above it
+        self.__watermark = self.__db.query(f'SELECT coalesce(max(id), 0) FROM {self.__table};').fetchone()[0]
+        return n
+
+    def adopt(self) -> int:
+        """
+        Move the contents kept inline in the referencing columns into the store
+
+        Databases created before the store kept their contents as BLOBs in the referencing columns.
+        Each one is stored and replaced with its digest, one row at a time. Rows already holding a digest
+        are left untouched, so it can be called again, like after an interrupted run.
+        When the database is sharded the referencing columns of every shard are adopted.
+
+        :returns: (int) Number of contents adopted
+        :raises ConnectionError: When trying to query the database with no open connection
+        :raises QueryError: When any underlying query or blob operation fails
+        """
+        n = 0
+        # Loop trough databases and referencing columns
+        for db in self.__dbs():
+            for table, column in self.__refs:
+                rowids = [row[0] for row in db.query(f'SELECT rowid FROM {table} WHERE typeof({column})=\'blob\';').fetchall()]
+                for rowid in rowids:
+                    # Read each content on its own, never all at once
+                    content = db.query(f'SELECT {column} FROM {table} WHERE rowid=?;', (rowid,)).fetchone()[0]
+                    db.query(f'UPDATE {table} SET {column}=? WHERE rowid=?;', (self.put(content), rowid))
+                    n += 1
+        return n
+
+    def __dbs(self) -> tuple['Database', ...]:
+        """
+        Get the databases holding the referencing columns
+
+        :returns: (tuple[Database, ...]) The database and its shards, if sharded
+        """
+        return (self.__db, *self.__db.router) if self.__db.router else (self.__db,)
+
+    def __rowid(self, digest: str) -> int | None:
+        """
+        Get the row id of a stored content
+
+        :param digest: (str) Digest of the content to get the row id for
+        :returns: (int | None) Row id of the content or None if not found
+        """
+        row = self.__db.query(f'SELECT id FROM {self.__table} WHERE digest=?;', (digest,)).fetchone()
+        return row['id'] if row else None
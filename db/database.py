@@ -1,13 +1,22 @@
 import sqlite3 as sql
-from os import PathLike
+import json
+from os import PathLike, getpid
 from os.path import abspath, isdir
+from time import monotonic
 from tkinter.constants import SEPARATOR
-from typing import Self, Type, Callable, Iterator
+from typing import Self, Type, Callable, Iterator, TYPE_CHECKING
+from contextlib import contextmanager
+from threading import RLock
 
-from utils.decorators import dec_wparams, readonly, memoize
+from utils.decorators import dec_wparams, readonly, memoize, timed
+from utils.crypto import XAE, cipher, fingerprint
 from .schema import Schema
 from .exceptions import *
 import builtins
+from types import MemberDescriptorType
+
+if TYPE_CHECKING:
+    from .sharding import ShardRouter
 
 class Adapters:
     SEPARATOR = '¨'
@@ -49,14 +58,132 @@ sql.register_converter("TUPLE", Adapters.to_tuple)
 
 type Path = str | bytes | PathLike[str] | PathLike[bytes]
 
-@readonly(attrs={'__id', '__schema', '__path', '__uri'})
+
+class Sealed:
+    """
+    Ciphertext of an encrypted column, as set on retrieved objects until first read
+    """
+    __slots__ = ('data', 'cipher')
+
+    def __init__(self, data: bytes, cipher: XAE) -> None:
+        """
+        Sealed object constructor
+
+        :param data: (bytes) Ciphertext stored in the column
+        :param cipher: (XAE) Cipher context able to decrypt it
+        """
+        self.data: bytes = data
+        self.cipher: XAE = cipher
+
+    def open(self) -> str:
+        """
+        Decrypt the ciphertext
+
+        :returns: (str) The plaintext
+        """
+        return self.cipher.decrypt(self.data).decode()
+
+
+class Encrypted:
+    """
+    Attribute descriptor of an encrypted column, installed by :py:deco:`db.Database.register`
+
+    Retrieved objects hold the ciphertext of the column, which gets decrypted the first time
+    the attribute is read and replaced with its plaintext, so objects never reading it never decrypt it.
+    Works with both __dict__ and __slots__ backed attributes.
+    """
+    def __init__(self, attr: str, slot: MemberDescriptorType | None=None) -> None:
+        """
+        Encrypted object constructor
+
+        :param attr: (str) Name of the attribute
+        :param slot: (MemberDescriptorType | None) Descriptor of the slot the value is kept in, defaults to the instance dict
+        """
+        self.__attr: str = attr
+        self.__slot: MemberDescriptorType | None = slot
+
+    def __get__(self, obj: Any, cls: type | None=None) -> Any:
+        """
+        Get the plaintext of the attribute, decrypting and caching it if still sealed
+
+        :param obj: (Any) Instance to get the attribute of, None when accessed on the class
+        :param cls: (type | None) Class of the instance
+        :returns: (Any) The plaintext, or the descriptor when accessed on the class
+        :raises AttributeError: When the attribute is not set
+        """
+        if obj is None:
+            return self
+        value = self.raw(obj)
+        # Decrypt once, then keep the plaintext
+        if isinstance(value, Sealed):
+            value = value.open()
+            self.set(obj, value)
+        return value
+
+    def __set__(self, obj: Any, value: Any) -> None:
+        """
+        Set the attribute
+
+        :param obj: (Any) Instance to set the attribute of
+        :param value: (Any) Plaintext or sealed value
+        """
+        self.set(obj, value)
+
+    def __delete__(self, obj: Any) -> None:
+        """
+        Delete the attribute
+
+        :param obj: (Any) Instance to delete the attribute of
+        :raises AttributeError: When the attribute is not set
+        """
+        if self.__slot:
+            self.__slot.__delete__(obj)
+        elif obj.__dict__.pop(self.__attr, self) is self:
+            raise AttributeError(self.__attr)
+
+    def raw(self, obj: Any) -> Any:
+        """
+        Get the attribute as kept in the instance, without decrypting it
+
+        :param obj: (Any) Instance to get the attribute of
+        :returns: (Any) The plaintext or sealed value
+        :raises AttributeError: When the attribute is not set
+        """
+        if self.__slot:
+            return self.__slot.__get__(obj, type(obj))
+        try:
+            return obj.__dict__[self.__attr]
+        except KeyError:
+            raise AttributeError(self.__attr) from None
+
+    def set(self, obj: Any, value: Any) -> None:
+        """
+        Set the attribute as kept in the instance, bypassing __setattr__
+
+        :param obj: (Any) Instance to set the attribute of
+        :param value: (Any) Plaintext or sealed value
+        """
+        if self.__slot:
+            self.__slot.__set__(obj, value)
+        else:
+            obj.__dict__[self.__attr] = value
+
+@readonly(attrs={'__id', '__schema', '__path', '__uri', '__router', '__parent', '__key'})
 class Database:
     """
     Manages a SQL database and its schema
     """
     subscribed: set[object, ...] = set()
-
-    def __init__(self, id: str, schema: Schema, path: Path='./', uri: bool=False) -> None:
+    # Ids of the objects running a registered __init__
+    __initializing: set[int] = set()
+    # Connections inherited trough forks, kept referenced so they never get closed by the child
+    __inherited: list[sql.Connection] = []
+    # Attribute setters bypassing __setattr__, by class and attribute
+    __setters: dict[tuple[type, str], Callable[[Any, Any], None]] = {}
+    # Table keeping the fingerprint of the key the encrypted columns are stored with
+    FINGERPRINT: str = 'key_fingerprint'
+
+    def __init__(self, id: str, schema: Schema, path: Path='./', uri: bool=False, router: 'ShardRouter | None'=None, parent: Self | None=None, key: bytes | None=None) -> None:
         """
         Database object constructor
 
@@ -64,7 +191,11 @@ class Database:
         :param schema: (Schema) Schema instance to use for the database
         :param path: (Path) Path to save database file to, defaults to './'
         :param uri: (bool) Whether the database path is a sqlite uri, defaults to False
+        :param router: (ShardRouter | None) Optional router that stores, retrieves and deletes objects across shards instead of this database
+        :param parent: (Self | None) Optional database that gets passed to object hooks instead of this one, set on shards
+        :param key: (bytes | None) Optional XAE key [256bit] encrypting the columns registered as encrypted, which are stored in plaintext without it
         :raises PathError: When the provided path is not an existing directory
+        :raises ValueError: When the key length is invalid
         """
         # If path is not existing dir
         if not isdir(path):
@@ -74,7 +205,21 @@ class Database:
         self.__schema: Schema = schema
         self.__path: Path = abspath(path)
         self.__uri: bool = uri
-        self.__connection: sql.Connection | None = None
+        self.__handle: sql.Connection | None = None
+        self.__pid: int = getpid() # Process the handle belongs to
+        self.__router: 'ShardRouter | None' = router
+        self.__parent: Self | None = parent
+        self.__key: bytes | None = bytes(key) if key else None
+        # Check key, warming its cipher context
+        if self.__key:
+            cipher(self.__key)
+        self.__last: float = monotonic()
+        # Open transaction, held by a single thread at a time
+        self.__tlock: RLock = RLock()
+        self.__depth: int = 0
+        # Create shards
+        if router:
+            router.bind(self)
 
     def __del__(self) -> None:
         """
@@ -94,29 +239,21 @@ class Database:
         :raises QueryError: When the underlying query operation fails
         """
         # If no pkeys assume it does not contain
-        if self.__schema.get_pkeys(self.__schema, tdata[0], allow=tuple(tdata[1].keys())):
+        if self.__schema.get_pkeys(tdata[0], allow=tuple(tdata[1].keys())):
             # Query number of rows with current pkeys values
-            cs = self.query(f'SELECT COUNT(*) AS count FROM {tdata[0]} WHERE {self.__get_target(self, tdata[0], allow=tuple(tdata[1].keys()))};', tdata[1])
+            cs = self.query(f'SELECT COUNT(*) AS count FROM {tdata[0]} WHERE {self.__get_target(tdata[0], allow=tuple(tdata[1].keys()))};', tdata[1])
             # Get row
             row = cs.fetchone()
             # Technically impossible
             if not row:
                 raise QueryError('Something has happened and we don\'t know what')
             #print('\n')
-            #print(f'SELECT COUNT(*) AS count FROM {tdata[0]} WHERE {self.__get_target(self, tdata[0], allow=tuple(tdata[1].keys()))};')
+            #print(f'SELECT COUNT(*) AS count FROM {tdata[0]} WHERE {self.__get_target(tdata[0], allow=tuple(tdata[1].keys()))};')
             #print(tdata, '-->', (row['count'] > 0))
             return (row['count'] > 0) # If count > 0 it has entries
         #print(tdata, '-->', False, 'Ex')
         return False
 
-    def __str__(self) -> str:
-        """
-        Get a string representation of the database
-
-        :returns: (str) String representation of the database
-        """
-        return f'<Database {id(self)}>' # Used for memoize
-
     @property
     def id(self) -> str:
         """
@@ -144,6 +281,33 @@ class Database:
         """
         return self.__path + self.__id + '.db'
 
+    @property
+    def directory(self) -> str:
+        """
+        Get the database directory
+
+        :returns: (str) The absolute path of the directory that holds the database file
+        """
+        return self.__path
+
+    @property
+    def router(self) -> 'ShardRouter | None':
+        """
+        Get the database shard router
+
+        :returns: (ShardRouter | None) The shard router, None if the database is not sharded
+        """
+        return self.__router
+
+    @property
+    def key(self) -> bytes | None:
+        """
+        Get the database encryption key
+
+        :returns: (bytes | None) The key of the encrypted columns, None if they are stored in plaintext
+        """
+        return self.__key
+
     @property
     def uri(self) -> bool:
         """
@@ -153,6 +317,34 @@ class Database:
         """
         return self.__uri
 
+    @property
+    def __connection(self) -> sql.Connection | None:
+        """
+        Get the connection to the database file of the current process
+
+        A connection inherited from the parent process trough a fork is never used,
+        a new one gets opened lazily in its place.
+
+        :returns: (sql.Connection | None) The connection, None if not open
+        :raises ConnectionError: When there is an error when reopening the connection in a forked child
+        """
+        # Inherited trough a fork
+        if (self.__pid != getpid()):
+            reopen = self.__handle is not None
+            self.after_fork()
+            if reopen:
+                self.open()
+        return self.__handle
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Check if the database has an open connection
+
+        :returns: (bool) Whether the connection to the database file is open
+        """
+        return self.__connection is not None
+
     @property
     def is_init(self) -> bool:
         """
@@ -168,6 +360,32 @@ class Database:
         return self.__connection and \
             self.__schema.is_active(self)
 
+    @property
+    def idle(self) -> float:
+        """
+        Get the time the database has been idle
+
+        :returns: (float) Seconds since the last query was made
+        """
+        return monotonic() - self.__last
+
+    @property
+    def free_pages(self) -> int:
+        """
+        Get the number of unused pages in the database file
+
+        :returns: (int) The freelist page count
+        :raises ConnectionError: When the database has no open connection
+        :raises QueryError: When the underlying query operation fails
+        """
+        if not self.__connection:
+            raise ConnectionError('On DB free pages, cannot query empty connection!')
+        try:
+            # Not recorded as activity
+            return self.__connection.execute('PRAGMA freelist_count;').fetchone()[0]
+        except sql.Error as e:
+            raise QueryError(e, 'PRAGMA freelist_count;', ())
+
     @property
     def delta(self) -> int:
         """
@@ -187,6 +405,7 @@ class Database:
 
         Opens the connection to the database file,
         then it drops and applies the database schema.
+        The fingerprint of the key gets stored, if any.
 
         :raises ConnectionError: When schema-operation derived queries act on a db with no connection
         :raises QueryError: When schema-operation derived queries fail
@@ -196,25 +415,76 @@ class Database:
         # Drop and apply schema
         self.__schema.drop(self) # Erases all info in db
         self.__schema.apply(self)
-
-    def sinit(self) -> None:
+        # Initialize shards
+        if self.__router:
+            self.__router.fan_out(lambda db: db.init())
+            self.__router.setup(reset=True)
+        # Forget the key of the dropped data
+        if not self.__parent:
+            self.query(f'DROP TABLE IF EXISTS {type(self).FINGERPRINT};')
+            self.__keycheck()
+
+    def sinit(self) -> tuple[tuple[str, ...], tuple[tuple[str, str], ...]]:
         """
         Initializes the database softly
 
-        Opens the connection to the database file,
-        then it drops and applies the database schema
-        if it is not currently active on the database.
+        Opens the connection to the database file, then it applies the database schema
+        if the database has none of its tables, else it migrates the database to the schema.
+        Data already stored is never dropped.
 
+        The key is checked against the fingerprint of the one the encrypted columns were stored with.
+        When there is none yet it gets stored, and values stored in plaintext get encrypted.
+
+        :returns: (tuple[tuple[str, ...], tuple[tuple[str, str], ...]]) Names of the tables created by a migration and (table, column) pairs of the columns it added
+        :raises SchemaError: When the database cannot be migrated to the schema
+        :raises EncryptionError: When the key is missing or is not the one the encrypted columns were stored with
         :raises ConnectionError: When schema-operation derived queries act on a db with no connection
         :raises QueryError: When schema-operation derived queries fail
         """
         # Open connection
         self.open()
-        # If schema not yet applied
-        if not self.__schema.is_active(self):
-            # Drop and apply schema
-            self.__schema.drop(self) # Erases all info in db
+        # New database, apply schema
+        if self.__schema.is_empty(self):
             self.__schema.apply(self)
+            changes = ((), ())
+        else:
+            # Add what is missing, keeping data
+            changes = self.__schema.migrate(self)
+        # Initialize shards softly
+        if self.__router:
+            self.__router.fan_out(lambda db: db.sinit())
+            self.__router.setup()
+        # Shards get checked by their parent
+        if not self.__parent:
+            self.__keycheck()
+        return changes
+
+    def encrypt(self) -> int:
+        """
+        Encrypts the values stored in plaintext in the encrypted columns
+
+        Meant to be run once, when a database that stored them in plaintext first gets a key, values already
+        encrypted are left untouched. When sharded the shards get encrypted, and their claimed unique values claimed again.
+        Without a key the operation fails silently.
+
+        :returns: (int) Number of values encrypted
+        :raises ConnectionError: When acting on a database with no connection
+        :raises QueryError: When any underlying query operation fails
+        """
+        if not self.__key:
+            return 0
+        xae, n = cipher(self.__key), 0
+        for db in ((self, *self.__router) if self.__router else (self,)):
+            for table, columns in self.__tencrypted().items():
+                for column in columns:
+                    rows = db.query(f'SELECT rowid, {column} FROM {table} WHERE typeof({column})=\'text\';').fetchall()
+                    if rows:
+                        db.query_many(f'UPDATE {table} SET {column}=? WHERE rowid=?;', [(bytes(x), row[0]) for row, x in zip(rows, xae.encrypt_many([row[1].encode() for row in rows]))])
+                        n += len(rows)
+        # Claims hold the values as stored
+        if n and self.__router:
+            self.__router.setup(reset=True)
+        return n
 
     def open(self) -> None:
         """
@@ -226,10 +496,13 @@ class Database:
         """
         try:
             if not self.__connection:
-                self.__connection = sql.connect(self.__id if self.__uri else f'{self.__path}/{self.__id}.db', uri=self.__uri, detect_types=sql.PARSE_DECLTYPES, autocommit=False, check_same_thread=False)
-                self.__connection.row_factory = sql.Row # Use row objects for rows instead of tuples
+                self.__handle = sql.connect(self.__id if self.__uri else f'{self.__path}/{self.__id}.db', uri=self.__uri, detect_types=sql.PARSE_DECLTYPES, autocommit=False, check_same_thread=False)
+                self.__handle.row_factory = sql.Row # Use row objects for rows instead of tuples
         except sql.Error as e:
             raise ConnectionError(f'On DB open, {e}')
+        # Open shards
+        if self.__router:
+            self.__router.fan_out(lambda db: db.open())
 
     def close(self) -> None:
         """
@@ -244,10 +517,38 @@ class Database:
                 # Commit before closing connection
                 self.__connection.commit()
                 self.__connection.close()
-                self.__connection = None
+                self.__handle = None
         except sql.Error as e:
             raise ConnectionError(f'On DB close, {e}')
+        # Close shards and stop their threads
+        if self.__router:
+            for db in self.__router:
+                db.close()
+            self.__router.shutdown()
+
+    def after_fork(self) -> None:
+        """
+        Forget the connection inherited from the parent process
 
+        SQLite connections must not be used across a fork, so the child never touches the parent's handle:
+        it is neither used nor closed, as closing it could release locks or checkpoint files the parent relies on.
+        Accessing the connection afterwards opens a new one, this is done automatically on first use in a forked child.
+        If not in a forked child the operation fails silently.
+        """
+        if (self.__pid == getpid()):
+            return
+        # Keep the handle alive so it is never finalized by the child
+        if self.__handle is not None:
+            type(self).__inherited.append(self.__handle)
+        self.__handle = None
+        self.__pid = getpid()
+        self.__tlock = RLock()
+        self.__depth = 0
+        # Forget parent's fan out threads
+        if self.__router:
+            self.__router.after_fork()
+
+    @timed(name='db_query', sample=0.1)
     def query(self, query: str, parameters: dict[str, Any] | Iterable=()) -> sql.Cursor | None:
         """
         Make a SQL Query on the database
@@ -262,17 +563,87 @@ class Database:
         """
         if not self.__connection:
             raise ConnectionError('On DB query, cannot query empty connection!')
+        # Record activity
+        self.__last = monotonic()
         try:
-            # Commits on context exit, and rollsback on error, does not close
-            with self.__connection:
-                if (type(parameters) == dict):
-                    cursor = self.__connection.execute(query, parameters)
-                else:
-                    cursor = self.__connection.execute(query, (*parameters,))
-            return cursor
+            with self.__tlock:
+                # Inside a transaction, committed when it ends
+                if self.__depth:
+                    return self.__connection.execute(query, parameters if (type(parameters) == dict) else (*parameters,))
+                # Commits on context exit, and rollsback on error, does not close
+                with self.__connection:
+                    if (type(parameters) == dict):
+                        cursor = self.__connection.execute(query, parameters)
+                    else:
+                        cursor = self.__connection.execute(query, (*parameters,))
+                return cursor
         except sql.Error as e:
             raise QueryError(e, query, parameters)
 
+    @timed(name='db_query_many')
+    def query_many(self, query: str, parameters: Iterable[dict[str, Any] | Iterable]) -> sql.Cursor | None:
+        """
+        Make a SQL Query on the database once for every set of parameters
+
+        The connection to the database file must already be opened.
+        All executions share a single transaction, which is far cheaper than one query call each.
+
+        :param query: (str) SQL Query string
+        :param parameters: (Iterable[dict[str, Any] | Iterable]) Sets of parameters to be substituted in the query string
+        :returns: (sql.Cursor | None) Cursor object representing query used to manage the context of a fetch operation
+        :raises ConnectionError: When trying to query the database without a connection to the database file
+        :raises QueryError: When there is a problem with the query and it fails
+        """
+        if not self.__connection:
+            raise ConnectionError('On DB query, cannot query empty connection!')
+        # Record activity
+        self.__last = monotonic()
+        try:
+            with self.__tlock:
+                # Inside a transaction, committed when it ends
+                if self.__depth:
+                    return self.__connection.executemany(query, parameters)
+                # Commits on context exit, and rollsback on error, does not close
+                with self.__connection:
+                    cursor = self.__connection.executemany(query, parameters)
+                return cursor
+        except sql.Error as e:
+            raise QueryError(e, query, parameters)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Self]:
+        """
+        Group queries in a single transaction
+
+        Queries made inside the context are committed together when it exits, or rolled back together if it raises.
+        Queries of other threads wait for the transaction to end, nested contexts join the outer transaction.
+
+        :returns: (Iterator[Self]) Context yielding the database
+        :raises ConnectionError: When trying to start a transaction without a connection to the database file
+        :raises QueryError: When committing the transaction fails
+        """
+        if not self.__connection:
+            raise ConnectionError('On DB transaction, cannot query empty connection!')
+        with self.__tlock:
+            self.__depth += 1
+            try:
+                # Joined the outer transaction
+                if (self.__depth > 1):
+                    yield self
+                    return
+                try:
+                    yield self
+                except BaseException:
+                    self.__connection.rollback()
+                    raise
+                try:
+                    self.__connection.commit()
+                except sql.Error as e:
+                    self.__connection.rollback()
+                    raise QueryError(e, 'COMMIT', ())
+            finally:
+                self.__depth -= 1
+
     def store[C](self, obj: C, cdata: dict[str, Any]={}) -> None:
         """
         Store a previously subscribed object type in the database
@@ -289,56 +660,84 @@ class Database:
         :raises ConnectionError: When trying to store on the database without a connection to the database file
         :raises QueryError: When any underlying query operation fails
         """
+        # Sharded, delegate to the owning shard
+        if self.__router:
+            return self.__router.shard_for(obj, cdata).store(obj, cdata)
         # Full mapping
         fmap = {}
-        # Loop trough reversed mro
-        for ob in type(obj).__mro__[::-1]:
-            # If object's class subscribed
-            if (ob in type(self).subscribed) and getattr(ob, '__db__', None):
-                # Metadata dict
-                mt = ob.__db__
-                # Add current map
-                fmap = {**fmap, **mt['__map__']}
-                # Table does not exist
-                if not self.__schema.has_table(self, mt['__table__']):
-                    raise SubscriptionError(f'Object {ob} subscribed to \'{mt['__table__']}\' table which {self} does not have!')
-                # Get data dict
-                data: dict[str, Any] = {**{str(k): getattr(obj, v, None) for k,v in mt['__map__'].items()}, **{k:v for k,v in cdata.items() if k in mt['__map__'].keys()}} # Merged as {**x, **y}
-                # Check external references
-                if (erefs := self.__schema.get_erefs(self.__schema, mt['__table__'])):
-                    # Loop trough external references
-                    for eref in erefs:
-                        try:
-                            # Get eref value
-                            row = self.query(f'SELECT {eref[2]} FROM {eref[1]} WHERE {self.__get_target(self, eref[1], allow=tuple(fmap.keys()))};', {str(k): getattr(obj, v, None) for k,v in fmap.items()}).fetchone()
-                            # Dependency not satisfied
-                            if not row:
-                                raise SubscriptionError(f'Object {ob} has malformed reference dependency as parent \'{eref[1]}({eref[2]})\' is uninstantiated!')
-                            # Update data
-                            data = {**data, **{eref[0]:row[eref[2]]}} # Merged as {**x, **y}
-                        except QueryError as e:
-                            print(e, '\n\n')
-                            raise SubscriptionError(f'Object {ob} has references to \'{eref[1]}({eref[2]})\' which has no related subscription!')
-                # If exists row update, else insert
-                if ((mt['__table__'], data) in self):
-                    # Create update  query
-                    self.query(
-                        f'UPDATE {mt['__table__']} SET {','.join([f'{column}=:{column}' for column in data.keys()])} WHERE {self.__get_target(self, mt['__table__'], allow=tuple(data.keys()))};',
-                        data
-                    )
-                else:
-                    # Create insertion query
-                    self.query(
-                        f'INSERT INTO {mt['__table__']} ({','.join(data.keys())}) VALUES ({','.join(['?']*len(data))})',
-                        data.values()
-                    )
+        # Column values as stored, encrypted columns get encrypted in a single pass each
+        values, cvalues = self.__values(obj), self.__encrypt(cdata, type(self).__encrypted(type(obj)))
+        # Claims made on the router, and claims to release once stored
+        router = self.__parent.router if self.__parent else None
+        claims, released = [], []
+        try:
+            # Rows of every table get written together
+            with self.transaction():
+                # Loop trough reversed mro
+                for ob in type(obj).__mro__[::-1]:
+                    # If object's class subscribed
+                    if (ob in type(self).subscribed) and getattr(ob, '__db__', None):
+                        # Metadata dict
+                        mt = ob.__db__
+                        # Add current map
+                        fmap = {**fmap, **mt['__map__']}
+                        # Table does not exist
+                        if not self.__schema.has_table(self, mt['__table__']):
+                            raise SubscriptionError(f'Object {ob} subscribed to \'{mt['__table__']}\' table which {self} does not have!')
+                        # Get data dict
+                        data: dict[str, Any] = {**{str(k): values[v] for k,v in mt['__map__'].items()}, **{k:v for k,v in cvalues.items() if k in mt['__map__'].keys()}} # Merged as {**x, **y}
+                        # Check external references
+                        if (erefs := self.__schema.get_erefs(mt['__table__'])):
+                            # Loop trough external references
+                            for eref in erefs:
+                                try:
+                                    # Get eref value
+                                    row = self.query(f'SELECT {eref[2]} FROM {eref[1]} WHERE {self.__get_target(eref[1], allow=tuple(fmap.keys()))};', {str(k): values[v] for k,v in fmap.items()}).fetchone()
+                                    # Dependency not satisfied
+                                    if not row:
+                                        raise SubscriptionError(f'Object {ob} has malformed reference dependency as parent \'{eref[1]}({eref[2]})\' is uninstantiated!')
+                                    # Update data
+                                    data = {**data, **{eref[0]:row[eref[2]]}} # Merged as {**x, **y}
+                                except QueryError as e:
+                                    print(e, '\n\n')
+                                    raise SubscriptionError(f'Object {ob} has references to \'{eref[1]}({eref[2]})\' which has no related subscription!')
+                        # Shards only enforce unique columns inside their own file, claim across shards the values that change
+                        exists = None
+                        if router and (columns := router.claimed(mt['__table__'])):
+                            current = self.__current(mt['__table__'], data, columns)
+                            exists = current is not None
+                            if (changed := tuple(column for column in columns if not exists or (current[column] != data.get(column)))):
+                                claims += router.claim(mt['__table__'], data, changed)
+                                # Previous values get released once the row is written
+                                if exists:
+                                    released.append((mt['__table__'], {**data, **{column: current[column] for column in changed}}, changed))
+                        # If exists row update, else insert
+                        if (((mt['__table__'], data) in self) if (exists is None) else exists):
+                            # Create update  query
+                            self.query(
+                                f'UPDATE {mt['__table__']} SET {','.join([f'{column}=:{column}' for column in data.keys()])} WHERE {self.__get_target(mt['__table__'], allow=tuple(data.keys()))};',
+                                data
+                            )
+                        else:
+                            # Create insertion query
+                            self.query(
+                                f'INSERT INTO {mt['__table__']} ({','.join(data.keys())}) VALUES ({','.join(['?']*len(data))})',
+                                data.values()
+                            )
+        except BaseException:
+            # Free the values claimed for rows never written
+            if claims:
+                router.unclaim(claims)
+            raise
+        for table, data, columns in released:
+            router.release(table, data, columns)
         # If object's class subscribed
         if (type(obj) in type(self).subscribed) and getattr(type(obj), '__db__', None):
             # Metadata dict
             mt = type(obj).__db__
             # If store function defined call it
             if callable(mt['__store__']):
-                mt['__store__'](obj, self)
+                mt['__store__'](obj, self.__parent or self)
 
     def retrieve[C](self, cls: Type[C], cdata: dict[str, Any]={}) -> Iterator[C]:
         """
@@ -354,36 +753,59 @@ class Database:
         :raises ConnectionError: When trying to store on the database without a connection to the database file
         :raises QueryError: When any underlying query operation fails
         """
+        # Sharded, delegate to the router
+        if self.__router:
+            yield from self.__router.retrieve(cls, cdata)
+            return
+        # Constraints on encrypted columns match their ciphertext
+        encrypted = type(self).__encrypted(cls)
+        cdata = self.__encrypt(cdata, encrypted)
+        # Context decrypting the retrieved columns on first read
+        xae = cipher(self.__key) if (self.__key and encrypted) else None
         # Full mapping
         fmap = {}
         # Collected data rows and erefs per table
         table_rows: dict[str, tuple[tuple[tuple[str, str, str], ...], tuple[sql.Row, ...]]] = {}
         # Collected external rows
         table_erows: dict[str, tuple[str, ...]] = {}
-        # Loop trough normal mro
-        for cl in cls.__mro__:
-            # If class subscribed
-            if (cl in type(self).subscribed) and getattr(cl, '__db__', None):
-                # Metadata dict
-                mt = cl.__db__
-                # Add current map
-                fmap = {**fmap, **mt['__map__']}
-                # Table does not exist
-                if not self.__schema.has_table(self, mt['__table__']):
-                    raise SubscriptionError(f'Object {cl} subscribed to \'{mt['__table__']}\' table which {self} does not have!')
-                # Get table's erefs
-                erefs = self.__schema.get_erefs(self.__schema, mt['__table__'])
-                # Get query target
-                etarget = self.__get_target(self, mt['__table__'], allow=(cdata.keys(), ''), ext=True)
-                # Create and execute select statement
-                cs = self.query(f'SELECT {','.join((*mt['__map__'].keys(), *{eref[0] for eref in erefs}, *(((mt['__table__'] in table_erows) and table_erows[mt['__table__']]) or ())))} FROM {mt['__table__']} \
-                    {f'WHERE {etarget}' if etarget else ''};', cdata)
-                # Collect row data and erefs
-                table_rows[mt['__table__']] = (erefs, cs.fetchall())
-                # Loop trough erefs
-                for eref in erefs:
-                    # Store erows
-                    table_erows[eref[1]] = {*(((eref[1] in table_erows) and table_erows[eref[1]]) or ()), eref[2]}
+        # Subscribed classes, from the lowest level up
+        classes = [cl for cl in cls.__mro__ if (cl in type(self).subscribed) and getattr(cl, '__db__', None)]
+        # Loop trough subscribed classes
+        for cl in classes:
+            # Metadata dict
+            mt = cl.__db__
+            # Add current map
+            fmap = {**fmap, **mt['__map__']}
+            # Table does not exist
+            if not self.__schema.has_table(self, mt['__table__']):
+                raise SubscriptionError(f'Object {cl} subscribed to \'{mt['__table__']}\' table which {self} does not have!')
+            # Loop trough erefs
+            for eref in self.__schema.get_erefs(mt['__table__']):
+                # Store erows, the referenced columns lower levels get matched by
+                table_erows[eref[1]] = {*(((eref[1] in table_erows) and table_erows[eref[1]]) or ()), eref[2]}
+        # Tables whose query got constrained
+        constrained: set[str] = set()
+        # Loop trough subscribed classes from the highest level down, so constrained rows narrow the lower level queries
+        for cl in classes[::-1]:
+            # Metadata dict
+            mt = cl.__db__
+            # Get table's erefs
+            erefs = self.__schema.get_erefs(mt['__table__'])
+            # Get query target
+            etarget = self.__get_target(mt['__table__'], allow=(*cdata.keys(), ''), ext=True)
+            conditions, parameters = ([etarget] if etarget else []), dict(cdata)
+            # Only rows referencing the already constrained ones
+            for i, eref in enumerate(erefs):
+                if (eref[1] in constrained):
+                    conditions.append(f'{eref[0]} IN (SELECT value FROM json_each(:_eref{i}))')
+                    parameters[f'_eref{i}'] = json.dumps([row[eref[2]] for row in table_rows[eref[1]][1]])
+            if conditions:
+                constrained.add(mt['__table__'])
+            # Create and execute select statement
+            cs = self.query(f'SELECT {','.join((*mt['__map__'].keys(), *{eref[0] for eref in erefs}, *(((mt['__table__'] in table_erows) and table_erows[mt['__table__']]) or ())))} FROM {mt['__table__']} \
+                {f'WHERE {' AND '.join(conditions)}' if conditions else ''};', parameters)
+            # Collect row data and erefs
+            table_rows[mt['__table__']] = (erefs, cs.fetchall())
 
         # Loop trough normal mro
         for cl in cls.__mro__:
@@ -406,6 +828,8 @@ class Database:
                                 # Union the match to rset
                                 rset |= {row, erow, *_ematch(table_rows[eref[1]][0], erow)}
                     return rset
+                # Setters of the mapped attributes, slots are set trough their descriptors
+                setters = {column: type(self).__setter(cls, attr) for column, attr in fmap.items()}
                 # Loop trough rows
                 for row in rows:
                     # Get row set
@@ -417,16 +841,20 @@ class Database:
                             # Loop trough row's columns
                             for column in _row.keys():
                                 # If column is mapped to attr
-                                if column in fmap:
+                                if column in setters:
+                                    value = _row[column]
+                                    # Seal ciphertext, decrypted on first read
+                                    if xae and (column in encrypted) and isinstance(value, bytes):
+                                        value = Sealed(value, xae)
                                     # Set new object instance's attribute
-                                    obj.__dict__[fmap[column]] = _row[column] # Bypass __setattr__
+                                    setters[column](obj, value) # Bypass __setattr__
                         for cl in cls.__mro__[::-1]:
                             # If class subscribed
                             if (cl in type(self).subscribed) and getattr(cl, '__db__', None):
                                 init = cl.__db__['__init__']
                                 # If init function defined call it
                                 if callable(init):
-                                    init(obj, self)
+                                    init(obj, self.__parent or self)
                         # Yield object instance
                         yield obj
             break # Loop only until lowest level
@@ -444,10 +872,15 @@ class Database:
         :raises ConnectionError: When trying to delete from the database without a connection to the database file
         :raises QueryError: When any underlying query operation fails
         """
+        # Sharded, delegate to the owning shard
+        if self.__router:
+            return self.__router.shard_for(obj, cdata).delete(obj, cdata)
         # Full mapping
         fmap = {}
+        # Column values as stored
+        values, cvalues = self.__values(obj), self.__encrypt(cdata, type(self).__encrypted(type(obj)))
         # Statement cache
-        sttmnts: list[tuple[str, dict[str, Any] | Iterable]] = []
+        sttmnts: list[tuple[str, dict[str, Any] | Iterable, str]] = []
         # Loop trough reversed mro
         for ob in type(obj).__mro__[::-1]:
             # If object's class subscribed
@@ -460,14 +893,14 @@ class Database:
                 if not self.__schema.has_table(self, mt['__table__']):
                     raise SubscriptionError(f'Object {ob} subscribed to \'{mt['__table__']}\' table which {self} does not have!')
                 # Get data dict
-                data: dict[str, Any] = {**{str(k): getattr(obj, v, None) for k,v in mt['__map__'].items()}, **{k:v for k,v in cdata.items() if k in mt['__map__'].keys()}} # Merged as {**x, **y}
+                data: dict[str, Any] = {**{str(k): values[v] for k,v in mt['__map__'].items()}, **{k:v for k,v in cvalues.items() if k in mt['__map__'].keys()}} # Merged as {**x, **y}
                 # Check external references
-                if (erefs := self.__schema.get_erefs(self.__schema, mt['__table__'])):
+                if (erefs := self.__schema.get_erefs(mt['__table__'])):
                     # Loop trough external references
                     for eref in erefs:
                         try:
                             # Get eref value
-                            row = self.query(f'SELECT {eref[2]} FROM {eref[1]} WHERE {self.__get_target(self, eref[1], allow=tuple(fmap.keys()))};', {str(k): getattr(obj, v, None) for k,v in fmap.items()}).fetchone()
+                            row = self.query(f'SELECT {eref[2]} FROM {eref[1]} WHERE {self.__get_target(eref[1], allow=tuple(fmap.keys()))};', {str(k): values[v] for k,v in fmap.items()}).fetchone()
                             # Dependency not satisfied
                             if not row:
                                 raise SubscriptionError(f'Object {ob} has malformed reference dependency as parent \'{eref[1]}({eref[2]})\' is uninstantiated!')
@@ -476,11 +909,14 @@ class Database:
                         except QueryError:
                             raise SubscriptionError(f'Object {ob} has references to \'{eref[1]}({eref[2]})\' which has no related subscription!')
                 # Store statement in cache
-                sttmnts.append((f'DELETE FROM {mt['__table__']} WHERE {self.__get_target(self, mt['__table__'], allow=tuple(data.keys()))};', data))
+                sttmnts.append((f'DELETE FROM {mt['__table__']} WHERE {self.__get_target(mt['__table__'], allow=tuple(data.keys()))};', data, mt['__table__']))
         # Loop trough statements in reverse
         for sttmnt in sttmnts[::-1]:
             # Create and execute delete statement
             self.query(sttmnt[0], sttmnt[1])
+            # Free unique values claimed across shards
+            if self.__parent and self.__parent.router:
+                self.__parent.router.release(sttmnt[2], sttmnt[1])
 
     def dump(self, path: Path) -> None:
         """
@@ -524,6 +960,220 @@ class Database:
         except sql.Error as e:
             raise ConnectionError(f'On DB backup, {e}')
 
+    def vacuum(self, pages: int | None=None) -> None:
+        """
+        Reclaim the unused pages of the database file
+
+        Without pages it rebuilds the whole file, blocking every other query while it runs.
+        With pages it only releases up to that many pages from the end of the file, which
+        requires the file to be in auto_vacuum=INCREMENTAL mode and is cheap enough to run in slices.
+
+        :param pages: (int | None) Maximum number of pages to release incrementally, defaults to a full vacuum
+        :raises ConnectionError: When the database has no open connection
+        :raises QueryError: When the vacuum fails
+        """
+        if not self.__connection:
+            raise ConnectionError('On DB vacuum, cannot vacuum with empty connection!')
+        try:
+            if pages is None:
+                # Full vacuum cannot run inside a transaction
+                self.__connection.commit()
+                self.__connection.autocommit = True
+                try:
+                    self.__connection.execute('VACUUM;')
+                finally:
+                    self.__connection.autocommit = False
+            else:
+                # Commits on context exit, and rollsback on error, does not close
+                with self.__connection:
+                    # Each returned step releases one page
+                    self.__connection.execute(f'PRAGMA incremental_vacuum({int(pages)});').fetchall()
+        except sql.Error as e:
+            raise QueryError(e, 'VACUUM', (pages,))
+
+    def analyze(self) -> None:
+        """
+        Refresh the statistics the query planner uses to choose indexes
+
+        :raises ConnectionError: When the database has no open connection
+        :raises QueryError: When the analysis fails
+        """
+        self.query('ANALYZE;')
+
+    def explain(self, query: str, parameters: dict[str, Any] | Iterable=()) -> tuple[str, ...]:
+        """
+        Get the plan the query planner chooses for a SQL Query
+
+        The query itself is not executed.
+
+        :param query: (str) SQL Query string
+        :param parameters: (dict[str, Any] | Iterable) Parameters to be substituted in the query string, if any
+        :returns: (tuple[str, ...]) Detail of every step of the plan, like 'SEARCH users USING INDEX ...' or 'SCAN posts'
+        :raises ConnectionError: When trying to query the database without a connection to the database file
+        :raises QueryError: When the query cannot be planned
+        """
+        if not self.__connection:
+            raise ConnectionError('On DB explain, cannot query empty connection!')
+        try:
+            # Plans of writes cannot be committed while pending, so no context here
+            cursor = self.__connection.execute(f'EXPLAIN QUERY PLAN {query}', parameters if (type(parameters) == dict) else (*parameters,))
+            return tuple(row['detail'] for row in cursor.fetchall())
+        except sql.Error as e:
+            raise QueryError(e, query, parameters)
+
+    def trace(self, callback: Callable[[str], None] | None) -> None:
+        """
+        Set a function to be called with every statement executed on the database
+
+        Statements are passed with their parameters already substituted, including
+        transaction control ones. The callback must not query the database.
+
+        :param callback: (Callable[[str], None] | None) Function to call, None removes the current one
+        :raises ConnectionError: When the database has no open connection
+        """
+        if not self.__connection:
+            raise ConnectionError('On DB trace, cannot trace empty connection!')
+        self.__connection.set_trace_callback(callback)
+
+    def blob(self, table: str, column: str, row: int, readonly: bool=True) -> sql.Blob:
+        """
+        Open a blob for incremental I/O
+
+        The connection to the database file must already be opened.
+        The blob size cannot change trough the handle, use zeroblob(N) to preallocate it.
+
+        :param table: (str) Table where the blob is located
+        :param column: (str) Column where the blob is located
+        :param row: (int) Row id of the row where the blob is located
+        :param readonly: (bool) Whether the blob should be opened without write permissions, defaults to True
+        :returns: (sql.Blob) Blob handle, usable as a file-like object and a context manager
+        :raises ConnectionError: When trying to open a blob without a connection to the database file
+        :raises QueryError: When the blob cannot be opened
+        """
+        if not self.__connection:
+            raise ConnectionError('On DB blob, cannot open blob with empty connection!')
+        try:
+            return self.__connection.blobopen(table, column, row, readonly=readonly)
+        except sql.Error as e:
+            raise QueryError(e, f'BLOBOPEN {table}.{column}', (row,))
+
+    def __current(self, table: str, data: dict[str, Any], columns: tuple[str, ...]) -> sql.Row | None:
+        """
+        Get some columns of the stored row an update of a table would target
+
+        :param table: (str) Table of the row
+        :param data: (dict[str, Any]) Column values of the row to store
+        :param columns: (tuple[str, ...]) Columns to get
+        :returns: (sql.Row | None) The stored values, None if the row is not stored
+        :raises QueryError: When the underlying query operation fails
+        """
+        # If no pkeys assume it does not contain
+        if not self.__schema.get_pkeys(table, allow=tuple(data.keys())):
+            return None
+        return self.query(f'SELECT {','.join(columns)} FROM {table} WHERE {self.__get_target(table, allow=tuple(data.keys()))};', data).fetchone()
+
+    def __keycheck(self) -> None:
+        """
+        Check the key against the fingerprint of the one the encrypted columns were stored with
+
+        Databases with no fingerprint stored by older versions are checked by decrypting a value of each
+        encrypted column, then the fingerprint gets stored and the values stored in plaintext get encrypted.
+
+        :raises EncryptionError: When the key is missing or is not the one the encrypted columns were stored with
+        :raises ConnectionError: When acting on a database with no connection
+        :raises QueryError: When any underlying query operation fails
+        """
+        fingerprints = type(self).FINGERPRINT
+        self.query(f'CREATE TABLE IF NOT EXISTS {fingerprints} (fingerprint BLOB NOT NULL);')
+        if (row := self.query(f'SELECT fingerprint FROM {fingerprints};').fetchone()):
+            if not self.__key:
+                raise EncryptionError(f'{self.__id} has encrypted columns, a key is needed!')
+            if (row[0] != fingerprint(self.__key)):
+                raise EncryptionError(f'{self.__id} has columns encrypted with another key!')
+            return
+        # A value of each encrypted column, as stored
+        samples = []
+        for db in ((self, *self.__router) if self.__router else (self,)):
+            for table, columns in self.__tencrypted().items():
+                for column in columns:
+                    if (row := db.query(f'SELECT {column} FROM {table} WHERE typeof({column})=\'blob\' LIMIT 1;').fetchone()):
+                        samples.append(row[0])
+        if samples and not self.__key:
+            raise EncryptionError(f'{self.__id} has encrypted columns, a key is needed!')
+        if not self.__key:
+            return
+        # Ciphertext of another key decrypts to garbage
+        try:
+            for data in samples:
+                cipher(self.__key).decrypt(data).decode()
+        except (ValueError, UnicodeDecodeError):
+            raise EncryptionError(f'{self.__id} has columns encrypted with another key!') from None
+        self.encrypt()
+        self.query(f'INSERT INTO {fingerprints} VALUES (?);', (fingerprint(self.__key),))
+
+    def __tencrypted(self) -> dict[str, set[str]]:
+        """
+        Get the encrypted columns of every table
+
+        :returns: (dict[str, set[str]]) Names of the encrypted columns by table, only tables with any
+        """
+        tables: dict[str, set[str]] = {}
+        for cl in type(self).subscribed:
+            if getattr(cl, '__db__', None) and cl.__db__['__encrypted__'] and self.__schema.has_table(self, cl.__db__['__table__']):
+                tables.setdefault(cl.__db__['__table__'], set()).update(cl.__db__['__encrypted__'])
+        return tables
+
+    def __values(self, obj: Any) -> dict[str, Any]:
+        """
+        Get the mapped attributes of an object as they are stored in the database
+
+        Plaintext of encrypted columns gets encrypted in a single pass, sealed values keep their ciphertext without being decrypted.
+
+        :param obj: (Any) Object to get the attributes of
+        :returns: (dict[str, Any]) Values by attribute name, None for unset attributes
+        """
+        values, encrypted = {}, set()
+        # Loop trough subscribed classes
+        for cl in type(obj).__mro__:
+            if (cl in type(self).subscribed) and getattr(cl, '__db__', None):
+                mt = cl.__db__
+                for attr in mt['__map__'].values():
+                    descriptor = getattr(type(obj), attr, None)
+                    # Read encrypted attributes as kept, so sealed ones stay sealed
+                    try:
+                        values[attr] = descriptor.raw(obj) if isinstance(descriptor, Encrypted) else getattr(obj, attr)
+                    except AttributeError:
+                        values[attr] = None
+                encrypted |= {mt['__map__'][column] for column in mt['__encrypted__']}
+        return self.__encrypt(values, encrypted)
+
+    def __encrypt(self, data: dict[str, Any], keys: Iterable[str]) -> dict[str, Any]:
+        """
+        Encrypt the string values of some keys of a dict, in a single pass
+
+        Values are left in plaintext when the database has no key, sealed values are replaced with their ciphertext.
+
+        :param data: (dict[str, Any]) Dict to encrypt the values of
+        :param keys: (Iterable[str]) Keys of the values to encrypt
+        :returns: (dict[str, Any]) New dict with the values encrypted
+        """
+        data = {k: (v.data if isinstance(v, Sealed) else v) for k, v in data.items()}
+        # Keys with plaintext to encrypt
+        if self.__key and (keys := [k for k in keys if isinstance(data.get(k), str)]):
+            for k, x in zip(keys, cipher(self.__key).encrypt_many([data[k].encode() for k in keys])):
+                data[k] = bytes(x)
+        return data
+
+    @staticmethod
+    def __encrypted(cls: type) -> set[str]:
+        """
+        Get the encrypted columns of a class
+
+        :param cls: (type) Class to get the encrypted columns of
+        :returns: (set[str]) Names of the encrypted columns of every table the class is stored in
+        """
+        return {column for cl in cls.__mro__ if (cl in Database.subscribed) and getattr(cl, '__db__', None) for column in cl.__db__['__encrypted__']}
+
     @memoize
     def __get_target(self, table: str, allow: tuple[str, ...]=(), ignore: tuple[str, ...]=(), ext: bool=False) -> str:
         """
@@ -536,9 +1186,77 @@ class Database:
         :returns: (str) Placeholder condition expression for the table
         """
         if ext:
-            return ' AND '.join([f'{nkey}=:{nkey}' for nkey in (self.__schema.get_nkeys(self.__schema, table, allow, ignore) or ())])
+            return ' AND '.join([f'{nkey}=:{nkey}' for nkey in (self.__schema.get_nkeys(table, allow, ignore) or ())])
         else:
-            return ' AND '.join([f'{pkey}=:{pkey}' for pkey in (self.__schema.get_pkeys(self.__schema, table, allow, ignore) or ())])
+            return ' AND '.join([f'{pkey}=:{pkey}' for pkey in (self.__schema.get_pkeys(table, allow, ignore) or ())])
+
+    @staticmethod
+    def assign(obj: Any, attr: str, value: Any) -> None:
+        """
+        Set an attribute of an object bypassing its __setattr__
+
+        Meant for hooks and loaders that fill registered objects without storing them.
+        Works with both __dict__ and __slots__ backed objects.
+
+        :param obj: (Any) Object to set the attribute of
+        :param attr: (str) Name of the attribute
+        :param value: (Any) Value to set the attribute to
+        """
+        Database.__setter(type(obj), attr)(obj, value)
+
+    @staticmethod
+    def fields(obj: Any) -> dict[str, Any]:
+        """
+        Get the instance attributes of an object
+
+        Works with both __dict__ and __slots__ backed objects, as a replacement for obj.__dict__.
+        Slots come first, in declaration order from the base class down, unset slots are left out.
+        Encrypted attributes are given in plaintext.
+
+        :param obj: (Any) Object to get the attributes of
+        :returns: (dict[str, Any]) New dict with attribute names as keys and attribute values as values
+        """
+        fields = {}
+        # Loop trough reversed mro, base classes first
+        for cl in type(obj).__mro__[::-1]:
+            slots = cl.__dict__.get('__slots__', ())
+            # Loop trough slots, a single slot may be given as a string
+            for attr in ((slots,) if isinstance(slots, str) else slots):
+                if isinstance(descriptor := cl.__dict__.get(attr), (MemberDescriptorType, Encrypted)):
+                    try:
+                        fields[attr] = descriptor.__get__(obj, cl)
+                        # Slot wrapped by a subclass
+                        if isinstance(fields[attr], Sealed):
+                            fields[attr] = getattr(obj, attr)
+                    except AttributeError:
+                        pass # Unset slot
+        # Attributes outside slots, sealed ones decrypted
+        return {**fields, **{k: (getattr(obj, k) if isinstance(v, Sealed) else v) for k, v in getattr(obj, '__dict__', {}).items()}}
+
+    @staticmethod
+    def __setter(cls: type, attr: str) -> Callable[[Any, Any], None]:
+        """
+        Get a function that sets an attribute of a class's instances bypassing __setattr__
+
+        Slots get the setter of their member descriptor, encrypted attributes the one of their descriptor,
+        other attributes get written to the instance dict.
+
+        :param cls: (type) Class of the instances
+        :param attr: (str) Name of the attribute
+        :returns: (Callable[[Any, Any], None]) Function called with the instance and the value
+        """
+        try:
+            return Database.__setters[(cls, attr)]
+        except KeyError:
+            # Descriptor of the slot, if any
+            descriptor = next((cl.__dict__[attr] for cl in cls.__mro__ if attr in cl.__dict__), None)
+            if isinstance(descriptor, MemberDescriptorType):
+                setter = descriptor.__set__
+            elif isinstance(descriptor, Encrypted):
+                setter = descriptor.set
+            else:
+                setter = lambda obj, value: obj.__dict__.__setitem__(attr, value)
+            return Database.__setters.setdefault((cls, attr), setter)
 
     @classmethod
     def from_schema(cls, id: str, *tables: dict) -> Self:
@@ -553,17 +1271,22 @@ class Database:
 
     @dec_wparams
     @staticmethod
-    def register[C](cls: Type[C], table: str, map: dict[str, str], init: Callable[[C, Self], None] | None=None, store: Callable[[C, Self], None] | None=None, db: Self | None=None) -> Type[C]:
+    def register[C](cls: Type[C], table: str, map: dict[str, str], init: Callable[[C, Self], None] | None=None, store: Callable[[C, Self], None] | None=None, db: Self | None=None, encrypted: Iterable[str]=()) -> Type[C]:
         """
         Register a class for database storage and retrieval
 
+        Encrypted columns are stored encrypted with the key of the database, and retrieved sealed.
+        Their attributes get decrypted on first read, so retrievals never reading them never decrypt them.
+
         :param cls: (C) Class object to register
         :param table: (str) Database table to register it to
         :param map: (dict[str, str]) Mapping of table columns and instance attributes
         :param init: (Callable[[C, Self], None]) Optional initialization function for when retrieving instances, gets passed the instance with the data and the database as parameters
         :param store: (Callable[[C, Self], None]) Optional storage function for when storing instances, gets passed the instance with the data and the database as parameters
         :param db: (Self) Optional database instance to update instances to automatically on attribute set
+        :param encrypted: (Iterable[str]) Optional mapped columns to store encrypted, only string values get encrypted
         :returns: (C) The registered class object
+        :raises SubscriptionError: When an encrypted column is not mapped
         """
         # Register class object
         Database.subscribed.add(cls)
@@ -573,8 +1296,17 @@ class Database:
             '__map__': map,
             '__init__': init,
             '__store__': store,
-            '__db__': db
+            '__db__': db,
+            '__encrypted__': frozenset(encrypted)
         }
+        # Loop trough encrypted columns
+        for column in cls.__db__['__encrypted__']:
+            if column not in map:
+                raise SubscriptionError(f'Object {cls} has encrypted column \'{column}\' which is not mapped!')
+            # Wrap the attribute, keeping its slot if it has one
+            descriptor = next((cl.__dict__[map[column]] for cl in cls.__mro__ if map[column] in cl.__dict__), None)
+            if not isinstance(descriptor, Encrypted):
+                setattr(cls, map[column], Encrypted(map[column], descriptor if isinstance(descriptor, MemberDescriptorType) else None))
         # If passed db
         if db:
             # Define __init__ magic method
@@ -587,17 +1319,18 @@ class Database:
                 """
                 def _init_wp(self, *args: P.args, **kwargs: P.kwargs) -> None:
                     # If already in init recursion
-                    if getattr(self, '__in_init__', False):
+                    if id(self) in Database.__initializing:
                         # Simply call next piece
                         init(self, *args, **kwargs)
                     else:
-                        # Start init recursion
-                        self.__dict__['__in_init__'] = True
-                        # Call init recursion
-                        init(self, *args, **kwargs)
-                        # Stop init recursion
-                        if '__in_init__' in self.__dict__:
-                            del self.__dict__['__in_init__']
+                        # Start init recursion, tracked outside the object so slotted classes need no flag slot
+                        Database.__initializing.add(id(self))
+                        try:
+                            # Call init recursion
+                            init(self, *args, **kwargs)
+                        finally:
+                            # Stop init recursion
+                            Database.__initializing.discard(id(self))
                         # Update object in database
                         db.store(self)
                 # Return wrapper
@@ -614,7 +1347,7 @@ class Database:
                 # Call parent method to handle call
                 super(cls, self).__setattr__(key, value)
                 # Check if in init
-                if not getattr(self, '__in_init__', False):
+                if not (id(self) in Database.__initializing):
                     # If key to set is registered
                     if key in map.values():
                         # Update object in database
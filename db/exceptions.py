@@ -95,4 +95,18 @@ class SubscriptionError(DatabaseException):
         :param e: (Exception) Error that caused the exception
         :param args: (*Any) Any other arguments
         """
-        super().__init__(f'Subscription -> {str(e)}', *args)
\ No newline at end of file
+        super().__init__(f'Subscription -> {str(e)}', *args)
+class EncryptionError(DatabaseException):
+    """
+    Encryption exception class
+
+    Raised when the key of a database does not match the one its encrypted columns were stored with
+    """
+    def __init__(self, e: Exception | str, *args: Any) -> None:
+        """
+        Encryption exception constructor
+
+        :param e: (Exception) Error that caused the exception
+        :param args: (*Any) Any other arguments
+        """
+        super().__init__(f'Encryption -> {str(e)}', *args)
@@ -0,0 +1,82 @@
+from threading import Event
+from typing import Any, Callable, Iterable
+
+class Maintenance:
+    """
+    Reclaims free space and refreshes planner statistics of a database
+
+    It is meant to be scheduled as a periodic job, each pass checks the database and its
+    shards if any. While a database stays idle
+    its free pages are released in small incremental vacuum slices, so no query ever waits
+    behind a full VACUUM. After a large number of row changes it runs ANALYZE.
+    The database file must be in auto_vacuum=INCREMENTAL mode for the slices to release pages.
+    """
+    def __init__(self, db: 'Database', slice: int=64, idle: float=2.0, analyze: int=1000, collectors: Iterable[Callable[[], Any]]=()) -> None:
+        """
+        Maintenance object constructor
+
+        :param db: (Database) Database to maintain
+        :param slice: (int) Maximum number of pages released per incremental vacuum step, defaults to 64
+        :param idle: (float) Seconds without queries for a database to be considered idle, defaults to 2.0
+        :param analyze: (int) Number of row changes that triggers an ANALYZE, defaults to 1000
+        :param collectors: (Iterable[Callable[[], Any]]) Functions that free unreferenced data, called on idle passes after vacuuming
+        :raises ValueError: When the value of slice is invalid
+        """
+        # Check slice
+        if (slice <= 0):
+            raise ValueError('Invalid \'slice\' for maintenance!')
+        # Set attributes
+        self.__db: 'Database' = db
+        self.__slice: int = slice
+        self.__idle: float = idle
+        self.__analyze: int = analyze
+        self.__collectors: tuple[Callable[[], Any], ...] = tuple(collectors)
+        self.__stop: Event = Event()
+        # Connection delta at last analysis per database
+        self.__deltas: dict[int, int] = {}
+        # Accumulated statistics
+        self.__stats: dict[str, int] = {'passes': 0, 'pages': 0, 'analyzes': 0}
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        Get the maintenance statistics
+
+        :returns: (dict[str, int]) Copy of the counters of passes, released pages and analyzes
+        """
+        return self.__stats.copy()
+
+    def stop(self) -> None:
+        """
+        Interrupt maintenance
+
+        The current slice is finished, later passes neither vacuum nor collect.
+        """
+        self.__stop.set()
+
+    def run_once(self, force: bool=False) -> None:
+        """
+        Make a single maintenance pass
+
+        :param force: (bool) Whether to vacuum even if the databases are not idle, defaults to False
+        :raises ConnectionError: When a maintained database has no open connection
+        :raises QueryError: When any underlying query operation fails
+        """
+        self.__stats['passes'] += 1
+        for db in (self.__db, *(self.__db.router or ())):
+            if not db.is_open:
+                continue
+            # Release free pages slice by slice while idle
+            while (force or (db.idle >= self.__idle)) and not self.__stop.is_set() and (free := db.free_pages):
+                db.vacuum(self.__slice)
+                self.__stats['pages'] += min(free, self.__slice)
+            # Refresh statistics after large changes
+            if (db.delta - self.__deltas.get(id(db), 0) >= self.__analyze):
+                db.analyze()
+                self.__deltas[id(db)] = db.delta
+                self.__stats['analyzes'] += 1
+        # Free unreferenced data, its pages get released on the next pass
+        # Vacuuming and analyzing take time, so check idleness right before collecting
+        if not self.__stop.is_set() and (force or (self.__db.idle >= self.__idle)):
+            for collector in self.__collectors:
+                collector()
@@ -0,0 +1,366 @@
+from datetime import datetime
+from threading import RLock
+from time import monotonic
+from typing import Any
+from .exceptions import *
+
+class MessageStore:
+    """
+    Manages the chat messages between users as an append-optimized store
+
+    Messages are buffered in memory and appended in batches, each batch being a single transaction.
+    Conversations are keyed by the ordered pair of user ids, so history pages are served by the
+    (user1, user2, msg_id) primary key and inbox summaries by a one row per conversation table.
+    Unread counters only live in memory.
+
+    Chats table format: {
+        'name': str,
+        'columns': (
+            {'name': 'user1', 'type': 'INTEGER', 'mods': ('PRIMARY KEY', ...)},
+            {'name': 'user2', 'type': 'INTEGER', 'mods': ('PRIMARY KEY', ...)},
+            {'name': 'msg_id', 'type': 'INTEGER', 'mods': ('PRIMARY KEY',)},
+            {'name': 'sender', 'type': 'INTEGER', 'mods': ('NOT NULL', ...)},
+            {'name': 'fecha', 'type': 'TEXT', 'mods': ('NOT NULL', ...)},
+            {'name': 'content', 'type': 'TEXT', 'mods': ('NOT NULL',)},
+            {'name': 'image', 'type': 'TEXT'}
+        )
+    }
+
+    Conversations table format: {
+        'name': str,
+        'columns': (
+            {'name': 'user1', 'type': 'INTEGER', 'mods': ('PRIMARY KEY', ...)},
+            {'name': 'user2', 'type': 'INTEGER', 'mods': ('PRIMARY KEY', ...)},
+            {'name': 'last_msg', 'type': 'INTEGER', 'mods': ('NOT NULL',)},
+            {'name': 'sender', 'type': 'INTEGER', 'mods': ('NOT NULL',)},
+            {'name': 'fecha', 'type': 'TEXT', 'mods': ('NOT NULL',)},
+            {'name': 'preview', 'type': 'TEXT'}
+        )
+    }
+    """
+    PREVIEW: int = 64
+
+    def __init__(self, db: 'Database', chats: str='chats', conversations: str='conversations', batch: int=256, delay: float=0.5) -> None:
+        """
+        MessageStore object constructor
+
+        :param db: (Database) Database object whose tables store the messages
+        :param chats: (str) Name of the table that stores the messages
+        :param conversations: (str) Name of the table that stores the conversation summaries
+        :param batch: (int) Number of buffered messages that triggers an append, defaults to 256
+        :param delay: (float) Maximum seconds a buffered message waits before the next append call flushes it, defaults to 0.5.
+            Flushing is only triggered by appends, so :py:meth:`db.MessageStore.flush` must be scheduled every delay seconds
+            to make quiet periods durable
+        :raises ValueError: When the value of batch is invalid
+        """
+        # Check batch
+        if (batch <= 0):
+            raise ValueError('Invalid \'batch\' for message store!')
+        # Set attributes
+        self.__db: 'Database' = db
+        self.__chats: str = chats
+        self.__conversations: str = conversations
+        self.__batch: int = batch
+        self.__delay: float = delay
+        self.__lock: RLock = RLock()
+        # Buffered message rows and conversation summaries
+        self.__pending: list[tuple[Any, ...]] = []
+        self.__summaries: dict[tuple[int, int], tuple[Any, ...]] = {}
+        self.__oldest: float | None = None
+        # Last message id per conversation, loaded lazily
+        self.__last: dict[tuple[int, int], int] = {}
+        # Unread counters as {user: {other: count}}
+        self.__unread: dict[int, dict[int, int]] = {}
+
+    def __len__(self) -> int:
+        """
+        Get the length of the store buffer
+
+        :returns: (int) Number of messages waiting to be appended
+        """
+        return self.__pending.__len__() # Delegates work to list
+
+    @property
+    def delay(self) -> float:
+        """
+        Get the maximum waiting time of buffered messages
+
+        :returns: (float) Seconds a buffered message waits before being appended
+        """
+        return self.__delay
+
+    def send(self, sender: int, recipient: int, content: str, image: str | None=None) -> int:
+        """
+        Send a message from one user to another
+
+        The message is buffered and appended with the next batch.
+
+        :param sender: (int) Id of the sending user
+        :param recipient: (int) Id of the receiving user
+        :param content: (str) Text of the message
+        :param image: (str | None) Digest referencing an image in the image store, if any
+        :returns: (int) The message id inside its conversation
+        :raises ConnectionError: When the batch append acts on a db with no connection
+        :raises QueryError: When the batch append fails
+        """
+        key = type(self).key(sender, recipient)
+        fecha = datetime.now().isoformat(timespec='seconds')
+        with self.__lock:
+            # Next message id of the conversation
+            msg_id = self.__last_id(key) + 1
+            self.__last[key] = msg_id
+            # Buffer row and summary
+            self.__pending.append((*key, msg_id, sender, fecha, content, image))
+            self.__summaries[key] = (*key, msg_id, sender, fecha, content[:type(self).PREVIEW])
+            # Count as unread for the recipient
+            counters = self.__unread.setdefault(recipient, {})
+            counters[sender] = counters.get(sender, 0) + 1
+            # Start waiting time
+            if self.__oldest is None:
+                self.__oldest = monotonic()
+            # Append when full or stale
+            if (len(self.__pending) >= self.__batch) or ((monotonic() - self.__oldest) >= self.__delay):
+                self.flush()
+        return msg_id
+
+    def flush(self) -> int:
+        """
+        Append every buffered message to the database
+
+        Messages and summaries are written in a single transaction. If it fails nothing is written
+        and the messages stay buffered, so the next flush retries them.
+
+        :returns: (int) Number of messages appended
+        :raises ConnectionError: When acting on a db with no connection
+        :raises QueryError: When any underlying query operation fails
+        """
+        with self.__lock:
+            if not self.__pending:
+                return 0
+            # Append messages and upsert summaries, together
+            with self.__db.transaction():
+                self.__db.query_many(f'INSERT INTO {self.__chats} (user1, user2, msg_id, sender, fecha, content, image) VALUES (?, ?, ?, ?, ?, ?, ?);', self.__pending)
+                self.__db.query_many(
+                    f'INSERT INTO {self.__conversations} (user1, user2, last_msg, sender, fecha, preview) VALUES (?, ?, ?, ?, ?, ?) \
+                    ON CONFLICT (user1, user2) DO UPDATE SET last_msg=excluded.last_msg, sender=excluded.sender, fecha=excluded.fecha, preview=excluded.preview;',
+                    self.__summaries.values()
+                )
+            # Reset buffer, once committed
+            n = len(self.__pending)
+            self.__pending, self.__summaries, self.__oldest = [], {}, None
+            return n
+
+    def backfill(self) -> int:
+        """
+        Build the missing conversation summaries from the stored messages
+
+        Meant for databases whose messages were stored before summaries existed.
+        Conversations that already have a summary are left untouched.
+
+        :returns: (int) Number of summaries created
+        :raises ConnectionError: When acting on a db with no connection
+        :raises QueryError: When any underlying query operation fails
+        """
+        with self.__lock:
+            self.flush()
+            return self.__db.query(
+                f'INSERT OR IGNORE INTO {self.__conversations} (user1, user2, last_msg, sender, fecha, preview) \
+                SELECT c.user1, c.user2, c.msg_id, c.sender, c.fecha, substr(c.content, 1, {type(self).PREVIEW}) FROM {self.__chats} AS c \
+                JOIN (SELECT user1, user2, MAX(msg_id) AS last FROM {self.__chats} GROUP BY user1, user2) AS m \
+                ON c.user1=m.user1 AND c.user2=m.user2 AND c.msg_id=m.last;'
+            ).rowcount
+
+    def history(self, user: int, other: int, before: int | None=None, limit: int=50) -> list[dict[str, Any]]:
+        """
+        Get a page of the messages of a conversation, newest first
+
+        Pages are chained by passing the smallest message id of a page as the before of the next one.
+
+        :param user: (int) Id of one of the users of the conversation
+        :param other: (int) Id of the other user of the conversation
+        :param before: (int | None) Only get messages with a lower message id, defaults to the newest
+        :param limit: (int) Maximum number of messages in the page, defaults to 50
+        :returns: (list[dict[str, Any]]) Messages as dicts with msg_id, sender, fecha, content and image keys
+        :raises ConnectionError: When acting on a db with no connection
+        :raises QueryError: When any underlying query operation fails
+        """
+        # Make buffered messages visible
+        self.flush()
+        key = type(self).key(user, other)
+        cs = self.__db.query(
+            f'SELECT msg_id, sender, fecha, content, image FROM {self.__chats} \
+            WHERE user1=? AND user2=? AND msg_id<? ORDER BY msg_id DESC LIMIT ?;',
+            (*key, before if before is not None else (1 << 63) - 1, limit)
+        )
+        return [dict(row) for row in cs.fetchall()]
+
+    def inbox(self, user: int) -> list[dict[str, Any]]:
+        """
+        Get the summary of every conversation of a user, most recent first
+
+        Reads only the conversation summaries, never the messages.
+
+        :param user: (int) Id of the user to get the inbox for
+        :returns: (list[dict[str, Any]]) Summaries as dicts with other, last_msg, sender, fecha, preview and unread keys
+        :raises ConnectionError: When acting on a db with no connection
+        :raises QueryError: When any underlying query operation fails
+        """
+        self.flush()
+        cs = self.__db.query(
+            f'SELECT user1, user2, last_msg, sender, fecha, preview FROM {self.__conversations} \
+            WHERE user1=:user UNION ALL SELECT user1, user2, last_msg, sender, fecha, preview FROM {self.__conversations} \
+            WHERE user2=:user AND user1<>:user ORDER BY fecha DESC;',
+            {'user': user}
+        )
+        counters = self.__unread.get(user, {})
+        summaries = []
+        for row in cs.fetchall():
+            other = row['user2'] if (row['user1'] == user) else row['user1']
+            summaries.append({
+                'other': other, 'last_msg': row['last_msg'], 'sender': row['sender'],
+                'fecha': row['fecha'], 'preview': row['preview'], 'unread': counters.get(other, 0)
+            })
+        return summaries
+
+    def unread(self, user: int, other: int | None=None) -> int:
+        """
+        Get the number of unread messages of a user
+
+        :param user: (int) Id of the user to get the counter for
+        :param other: (int | None) Only count messages sent by this user, defaults to counting all
+        :returns: (int) Number of unread messages
+        """
+        with self.__lock:
+            counters = self.__unread.get(user, {})
+            return counters.get(other, 0) if (other is not None) else sum(counters.values())
+
+    def mark_read(self, user: int, other: int) -> None:
+        """
+        Mark the messages a user received from another one as read
+
+        :param user: (int) Id of the user reading the messages
+        :param other: (int) Id of the user that sent the messages
+        """
+        with self.__lock:
+            self.__unread.get(user, {}).pop(other, None)
+
+    def forget(self, user: int) -> int:
+        """
+        Drop every message and conversation of a user, and the in-memory state kept for it
+
+        Meant for deleted accounts, images of the messages are left for the image store to collect.
+
+        :param user: (int) Id of the user to forget
+        :returns: (int) Number of messages deleted
+        :raises ConnectionError: When acting on a db with no connection
+        :raises QueryError: When any underlying query operation fails
+        """
+        with self.__lock:
+            self.flush()
+            self.__db.query(f'DELETE FROM {self.__conversations} WHERE user1=:user OR user2=:user;', {'user': user})
+            n = self.__db.query(f'DELETE FROM {self.__chats} WHERE user1=:user OR user2=:user;', {'user': user}).rowcount
+            self.__unread.pop(user, None)
+            for counters in self.__unread.values():
+                counters.pop(user, None)
+            for key in [key for key in self.__last if user in key]:
+                del self.__last[key]
+            return n
+
+    def __last_id(self, key: tuple[int, int]) -> int:
+        """
+        Get the last message id of a conversation
+
+        :param key: (tuple[int, int]) Conversation key
+        :returns: (int) Last message id or 0 if the conversation is empty
+        """
+        if not (key in self.__last):
+            row = self.__db.query(f'SELECT last_msg FROM {self.__conversations} WHERE user1=? AND user2=?;', key).fetchone()
+            self.__last[key] = row['last_msg'] if row else 0
+        return self.__last[key]
+
+    @staticmethod
+    def key(user: int, other: int) -> tuple[int, int]:
+        """
+        Get the key of the conversation between two users
+
+        :param user: (int) Id of one of the users
+        :param other: (int) Id of the other user
+        :returns: (tuple[int, int]) Ordered pair of user ids
+        """
+        return (user, other) if (user <= other) else (other, user)
+
+
+def tests() -> None:
+    """
+    Run a series of tests for the message store
+
+    It checks the following properties:
+
+    - Buffered messages get appended with their conversation summary on flush
+    - A failed flush writes nothing and keeps the messages buffered
+    - A flush retried after a failure appends the messages once
+
+    If an assertion fails, it indicates a discrepancy in the implementation of the message store.
+    """
+    from tempfile import TemporaryDirectory
+    from .database import Database
+    from .schema import Schema
+
+    schema = Schema(
+        {
+            'name': 'chats',
+            'columns': (
+                {'name': 'user1', 'type': 'INTEGER', 'mods': ('PRIMARY KEY',)},
+                {'name': 'user2', 'type': 'INTEGER', 'mods': ('PRIMARY KEY',)},
+                {'name': 'msg_id', 'type': 'INTEGER', 'mods': ('PRIMARY KEY',)},
+                {'name': 'sender', 'type': 'INTEGER', 'mods': ('NOT NULL',)},
+                {'name': 'fecha', 'type': 'TEXT', 'mods': ('NOT NULL',)},
+                {'name': 'content', 'type': 'TEXT', 'mods': ('NOT NULL',)},
+                {'name': 'image', 'type': 'TEXT'},
+            )
+        },
+        {
+            'name': 'conversations',
+            'columns': (
+                {'name': 'user1', 'type': 'INTEGER', 'mods': ('PRIMARY KEY',)},
+                {'name': 'user2', 'type': 'INTEGER', 'mods': ('PRIMARY KEY',)},
+                {'name': 'last_msg', 'type': 'INTEGER', 'mods': ('NOT NULL',)},
+                {'name': 'sender', 'type': 'INTEGER', 'mods': ('NOT NULL',)},
+                {'name': 'fecha', 'type': 'TEXT', 'mods': ('NOT NULL',)},
+                {'name': 'preview', 'type': 'TEXT'},
+            )
+        }
+    )
+    with TemporaryDirectory() as path:
+        db = Database('messages', schema, path)
+        db.init()
+        store = MessageStore(db, delay=3600)
+        count = lambda table: db.query(f'SELECT count(*) FROM {table};').fetchone()[0]
+
+        # Flush test
+        store.send(1, 2, 'hola')
+        store.send(2, 1, 'que tal')
+        assert (store.flush() == 2) and (len(store) == 0)
+        assert (count('chats') == 2) and (count('conversations') == 1)
+
+        # Failed flush test, the summary upsert fails after the messages got inserted
+        store.send(1, 2, 'adios')
+        store.send(1, 3, 'hola')
+        db.query('CREATE TEMP TRIGGER fail BEFORE INSERT ON conversations BEGIN SELECT RAISE(ABORT, \'fail\'); END;')
+        try:
+            store.flush()
+            assert False, 'Flush did not fail'
+        except QueryError:
+            pass
+        assert (len(store) == 2) and (count('chats') == 2) and (count('conversations') == 1)
+
+        # Retried flush test
+        db.query('DROP TRIGGER fail;')
+        assert (store.flush() == 2) and (len(store) == 0)
+        assert (count('chats') == 4) and (count('conversations') == 2)
+        assert [m['content'] for m in store.history(1, 2)] == ['adios', 'que tal', 'hola']
+        db.close()
+
+# If executing as a script
+if (__name__ == '__main__'):
+    tests()
@@ -2,18 +2,21 @@ from typing import Self
 from utils.decorators import readonly, memoize
 from .exceptions import *
 
-@readonly(attrs={'__tables'})
+@readonly(attrs={'__tables', '__auto_vacuum'})
 class Schema:
     """
     Manages a SQL database schema and its relation to a database
     """
-    def __init__(self, *tables: dict, check: bool=True) -> None:
+    AUTO_VACUUM: dict[str, int] = {'NONE': 0, 'FULL': 1, 'INCREMENTAL': 2}
+
+    def __init__(self, *tables: dict, check: bool=True, auto_vacuum: str | None=None) -> None:
         """
         Schema object constructor
 
         :param tables: (*dict) Vararg of table dicts
         :param check: (bool) Whether to check if the tables are well-formed
-        :raises SchemaError: When check is True and the schema is not valid
+        :param auto_vacuum: (str | None) Auto vacuum mode ('NONE', 'FULL' or 'INCREMENTAL') set when applying the schema, defaults to leaving it untouched
+        :raises SchemaError: When check is True and the schema is not valid, or the auto vacuum mode is unknown
         """
         if check:
             # Check if schema is valid
@@ -21,7 +24,11 @@ class Schema:
             # Raise error if it is not
             if not is_valid:
                 raise SchemaError(fail)
+        # Check auto vacuum mode
+        if (auto_vacuum is not None) and not (auto_vacuum in type(self).AUTO_VACUUM):
+            raise SchemaError(f'Unknown auto vacuum mode \'{auto_vacuum}\'!')
         self.__tables: tuple[dict, ...] = tables
+        self.__auto_vacuum: str | None = auto_vacuum
 
     def __len__(self) -> int:
         """
@@ -53,13 +60,23 @@ class Schema:
         """
         return self.is_valid
 
-    def __str__(self) -> str:
+    @property
+    def tables(self) -> tuple[dict, ...]:
         """
-        Get a string representation of the schema
+        Get the table definitions of the schema
 
-        :returns: (str) String representation of the schema
+        :returns: (tuple[dict, ...]) The table dicts, in definition order
         """
-        return f'<Schema {id(self)}>' # Used for memoize
+        return self.__tables
+
+    @property
+    def auto_vacuum(self) -> str | None:
+        """
+        Get the auto vacuum mode of the schema
+
+        :returns: (str | None) The auto vacuum mode, None if left untouched
+        """
+        return self.__auto_vacuum
 
     @property
     def is_valid(self) -> bool:
@@ -95,6 +112,8 @@ class Schema:
         :raises ConnectionError: When applying a schema on a db with no connection
         :raises QueryError: When any query needed to apply the schema fails
         """
+        # Set auto vacuum mode
+        self.__set_auto_vacuum(db)
         # Loop trough tables
         for table in self.__tables:
             # Create and execute query
@@ -104,6 +123,72 @@ class Schema:
                 # Create and execute query
                 db.query(type(self)._cindex(table, index))
 
+    def migrate(self, db: 'Database') -> tuple[tuple[str, ...], tuple[tuple[str, str], ...]]:
+        """
+        Migrate a database to the schema by only adding what it lacks
+
+        Missing tables and indexes are created and missing columns are added to existing tables.
+        Nothing is ever dropped, so the rows already stored are kept. Existing rows get NULL,
+        or the column's DEFAULT, on added columns.
+
+        :param db: (Database) Database object to migrate
+        :returns: (tuple[tuple[str, ...], tuple[tuple[str, str], ...]]) Names of the created tables and (table, column) pairs of the added columns
+        :raises SchemaError: When a missing column cannot be added to an existing table
+        :raises ConnectionError: When migrating a db with no connection
+        :raises QueryError: When any query needed to migrate the schema fails
+        """
+        created, added = [], []
+        # Set auto vacuum mode
+        self.__set_auto_vacuum(db)
+        # Loop trough tables
+        for table in self.__tables:
+            # Columns the table already has
+            columns = {row['name'] for row in db.query(f'PRAGMA table_info({table['name']});').fetchall()}
+            if not columns:
+                # Create missing table
+                db.query(type(self)._ctable(table))
+                created.append(table['name'])
+            else:
+                # Add missing columns
+                for column in table['columns']:
+                    if not (column['name'] in columns):
+                        db.query(type(self)._ccolumn(table, column))
+                        added.append((table['name'], column['name']))
+            # Loop trough indexes if any
+            for index in table.get('indexes', ()):
+                # Create missing index
+                cs = db.query(f'SELECT count(*) FROM sqlite_master WHERE type=\'index\' AND name=?;', (index['name'],))
+                if not cs.fetchone()[0]:
+                    db.query(type(self)._cindex(table, index))
+        return tuple(created), tuple(added)
+
+    def is_empty(self, db: 'Database') -> bool:
+        """
+        Check if none of the schema tables exist on a database
+
+        :param db: (Database) Database object to check for
+        :returns: (bool) Whether the database has none of the tables
+        :raises ConnectionError: When checking on a db with no connection
+        :raises QueryError: When the query needed to check fails
+        """
+        cs = db.query(f'SELECT count(*) FROM sqlite_master \
+        WHERE type=\'table\' AND name IN ({','.join(['?']*len(self.__tables))});', tuple(table['name'] for table in self.__tables))
+        return not cs.fetchone()[0]
+
+    def __set_auto_vacuum(self, db: 'Database') -> None:
+        """
+        Set the auto vacuum mode of a database, if the schema has one
+
+        :param db: (Database) Database object to set the mode on
+        :raises ConnectionError: When acting on a db with no connection
+        :raises QueryError: When any query needed fails
+        """
+        if self.__auto_vacuum:
+            db.query(f'PRAGMA auto_vacuum={self.__auto_vacuum};')
+            # Mode only switches on empty files or trough a full vacuum
+            if (db.query('PRAGMA auto_vacuum;').fetchone()[0] != type(self).AUTO_VACUUM[self.__auto_vacuum]):
+                db.vacuum()
+
     def is_active(self, db: 'Database') -> bool:
         """
         Check if the schema is applied to a database
@@ -199,6 +284,20 @@ class Schema:
                                 cnames.append(column['name'])
                 return tuple(cnames)
 
+    @memoize
+    def get_ukeys(self, name: str) -> tuple[str, ...] | None:
+        """
+        Get the column names that are unique in a table, besides its primary keys
+
+        :param name: (str) Table name to get unique columns for
+        :returns: (tuple[str, ...] | None) Tuple with unique column names or None if table not found
+        """
+        # Loop trough tables
+        for table in self.__tables:
+            # If table name is the one we are looking for
+            if (table['name'] == name):
+                return tuple(column['name'] for column in table['columns'] if 'UNIQUE' in column.get('mods', ()))
+
     @memoize
     def get_erefs(self, name: str) -> tuple[tuple[str, str, str], ...] | None:
         """
@@ -336,6 +435,28 @@ class Schema:
         query[-1] = f', {''.join(pkeys)});'
         return ''.join(query)
 
+    @staticmethod
+    @memoize(size=16)
+    def _ccolumn(table: dict, column: dict) -> str:
+        """
+        Construct the SQL query adding a column of the table dict to an existing table
+
+        SQLite cannot add key columns, nor NOT NULL columns without a default, to a table with rows.
+
+        :param table: (dict) Table definition as a dict
+        :param column: (dict) Column in the table dict to create query for
+        :returns: (str) Constructed SQL column addition query
+        :raises SchemaError: When the column cannot be added to an existing table
+        """
+        mods = column.get('mods', ())
+        # Key columns need the table to be rebuilt
+        if any(('PRIMARY KEY' in mod) or ('UNIQUE' in mod) for mod in mods):
+            raise SchemaError(f'Key column \'{column['name']}\' cannot be added to existing table \'{table['name']}\'!')
+        # Existing rows need a value
+        if ('NOT NULL' in mods) and not any(mod.startswith('DEFAULT') for mod in mods):
+            raise SchemaError(f'NOT NULL column \'{column['name']}\' without a DEFAULT cannot be added to existing table \'{table['name']}\'!')
+        return f'ALTER TABLE {table['name']} ADD COLUMN {' '.join((column['name'], column['type'], *mods))};'
+
     @staticmethod
     @memoize(size=16)
     def _cindex(table: dict, index: dict) -> str:
@@ -0,0 +1,318 @@
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+from os import getpid
+from itertools import chain
+from threading import Lock, local
+from typing import Any, Callable, Iterable, Iterator, Type
+from .exceptions import *
+from .database import Database
+
+class ShardRouter:
+    """
+    Routes the objects of a database across several SQLite files
+
+    Objects are assigned to a shard by a stable hash of the value of their shard key column,
+    so an user and every post it publishes (both with an 'username' column) live in the same file.
+    Operations without a shard key fan out to every shard in parallel and merge their results.
+
+    SQLite only enforces UNIQUE columns inside each shard, so values of the other unique columns
+    get claimed in a table of the bound database by the shard key value owning them before being stored.
+    A value claimed by one shard key value cannot be stored by another one.
+    """
+    # Table of the bound database holding the claimed unique values
+    CLAIMS: str = 'shard_claims'
+
+    def __init__(self, n: int, key: str='username', workers: int | None=None) -> None:
+        """
+        ShardRouter object constructor
+
+        Shards are created when the router gets bound to its database.
+
+        :param n: (int) Number of shards, must be greater than one
+        :param key: (str) Name of the column used as shard key, defaults to 'username'
+        :param workers: (int | None) Maximum number of threads used on fan outs, defaults to one per shard
+        :raises ValueError: When the value of n is invalid
+        """
+        # Check n
+        if (n <= 1):
+            raise ValueError('Invalid \'n\' for shard router!')
+        # Set attributes
+        self.__n: int = n
+        self.__key: str = key
+        self.__workers: int = workers or n
+        self.__shards: tuple[Database, ...] = ()
+        self.__db: Database | None = None
+        self.__executor: ThreadPoolExecutor | None = None
+        self.__lock: Lock = Lock()
+        self.__local: local = local()
+        # Process the threads belong to
+        self.__pid: int = getpid()
+
+    def __len__(self) -> int:
+        """
+        Get the length of the router
+
+        The length of the router is its number of shards.
+
+        :returns: (int) The router length
+        """
+        return self.__n
+
+    def __iter__(self) -> Iterator[Database]:
+        """
+        Get an iterator for the shards
+
+        :returns: (Iterator[Database]) The iterator for the shards
+        """
+        return self.__shards.__iter__() # Delegates work to tuple
+
+    @property
+    def key(self) -> str:
+        """
+        Get the shard key column
+
+        :returns: (str) The shard key column name
+        """
+        return self.__key
+
+    @property
+    def shards(self) -> tuple[Database, ...]:
+        """
+        Get the shards
+
+        :returns: (tuple[Database, ...]) The shard databases, in index order
+        """
+        return self.__shards
+
+    def bind(self, db: Database) -> None:
+        """
+        Bind the router to a database, creating its shards
+
+        Shards share the database schema, directory and key, and are named '<id>_<index>'.
+        Object hooks called by the shards get passed the bound database instead.
+
+        :param db: (Database) Database that consults the router
+        :raises PathError: When the database directory is not an existing directory
+        """
+        self.__db = db
+        self.__shards = tuple(Database(f'{db.id}_{i}', db.schema, db.directory, parent=db, key=db.key) for i in range(self.__n))
+
+    def setup(self, reset: bool=False) -> None:
+        """
+        Create the table of claimed unique values in the bound database
+
+        When the table gets created the values already stored in the shards are claimed,
+        the first shard storing a value keeps it.
+
+        :param reset: (bool) Whether to drop the claims first, used when the shards get dropped too, defaults to False
+        :raises ConnectionError: When acting on a database with no connection
+        :raises QueryError: When any underlying query operation fails
+        """
+        claims = type(self).CLAIMS
+        if reset:
+            self.__db.query(f'DROP TABLE IF EXISTS {claims};')
+        # Already set up
+        if self.__db.query(f'SELECT count(*) FROM sqlite_master WHERE type=\'table\' AND name=\'{claims}\';').fetchone()[0]:
+            return
+        self.__db.query(f'CREATE TABLE {claims} (tbl TEXT NOT NULL, col TEXT NOT NULL, value NOT NULL, owner NOT NULL, PRIMARY KEY(tbl, col, value));')
+        # Claim stored values
+        for table in self.__db.schema.tables:
+            columns = [column for column in self.__db.schema.get_ukeys(table['name']) if (column != self.__key)]
+            if columns and (self.__key in self.__db.schema.get_nkeys(table['name'])):
+                for db in self.__shards:
+                    for column in columns:
+                        rows = db.query(f'SELECT {self.__key}, {column} FROM {table['name']} WHERE {column} IS NOT NULL;').fetchall()
+                        self.__db.query_many(f'INSERT OR IGNORE INTO {claims} VALUES (?, ?, ?, ?);', [(table['name'], column, row[1], row[0]) for row in rows])
+
+    def claimed(self, table: str) -> tuple[str, ...]:
+        """
+        Get the columns of a table whose values get claimed across shards
+
+        :param table: (str) Table to get the columns of
+        :returns: (tuple[str, ...]) Unique columns of the table other than the shard key
+        """
+        return tuple(column for column in (self.__db.schema.get_ukeys(table) or ()) if (column != self.__key))
+
+    def claim(self, table: str, data: dict[str, Any], columns: Iterable[str] | None=None) -> list[tuple[str, str, Any, Any]]:
+        """
+        Claim the unique values of a row for its shard key value before storing it
+
+        Values already claimed by the same shard key value are kept. Every value gets claimed or none does,
+        in a single transaction on the bound database. Claims made are returned so they can be undone
+        if the row never gets written, the values it held before get released once it does.
+        Rows without a shard key value are not checked.
+
+        :param table: (str) Table the row is stored in
+        :param data: (dict[str, Any]) Column values of the row, as stored
+        :param columns: (Iterable[str] | None) Columns to claim the values of, only the ones that change need to be, defaults to every claimed column
+        :returns: (list[tuple[str, str, Any, Any]]) The (table, column, value, owner) claims made
+        :raises QueryError: When a value is claimed by another shard key value, or any underlying query operation fails
+        """
+        claims, owner, made = type(self).CLAIMS, data.get(self.__key), []
+        if owner is None:
+            return made
+        with self.__db.transaction():
+            for column in (self.claimed(table) if (columns is None) else columns):
+                if (data.get(column) is None):
+                    continue
+                parameters = (table, column, data[column], owner)
+                if self.__db.query(f'INSERT OR IGNORE INTO {claims} VALUES (?, ?, ?, ?);', parameters).rowcount:
+                    made.append(parameters)
+                # Owned by someone else
+                elif (self.__db.query(f'SELECT owner FROM {claims} WHERE tbl=? AND col=? AND value=?;', parameters[:3]).fetchone()[0] != owner):
+                    raise QueryError(f'UNIQUE constraint failed: {table}.{column}', f'CLAIM {table}.{column}', parameters)
+        return made
+
+    def unclaim(self, claims: Iterable[tuple[str, str, Any, Any]]) -> None:
+        """
+        Undo claims of rows that could not be written
+
+        :param claims: (Iterable[tuple[str, str, Any, Any]]) The (table, column, value, owner) claims, as returned by claim
+        :raises QueryError: When any underlying query operation fails
+        """
+        self.__db.query_many(f'DELETE FROM {type(self).CLAIMS} WHERE tbl=? AND col=? AND value=? AND owner=?;', claims)
+
+    def release(self, table: str, data: dict[str, Any], columns: Iterable[str] | None=None) -> None:
+        """
+        Release the unique values of a deleted row, or the previous values of an updated one
+
+        :param table: (str) Table the row was stored in
+        :param data: (dict[str, Any]) Column values of the row, as stored
+        :param columns: (Iterable[str] | None) Columns to release the values of, defaults to every claimed column
+        :raises QueryError: When any underlying query operation fails
+        """
+        if (owner := data.get(self.__key)) is None:
+            return
+        self.unclaim([(table, column, data[column], owner) for column in (self.claimed(table) if (columns is None) else columns) if (data.get(column) is not None)])
+
+    def index(self, value: Any) -> int:
+        """
+        Get the shard index for a shard key value
+
+        The hash is stable across processes and runs, unlike the builtin hash.
+
+        :param value: (Any) Shard key value
+        :returns: (int) Index of the shard that owns the value
+        """
+        return int.from_bytes(blake2b(str(value).encode(), digest_size=8).digest(), 'big') % self.__n
+
+    def shard(self, value: Any) -> Database:
+        """
+        Get the shard for a shard key value
+
+        :param value: (Any) Shard key value
+        :returns: (Database) Shard that owns the value
+        """
+        return self.__shards[self.index(value)]
+
+    def shard_for(self, obj: Any, cdata: dict[str, Any]={}) -> Database:
+        """
+        Get the shard for a previously subscribed object
+
+        :param obj: (Any) Object instance to route
+        :param cdata: (dict[str, Any]) Optional dictionary with keys as column names and values as data which overwrites object data
+        :returns: (Database) Shard that owns the object
+        :raises SubscriptionError: When the object has no shard key column mapped
+        """
+        # Overwritten key value
+        if (self.__key in cdata):
+            return self.shard(cdata[self.__key])
+        # Loop trough mro looking for the mapped key
+        for cl in type(obj).__mro__:
+            if (attr := getattr(cl, '__db__', {}).get('__map__', {}).get(self.__key)):
+                return self.shard(getattr(obj, attr, None))
+        raise SubscriptionError(f'Object {obj} has no \'{self.__key}\' column to be routed by!')
+
+    def retrieve[C](self, cls: Type[C], cdata: dict[str, Any]={}) -> Iterator[C]:
+        """
+        Retrieve a previously subscribed object type from the shards
+
+        Constrained by shard key it reads a single shard, else it reads all shards in parallel.
+
+        :param cls: (Type[C]) Object type to retrieve
+        :param cdata: (dict[str, Any]) Optional dictionary with keys as column names and values as data to use as select constraints
+        :returns: (Iterator[C]) Iterator that iterates the object type resulting instances
+        :raises SubscriptionError: When the object type is not subscribed or subscribed incorrectly
+        :raises ConnectionError: When trying to retrieve from a shard without a connection to its file
+        :raises QueryError: When any underlying query operation fails
+        """
+        if (self.__key in cdata):
+            return self.shard(cdata[self.__key]).retrieve(cls, cdata)
+        # Merge shard results in shard order
+        return chain.from_iterable(self.fan_out(lambda db: list(db.retrieve(cls, cdata))))
+
+    def fan_out[O](self, func: Callable[[Database], O]) -> list[O]:
+        """
+        Call a function on every shard in parallel
+
+        SQLite releases the GIL while it works, so shard queries overlap.
+        Nested fan outs, made from hooks running on a fan out, run sequentially to never starve the pool.
+
+        :param func: (Callable[[Database], O]) Function to call with each shard
+        :returns: (list[O]) Results of the calls, in shard order
+        """
+        # Threads of the parent process do not exist in a forked child
+        if (self.__pid != getpid()):
+            self.after_fork()
+        # Already inside a fan out
+        if getattr(self.__local, 'worker', False):
+            return [func(db) for db in self.__shards]
+        # Create pool lazily
+        with self.__lock:
+            if not self.__executor:
+                self.__executor = ThreadPoolExecutor(self.__workers, thread_name_prefix='shard')
+        # Mark worker threads while they run
+        def _work(db: Database) -> O:
+            self.__local.worker = True
+            try:
+                return func(db)
+            finally:
+                self.__local.worker = False
+        return list(self.__executor.map(_work, self.__shards))
+
+    def shutdown(self) -> None:
+        """
+        Stop the fan out threads
+
+        If there are no threads the operation fails silently.
+        """
+        with self.__lock:
+            if self.__executor:
+                self.__executor.shutdown(wait=True)
+                self.__executor = None
+
+    def after_fork(self) -> None:
+        """
+        Forget the fan out threads and locks inherited from the parent process
+
+        A forked child only has the thread that forked, so the inherited pool would never run work
+        and the inherited lock could be held forever. Both get recreated lazily in the child.
+        Shards handle their own connections. If not in a forked child the operation fails silently.
+        """
+        if (self.__pid == getpid()):
+            return
+        self.__executor = None
+        self.__lock = Lock()
+        self.__local = local()
+        self.__pid = getpid()
+
+    def to_global(self, index: int, id: int) -> int:
+        """
+        Get the global id of a shard local row id
+
+        Row ids are only unique inside each shard, global ids are unique across all of them.
+
+        :param index: (int) Index of the shard
+        :param id: (int) Shard local row id
+        :returns: (int) Global id
+        """
+        return id * self.__n + index
+
+    def to_local(self, id: int) -> tuple[int, int]:
+        """
+        Get the shard index and shard local row id of a global id
+
+        :param id: (int) Global id
+        :returns: (tuple[int, int]) Shard index and shard local row id
+        """
+        return id % self.__n, id // self.__n
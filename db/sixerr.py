@@ -1,15 +1,30 @@
+from os import environ
+from typing import Iterable
 from utils.meta import Singleton
 from .database import Database
 from .schema import Schema
+from .blobs import BlobStore
+from .messages import MessageStore
+from .sharding import ShardRouter
 
 class SixerrDB(Database, metaclass=Singleton):
     """
     Manages the Sixerr SQL database and its schema as a Singleton
     """
-    def __init__(self) -> None:
+    def __init__(self, shards: int | None=None, key: bytes | None=None) -> None:
         """
         Sixerr database object constructor
+
+        Users and posts get sharded by username across several files when there is more than one shard,
+        every other table stays in the main file.
+
+        :param shards: (int | None) Number of shards, defaults to the SIXERR_SHARDS environment variable or 1
+        :param key: (bytes | None) Key of the encrypted columns [256bit], defaults to the hex SIXERR_KEY environment variable or plaintext storage
         """
+        # Number of shards
+        shards = int(environ.get('SIXERR_SHARDS', 1)) if (shards is None) else shards
+        # Encryption key
+        key = bytes.fromhex(environ['SIXERR_KEY']) if ((key is None) and environ.get('SIXERR_KEY')) else key
         super().__init__(
             'Sixerr',
             Schema(
@@ -23,7 +38,7 @@ class SixerrDB(Database, metaclass=Singleton):
                         {'name': 'email', 'type': 'TEXT', 'mods': ('UNIQUE', 'NOT NULL')},
                         {'name': 'money', 'type': 'INTEGER'},
                         {'name': 'phone', 'type': 'TEXT'},
-                        {'name': 'image', 'type': 'BLOB'},
+                        {'name': 'image', 'type': 'TEXT'}, # Digest in images
                     )
                 },
                 {
@@ -66,10 +81,11 @@ class SixerrDB(Database, metaclass=Singleton):
                         {'name': 'fecha', 'type': 'TEXT', 'mods': ('NOT NULL',)},
                         {'name': 'category', 'type': 'TEXT'},
                         {'name': 'description', 'type': 'TEXT'},
-                        {'name': 'image', 'type': 'BLOB'},
+                        {'name': 'image', 'type': 'TEXT'}, # Digest in images
                     ),
                     'indexes': (
                         {'name': 'posts_id', 'columns': ('id',)},
+                        {'name': 'posts_username', 'columns': ('username',)},
                     )
                 },
                 {
@@ -94,22 +110,119 @@ class SixerrDB(Database, metaclass=Singleton):
                         {'name': 'user1', 'type': 'INTEGER', 'mods': ('PRIMARY KEY', 'REFERENCES users(id)')},
                         {'name': 'user2', 'type': 'INTEGER', 'mods': ('PRIMARY KEY', 'REFERENCES users(id)')},
                         {'name': 'msg_id', 'type': 'INTEGER', 'mods': ('PRIMARY KEY',)},
+                        {'name': 'sender', 'type': 'INTEGER', 'mods': ('NOT NULL', 'DEFAULT 0')}, # 0 on messages from older versions
+                        {'name': 'fecha', 'type': 'TEXT', 'mods': ('NOT NULL', "DEFAULT ''")},
                         {'name': 'content', 'type': 'TEXT', 'mods': ('NOT NULL',)},
-                        {'name': 'image', 'type': 'BLOB'},
+                        {'name': 'image', 'type': 'TEXT'}, # Digest in images
+                    )
+                },
+                {
+                    'name': 'conversations',
+                    'columns': (
+                        {'name': 'user1', 'type': 'INTEGER', 'mods': ('PRIMARY KEY', 'REFERENCES users(id)')},
+                        {'name': 'user2', 'type': 'INTEGER', 'mods': ('PRIMARY KEY', 'REFERENCES users(id)')},
+                        {'name': 'last_msg', 'type': 'INTEGER', 'mods': ('NOT NULL',)},
+                        {'name': 'sender', 'type': 'INTEGER', 'mods': ('NOT NULL',)},
+                        {'name': 'fecha', 'type': 'TEXT', 'mods': ('NOT NULL',)},
+                        {'name': 'preview', 'type': 'TEXT'},
+                    ),
+                    'indexes': (
+                        {'name': 'conversations_user2', 'columns': ('user2', 'user1')},
+                    )
+                },
+                {
+                    'name': 'images',
+                    'columns': (
+                        {'name': 'id', 'type': 'INTEGER', 'mods': ('PRIMARY KEY',)},
+                        {'name': 'digest', 'type': 'TEXT', 'mods': ('UNIQUE',)},
+                        {'name': 'size', 'type': 'INTEGER', 'mods': ('NOT NULL',)},
+                        {'name': 'data', 'type': 'BLOB', 'mods': ('NOT NULL',)},
                     )
-                }
-            )
+                },
+                auto_vacuum='INCREMENTAL'
+            ),
+            router=ShardRouter(shards) if (shards > 1) else None,
+            key=key
         )
+        # Out of row image contents
+        self.images: BlobStore = BlobStore(self, 'images', refs=(('users', 'image'), ('posts', 'image'), ('chats', 'image')))
+        # Chat messages between users
+        self.messages: MessageStore = MessageStore(self, 'chats', 'conversations')
+
+    def close(self) -> None:
+        """
+        Closes the connection to the database file
+
+        Appends any buffered chat message before closing.
+        If there is no currently open connection it fails silently.
+
+        :raises ConnectionError: When there is an error when closing the connection to the database file
+        """
+        # Flush buffered messages first
+        if self.is_open and getattr(self, 'messages', None):
+            self.messages.flush()
+        super().close()
+
+    def sinit(self) -> tuple[tuple[str, ...], tuple[tuple[str, str], ...]]:
+        """
+        Initializes the database softly
+
+        Databases created by older versions are migrated, their inline images get moved into the image store
+        and their conversation summaries get built from the existing messages.
+
+        :returns: (tuple[tuple[str, ...], tuple[tuple[str, str], ...]]) Names of the tables created by a migration and (table, column) pairs of the columns it added
+        :raises SchemaError: When the database cannot be migrated to the schema
+        :raises EncryptionError: When the key is missing or is not the one the encrypted columns were stored with
+        :raises ConnectionError: When schema-operation derived queries act on a db with no connection
+        :raises QueryError: When schema-operation derived queries fail
+        """
+        changes = super().sinit()
+        # Images kept inline by older versions
+        self.images.adopt()
+        # Conversations of older versions
+        if ('conversations' in changes[0]):
+            self.messages.backfill()
+        return changes
 
     def get_user(self, user: 'User') -> int:
         """
         Gets the id of a user from the database
 
+        When sharded the id is global, unique across all shards.
+
         :param user: ('User') The user to get the id for.
         :returns: (int) The user's id.
         """
+        if self.router:
+            index = self.router.index(user._username)
+            row = self.router.shards[index].query('SELECT id FROM users WHERE username=?', (user._username,)).fetchone()
+            return self.router.to_global(index, row['id'])
         return self.query('SELECT id FROM users WHERE username=?', (user._username,)).fetchone()['id']
 
+    def get_usernames(self, ids: Iterable[int]) -> dict[int, str]:
+        """
+        Gets the usernames of several users from the database in a single query
+
+        :param ids: (Iterable[int]) The ids of the users.
+        :returns: (dict[int, str]) The usernames by user id, missing ids are left out.
+        """
+        ids = tuple(set(ids))
+        if not ids:
+            return {}
+        if self.router:
+            # Group global ids by shard
+            locals: dict[int, dict[int, int]] = {}
+            for id in ids:
+                index, lid = self.router.to_local(id)
+                locals.setdefault(index, {})[lid] = id
+            usernames = {}
+            for index, lids in locals.items():
+                cs = self.router.shards[index].query(f'SELECT id, username FROM users WHERE id IN ({','.join(['?']*len(lids))})', tuple(lids))
+                usernames |= {lids[row['id']]: row['username'] for row in cs.fetchall()}
+            return usernames
+        cs = self.query(f'SELECT id, username FROM users WHERE id IN ({','.join(['?']*len(ids))})', ids)
+        return {row['id']: row['username'] for row in cs.fetchall()}
+
 if __name__ == '__main__':
     db = SixerrDB()
     db.sinit()
\ No newline at end of file
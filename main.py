@@ -1,4 +1,4 @@
-from flask import Flask, request, send_file, Response, jsonify
+from flask import Flask, request, send_file, Response, jsonify, g
 from flask_jwt_extended import (JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt)
 
 from post.demand import Demand
@@ -6,11 +6,17 @@ from user import User
 from user.admin import Admin
 from user.freelancer import Freelancer
 from user.consumer import Consumer
-from utils.crypto import hash_str
 from typing import Any, Union
 from post.offer import Offer
 from post.generic_posts import Post
-from db import SixerrDB
+from db import SixerrDB, Maintenance
+from utils.metrics import REGISTRY
+from utils.decorators import singleflight
+from utils.scheduler import Scheduler
+from utils.executor import AUTH_EXECUTOR, Overloaded
+from utils.memory import container_size, memoized_size, TRACKER
+from time import perf_counter, time
+import atexit
 import user as _user
 
 class WrongPass(Exception):
@@ -37,6 +43,8 @@ class RestrictionPermission(Exception):
 class App:
     def __init__(self) -> None:
         self.flask = Flask(__name__)
+        # Closed on exit, not on collection, which may happen while finalizing
+        atexit.register(self.close)
         self.db = SixerrDB()
         self.db.sinit()
         # Retrieve users
@@ -46,16 +54,30 @@ class App:
 
         self.flask.config["JWT_SECRET_KEY"] = "super-secret"
         self.jwt = JWTManager(self.flask)
-
-    def __del__(self) -> None:
-        self.close()
+        # Periodic work, on a single background thread
+        self.scheduler = Scheduler()
+        # Reclaim space left by deletions while idle
+        self.maintenance = Maintenance(self.db, collectors=(self.db.images.collect,))
+        self.scheduler.schedule(self.maintenance.run_once, 5.0, name='maintenance', fixed_rate=False)
+        # Append buffered chat messages even when no new ones arrive
+        self.scheduler.schedule(self.db.messages.flush, self.db.messages.delay, name='messages')
+        self.scheduler.start()
 
     def close(self) -> None:
         # -> We dont do it as they get saved on creation and edit
         # Store users
         #for user in User.usuarios.values():
         #    self.db.store(user)
-        pass
+        # Parts may be missing if __init__ failed, and close may run twice
+        # Interrupt vacuuming, then let the running job finish
+        if (maintenance := getattr(self, 'maintenance', None)):
+            maintenance.stop()
+        if (scheduler := getattr(self, 'scheduler', None)):
+            scheduler.stop()
+        AUTH_EXECUTOR.shutdown()
+        # Append buffered messages and commit
+        if (db := getattr(self, 'db', None)):
+            db.close()
 
     def run(self, *args, **kwargs):
         self.flask.run(*args, **kwargs)
@@ -63,6 +85,34 @@ class App:
 
 app = App()
 
+@app.flask.before_request
+def iniciar_medicion() -> None:
+    """
+    Records the start time of every request, used to measure its latency.
+    """
+    g.inicio = perf_counter()
+
+@app.flask.after_request
+def registrar_medicion(response: Response) -> Response:
+    """
+    Records the latency and status code of every request in the metrics registry, per endpoint.
+
+    Parameters
+    ----------
+    response : Response
+        The response being sent.
+
+    Returns
+    -------
+    Response
+        The same response, untouched.
+    """
+    labels = {'endpoint': request.endpoint or 'desconocido', 'method': request.method}
+    if 'inicio' in g:
+        REGISTRY.histogram('http_request_seconds', 'Latency of the requests per endpoint', labels).observe(perf_counter() - g.inicio)
+    REGISTRY.counter('http_requests_total', 'Number of requests per endpoint and status code', {**labels, 'status': str(response.status_code)}).inc()
+    return response
+
 @app.flask.route('/signup', methods=['POST'])
 def signup() -> tuple[str, int]:
     """
@@ -77,6 +127,7 @@ def signup() -> tuple[str, int]:
             - 200: Successful registration
             - 409: Username already exists or password is not secure enough
             - 404: Account type does not exist
+            - 503: Too many passwords being hashed, try again later
     """
     account = request.args.get('account')
     if account in User.usuarios.keys():
@@ -103,9 +154,23 @@ def signup() -> tuple[str, int]:
             return f'Por Favor verifica que tu password contiene al menos 8 caracteres, Una mayuscula, una minuscula, un simbolo y un numero',409
         except ValueError as e:
             return f'{e}',409
+        except Overloaded:
+            return f'Servidor saturado, vuelve a intentarlo mas tarde',503
+
 
+# JTI of revoked tokens with their expiration timestamp
+revoked_tokens: dict[str, int] = {}
 
-revoked_tokens = set()
+def expirar_tokens() -> None:
+    """
+    Forgets revoked tokens once they expire, as expired tokens are rejected anyway.
+    """
+    ahora = time()
+    for jti, exp in list(revoked_tokens.items()):
+        if exp < ahora:
+            revoked_tokens.pop(jti, None)
+
+app.scheduler.schedule(expirar_tokens, 60.0, name='revoked_tokens', jitter=5.0)
 
 @app.flask.route('/login', methods=['GET'])
 def login() -> tuple[str, int]:
@@ -121,10 +186,15 @@ def login() -> tuple[str, int]:
         (message, status_code) tuple. Status code can be:
             - 200: Successful login and JWT token is created
             - 401: User or password given is incorrect
+            - 503: Too many passwords being hashed, try again later
     """
     usuario=request.args.get('usuario')
     password=request.args.get('password')
-    if usuario in User.usuarios.keys() and User.usuarios[usuario].password==hash_str(password):
+    try:
+        correcto = usuario in User.usuarios.keys() and User.usuarios[usuario].password==User.hash_password(password)
+    except Overloaded:
+        return f'Servidor saturado, vuelve a intentarlo mas tarde',503
+    if correcto:
         status_code = 200 if isinstance(User.usuarios[usuario], Consumer) \
             else 201 if isinstance(User.usuarios[usuario], Freelancer) else 202
         return create_access_token(identity=usuario), status_code
@@ -199,6 +269,8 @@ def borrar_cuenta_actual()-> tuple[str, int]:
         if User.usuarios[usuario].posts:
             return f'No se ha Borrado Tu cuenta Debido a que tienes posts',409
         else:
+            # Chats go with the account
+            app.db.messages.forget(app.db.get_user(User.usuarios[usuario]))
             app.db.delete(User.usuarios[usuario])
             suser = User.usuarios[usuario]
             match type(suser):
@@ -229,19 +301,22 @@ def cambiar_password() -> tuple[str, int]:
         (message, status_code) tuple. Status code can be:
             - 200: Password changed
             - 404: User not found or password is not secure enough
+            - 503: Too many passwords being hashed, try again later
     """
     usuario = get_jwt_identity()
 
     old_pass=request.args.get('oldpass')
     new_pass=request.args.get('newpass')
     try:
-        if User.usuarios[usuario].password==hash_str(old_pass) and User.secure_password(new_pass):
+        if User.usuarios[usuario].password==User.hash_password(old_pass) and User.secure_password(new_pass):
             User.usuarios[usuario].password=new_pass
             return f'Se ha cambiado tu password de forma correcta', 200
         else:
             raise WrongPass(usuario)
     except WrongPass as wrong:
         return f'{wrong}'+f' / O el nuevo password no sigue los creterios establecidos', 404
+    except Overloaded:
+        return f'Servidor saturado, vuelve a intentarlo mas tarde',503
 
 
 @app.flask.route('/metodo_pago', methods=['PUT'])
@@ -277,7 +352,7 @@ def logout() -> tuple[str, int]:
     """
     Revokes a JWT token, making a logout.
 
-    Reads JWT token from request argument and adds it's JTI to 'revoked_tokens' set to mark it as revoked.
+    Reads JWT token from request argument and adds it's JTI to 'revoked_tokens' to mark it as revoked until it expires.
 
     Returns
     -------
@@ -285,8 +360,8 @@ def logout() -> tuple[str, int]:
         (message, status_code) tuple. Status code can be:
             - 200: Logout successful
     """
-    jti = get_jwt()["jti"]
-    revoked_tokens.add(jti)
+    jwt = get_jwt()
+    revoked_tokens[jwt["jti"]] = jwt["exp"]
     return 'Token revocado', 200
 
 @app.jwt.token_in_blocklist_loader
@@ -683,6 +758,8 @@ def admin_user_delete() -> tuple[str, int]:
         elif usertodelete not in User.usuarios:
             return f'No Existe {usertodelete} en nuestra base de datos',404
         else:
+            # Chats go with the account
+            app.db.messages.forget(app.db.get_user(User.usuarios[usertodelete]))
             Admin.delete_user(usertodelete)
             return f'The Account {usertodelete} Has been deleted',200
     except RestrictionPermission as e:
@@ -740,8 +817,19 @@ def feed() -> tuple[Response, int]:
             - 200: Operation succed
 
     """
-    response = {**Offer.offer_feed, **Demand.demand_feed}
-    return jsonify(response), 200
+    return Response(serializar_feed(), mimetype='application/json'), 200
+
+@singleflight
+def serializar_feed() -> str:
+    """
+    Serializes the feed into JSON. Concurrent requests share a single serialization.
+
+    Returns
+    -------
+    str
+        The offers and demands of the feed as a JSON object.
+    """
+    return app.flask.json.dumps({**Offer.offer_feed, **Demand.demand_feed})
 
 @app.flask.route('/money', methods=['PUT'])
 @jwt_required()
@@ -818,3 +906,149 @@ def admin_delete_post() -> tuple[str, int]:
 
     except RestrictionPermission as e:
         return str(e), 401
+
+@app.flask.route('/chat', methods=['POST'])
+@jwt_required()
+def enviar_mensaje() -> tuple[str, int]:
+    """
+    Sends a message to another user. Requires a JWT Token.
+
+    Reads the receiving user and the message from request arguments.
+
+    Returns
+    -------
+    Tuple[str, int]
+        (message, status_code) tuple. Status code can be:
+            - 200: Message sent
+            - 404: Receiving user not found
+            - 409: Empty message
+    """
+    current_user = get_jwt_identity()
+    tuser = request.args.get('tuser')
+    mensaje = request.args.get('mensaje')
+    if tuser not in User.usuarios:
+        return f'No existe el usuario {tuser} en nuestra base de datos', 404
+    if not mensaje:
+        return 'El mensaje no puede estar vacio', 409
+    msg_id = app.db.messages.send(app.db.get_user(User.usuarios[current_user]), app.db.get_user(User.usuarios[tuser]), mensaje)
+    return f'Mensaje {msg_id} enviado a {tuser}', 200
+
+@app.flask.route('/chat', methods=['GET'])
+@jwt_required()
+def ver_mensajes() -> tuple[Response, int] | tuple[str, int]:
+    """
+    Returns a page of the conversation with another user, newest messages first, and marks it as read.
+    Requires a JWT Token.
+
+    Reads the other user, and optionally 'before' (message id) and 'limit', from request arguments.
+
+    Returns
+    -------
+    Tuple[Response, int]
+        (list, status_code) tuple. Status code can be:
+            - 200: Messages given
+            - 400: 'before' or 'limit' are not integers
+            - 404: User not found
+    """
+    current_user = get_jwt_identity()
+    tuser = request.args.get('tuser')
+    if tuser not in User.usuarios:
+        return f'No existe el usuario {tuser} en nuestra base de datos', 404
+    try:
+        before = int(request.args['before']) if ('before' in request.args) else None
+        # Between 1 and 200 messages, a negative LIMIT is unbounded in SQLite
+        limit = max(1, min(int(request.args.get('limit', 50)), 200))
+    except ValueError:
+        return '\'before\' y \'limit\' deben ser numeros enteros', 400
+    user_id, tuser_id = app.db.get_user(User.usuarios[current_user]), app.db.get_user(User.usuarios[tuser])
+    mensajes = app.db.messages.history(user_id, tuser_id, before, limit)
+    app.db.messages.mark_read(user_id, tuser_id)
+    return jsonify(mensajes), 200
+
+@app.flask.route('/chat/inbox', methods=['GET'])
+@jwt_required()
+def ver_bandeja() -> tuple[Response, int]:
+    """
+    Returns the summary of every conversation of the user, with its unread messages count. Requires a JWT Token.
+
+    Returns
+    -------
+    Tuple[Response, int]
+        (list, status_code) tuple. Status code can be:
+            - 200: Inbox given
+    """
+    current_user = get_jwt_identity()
+    bandeja = app.db.messages.inbox(app.db.get_user(User.usuarios[current_user]))
+    nombres = app.db.get_usernames(conversacion['other'] for conversacion in bandeja)
+    for conversacion in bandeja:
+        conversacion['other'] = nombres.get(conversacion['other'], conversacion['other'])
+    return jsonify(bandeja), 200
+
+REGISTRY.gauge('sixerr_users', 'Number of users loaded in memory', func=lambda: len(User.usuarios))
+REGISTRY.gauge('sixerr_posts', 'Number of posts loaded in memory', func=lambda: sum(len(posts) for posts in Post.posts.values()))
+REGISTRY.gauge('sixerr_revoked_tokens', 'Number of revoked JWT tokens', func=lambda: len(revoked_tokens))
+
+@app.flask.route('/metrics', methods=['GET'])
+def metricas() -> tuple[Response, int]:
+    """
+    Returns every application metric in the Prometheus text format: request latency percentiles and counts per endpoint,
+    database query, hashing and export timings, and in-memory registry sizes.
+
+    Returns
+    -------
+    Tuple[Response, int]
+        (metrics, status_code) tuple. Status code can be:
+            - 200: Metrics given
+    """
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8'), 200
+
+@app.flask.route('/admin/memory', methods=['GET'])
+@jwt_required()
+def memoria() -> tuple[Response, int] | tuple[str, int]:
+    """
+    Reports the memory used by every in-process registry: users, posts, feeds, revoked tokens and memoization caches.
+    Admin only. Sizes are deep sizes estimated from a random sample of each registry's entries, objects shared between
+    registries get counted in each of them.
+
+    Optionally traces allocations with tracemalloc: 'traza=1' starts tracing, 'traza=0' stops it, and while tracing
+    every call reports the code lines whose allocations changed the most since the previous call.
+
+    Returns
+    -------
+    Tuple[Response, int] | Tuple[str, int]
+        (report, status_code) tuple. Status code can be:
+            - 200: Report given
+            - 400: 'muestra' is not a positive integer
+            - 401: Restricted Permision (Only for Admins)
+    """
+    current_user = get_jwt_identity()
+    current_account = User.usuarios.get(current_user)
+    try:
+        if not isinstance(current_account, Admin):
+            raise RestrictionPermission(type(current_account).__name__)
+    except RestrictionPermission as e:
+        return str(e), 401
+    try:
+        muestra = int(request.args.get('muestra', 256))
+        if (muestra < 1):
+            raise ValueError(muestra)
+    except ValueError:
+        return '\'muestra\' debe ser un numero entero positivo', 400
+    match request.args.get('traza'):
+        case '1':
+            TRACKER.start()
+        case '0':
+            TRACKER.stop()
+    posts = [post for posts in list(Post.posts.values()) for post in posts]
+    informe = {
+        'registros': {
+            'User.usuarios': container_size(User.usuarios, muestra),
+            'Post.posts': {**container_size(posts, muestra), 'usuarios': len(Post.posts)},
+            'Offer.offer_feed': container_size(Offer.offer_feed, muestra),
+            'Demand.demand_feed': container_size(Demand.demand_feed, muestra),
+            'revoked_tokens': container_size(revoked_tokens, muestra),
+        },
+        'memoize': memoized_size(),
+        'tracemalloc': TRACKER.diff() if TRACKER.tracing else None
+    }
+    return jsonify(informe), 200
@@ -4,6 +4,7 @@ from .offer import Offer
 from .demand import Demand
 from file_utils import CSVFile, Path
 from .exceptions import CorruptedFile
+from db import Database
 
 def import_post_csv(path: str | Path) -> Self:
     """
@@ -46,6 +47,6 @@ def import_post_csv(path: str | Path) -> Self:
             print(f.data)
             raise CorruptedFile(path, 'Incorrect post_type value')
     for key, value in zip(f.headers[:-1], f.data[:-1]):
-        obj.__dict__[key] = value
+        Database.assign(obj, key, value)
 
     return obj
\ No newline at end of file
@@ -33,6 +33,7 @@ class Demand(Post):
         Displays the complete information of the demand.
     """
 
+    __slots__ = ('urgency',)
     demand_feed: dict[str,dict[str,str]] = {}
     def __init__(self, title: str, description: str, user: str, image: Optional[str]=None, urgency: int=3) -> None:
         """
@@ -47,7 +48,7 @@ class Demand(Post):
         user : str
             User who creates the demand.
         image : str, optional
-            Image associated with the demand (default is None).
+            Path to the image file associated with the demand (default is None).
         urgency : int
             Level of urgency (e.g., from 1 to 5, where 5 is the highest urgency) (default is 3).
         """
@@ -116,7 +117,7 @@ class Demand(Post):
             title=self.title,
             description=self.description,
             user=self.user,
-            image=self.image,
+            image=self.export_image(tempdir),
             urgency=self.urgency,
             publication_date=self.publication_date,
             category=self.category
@@ -3,6 +3,7 @@ from typing import Optional, Self
 from datetime import datetime
 from file_utils import CSVFile, Path, XMLFile
 from db import Database, SixerrDB
+from utils.decorators import timed, singleflight
 import multiprocessing as mp
 import tempfile
 import zipfile
@@ -60,7 +61,7 @@ class Post(ABC):
     user : str
         User who creates the publication.
     image : str, optional
-        URL or path to the associated image (default is None).
+        Digest referencing the associated image in the database image store (default is None).
     publication_date : datetime.date
         Date when the content is published (default is the current date).
     category : str
@@ -76,6 +77,8 @@ class Post(ABC):
         Returns the associated category of a post.
     export_post() -> Path
         Exports all post's information into a CSV file
+    export_image(tempdir: str) -> str | None
+        Writes the associated image from the image store into a file
     import_post() -> Self
         Imports a post from a CSV file. (Must be implemented in subclasses)
     display_information() -> str
@@ -84,6 +87,9 @@ class Post(ABC):
         Returns a post instance by its title and publisher username
     """
 
+    # Attributes kept in slots, without a per instance dict
+    __slots__ = ('title', 'description', 'user', 'image', 'publication_date', 'category')
+
     allowed_categories = {
         "Mathematics", "Science", "Physics", "Chemistry", "Biology",
         "History", "Geography", "Literature", "Art", "Music",
@@ -105,12 +111,12 @@ class Post(ABC):
         user : str
             User who publishes the content.
         image : str, optional
-            Image associated with the publication (default is None).
+            Path to the image file associated with the publication, it gets streamed into the image store (default is None).
         """
         self.title = title
         self.description = description
         self.user = user
-        self.image = image
+        self.image = SixerrDB().images.put(image) if image else None
         self.publication_date = datetime.now().date().strftime('%Y/%m/%d')
         self.category = None
 
@@ -163,9 +169,10 @@ class Post(ABC):
         str
             Absolute System path to the file
         """
-        post_keys: list[str] = [key for key in self.__dict__.keys()]
+        fields = Database.fields(self)
+        post_keys: list[str] = [key for key in fields.keys()]
         post_keys.append('post_type')
-        post_values: list[str] = [value for value in self.__dict__.values()]
+        post_values: list[str] = [value for value in fields.values()]
         f = CSVFile(f'{tempdir}/Post.csv')
         if type(self).__name__ == 'Offer':
             post_values.append('Offer')
@@ -175,6 +182,26 @@ class Post(ABC):
         f.write(post_values)
         return f.path.absolute
 
+    def export_image(self, tempdir: str) -> str | None:
+        """
+        Writes the associated image from the image store into a file, chunk by chunk.
+
+        Parameters
+        ----------
+        tempdir: str
+            Directory to save the image file.
+
+        Returns
+        -------
+        str | None
+            Absolute system path to the image file, None if the post has no image.
+        """
+        if not self.image:
+            return None
+        path = Path(f'{tempdir}/Post.img')
+        SixerrDB().images.export(self.image, path.absolute)
+        return path.absolute
+
     @abstractmethod
     def export_post_pdf(self, tempdir) -> str:
         """
@@ -198,12 +225,14 @@ class Post(ABC):
         """
         f = XMLFile(f'{tempdir}/Post.xml')
         f.gen_tree('SixerrData')
-        data_dict = {'type': type(self).__name__, **self.__dict__,
+        data_dict = {'type': type(self).__name__, **Database.fields(self),
                      'publication_date': self.publication_date}
         f.write(data_dict)
         f.indent()
         return f.path.absolute
 
+    @singleflight # Concurrent exports of the same post share the file
+    @timed(name='export', labels={'kind': 'post'})
     def export_post(self) -> str:
         """
         Gets a post data and exports it to a ZIP file with a .csv, .pdf, and .xml files inside.
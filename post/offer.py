@@ -32,6 +32,7 @@ class Offer(Post):
     display_information() -> str
         Displays the complete information of the offer.
     """
+    __slots__ = ('price',)
     offer_feed: dict[str,dict[str,str]] = {}
     def __init__(self, title: str, description: str, user: str, image: Optional[str]=None, price: float=0) -> None:
         """
@@ -46,7 +47,7 @@ class Offer(Post):
         user : str
             User who publishes the offer.
         image : str, optional
-            Image associated with the offer.
+            Path to the image file associated with the offer.
         price : float
             Price of the offer (default is 0).
         """
@@ -104,7 +105,7 @@ class Offer(Post):
             title=self.title,
             description=self.description,
             user=self.user,
-            image=self.image,
+            image=self.export_image(tempdir),
             price=self.price,
             publication_date=self.publication_date,
             category=self.category
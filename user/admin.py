@@ -38,6 +38,7 @@ class Admin(User):
         Deletes a post by its name
 
     """
+    __slots__ = ()
     def __init__(self, username: str, nombre: str, password: str, email: str, telefono: str =None) -> None:
         """
            Initializes an User instance
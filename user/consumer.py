@@ -12,9 +12,9 @@ def _init(_self: 'Consumer', db: Database) -> None:
 
     In the process of external creation the object gets infused with data and outside initialized.
     """
-    _self.__dict__['servicios_contratados']: set[Offer] = set()
+    Database.assign(_self, 'servicios_contratados', set())
     for post in db.retrieve(Offer, {'contractor': SixerrDB().get_user(_self)}):
-        _self.__dict__['servicios_contratados'].add(post)
+        _self.servicios_contratados.add(post)
 
 def _store(_self: 'Consumer', db: Database) -> None:
     """
@@ -27,6 +27,7 @@ def _store(_self: 'Consumer', db: Database) -> None:
     db=SixerrDB(),
     table='consumers',
     map={'payment':'metodo_de_pago'},
+    encrypted=('payment',),
     init=_init, store=_store
 )
 class Consumer(User):
@@ -63,6 +64,7 @@ class Consumer(User):
         mostrar_info()->str
             En extended version of User Mostar info method, that shows informations about an consumer
         """
+    __slots__ = ('metodo_de_pago', 'servicios_contratados')
     def __init__(self, username: str, nombre: str, password: str, email: str, money: float = 0,telefono: str= None, metodo_de_pago: str = None) -> None:
         """
             Creates an instance of Consumer
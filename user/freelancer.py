@@ -12,14 +12,14 @@ def _init(_self, db) -> None:
 
     In the process of external creation the object gets infused with data and outside initialized.
     """
-    _self.__dict__['demandas_contratadas']: set[Demand] = set()
+    Database.assign(_self, 'demandas_contratadas', set())
     for post in db.retrieve(Demand, {'contractor': SixerrDB().get_user(_self)}):
-        _self.__dict__['demandas_contratadas'].add(post)
+        _self.demandas_contratadas.add(post)
 
-    if ('opiniones' in _self.__dict__) and (_self.__dict__['opiniones']):
-        _self.__dict__['opiniones'] = list(_self.__dict__['opiniones'])
+    if getattr(_self, 'opiniones', None):
+        Database.assign(_self, 'opiniones', list(_self.opiniones))
     else:
-        _self.__dict__['opiniones'] = []
+        Database.assign(_self, 'opiniones', [])
 
 def _store(_self, db) -> None:
     """
@@ -77,7 +77,7 @@ class Freelancer(User):
         mostrar_info() -> None
             Display the full public information about the freelancer
         """
-
+    __slots__ = ('habilidades', 'demandas_contratadas', 'opiniones', 'rating')
 
     def __init__(self, username:str, nombre:str, password:str, email:str, money:float = 0,telefono:str=None, habilidades:list[str]=None, opiniones: list[int]=None) -> None:
         """
@@ -1,4 +1,6 @@
 from utils import crypto as cy
+from utils.decorators import timed, singleflight
+from utils.executor import AUTH_EXECUTOR
 from abc import ABC, abstractmethod
 from typing import Self
 import multiprocessing as mp
@@ -24,7 +26,7 @@ def _init(_self, _) -> None:
     In the process of external creation the object gets infused with data and outside initialized.
     """
     User.usuarios[_self._username] = _self
-    _self.__dict__['posts']: set[Post] = set()
+    Database.assign(_self, 'posts', set())
 
 @Database.register(
     db=SixerrDB(),
@@ -37,6 +39,7 @@ def _init(_self, _) -> None:
         'money': 'money',
         'phone': 'telefono'
     },
+    encrypted=('email', 'phone'),
     init=_init
 )
 class User(ABC):
@@ -75,6 +78,8 @@ class User(ABC):
     mostrar_info() -> str
         Shows informaion about a specific account
     """
+    # Attributes kept in slots, without a per instance dict
+    __slots__ = ('_username', 'nombre', '_password', 'email', 'money', 'telefono', 'posts')
     usuarios: dict ={}
 
     def __init__(self, username: str, nombre: str, password: str, email: str, money: float = 0.0, telefono: str=None) -> None:
@@ -99,7 +104,7 @@ class User(ABC):
 
         self._username = username #Lectura
         self.nombre = nombre
-        self._password = cy.hash_str(password) #Escritura
+        self._password = User.hash_password(password) #Escritura
         self.email = email
         self.money = money
         self.telefono = telefono
@@ -198,9 +203,32 @@ class User(ABC):
 
         Notes
         ------
-        The password need to be implemented in hash system
+        The password need to be implemented in hash system, it gets hashed in the authentication executor
         """
-        self._password=cy.hash_str(value)
+        self._password=User.hash_password(value)
+
+    @staticmethod
+    @timed(name='crypto_hash_str')
+    def hash_password(password: str) -> str:
+        """
+        Hashes a password in the authentication executor
+
+        Parameters
+        ----------
+        password: str
+            Password to hash.
+
+        Returns
+        -------
+        str
+            The hashed password.
+
+        Notes
+        ------
+        The call is timed here, in the web process, the executor workers do not share its metrics.
+        The time includes waiting for a worker. Raises Overloaded if the executor is full or too slow.
+        """
+        return AUTH_EXECUTOR.run(cy.hash_str, password)
 
     @staticmethod
     def valid_email(email: str):
@@ -336,8 +364,9 @@ class User(ABC):
         str
             Absolute System path to the file
         """
-        user_keys: list[str] = [key for key in self.__dict__.keys()]
-        user_values: list[str] = [value for key, value in self.__dict__.items()]
+        fields = Database.fields(self)
+        user_keys: list[str] = [key for key in fields.keys()]
+        user_values: list[str] = [value for key, value in fields.items()]
         f = CSVFile(f'{tempdir}/User.csv')
         f.write_headers(user_keys)
         f.write(user_values)
@@ -366,10 +395,12 @@ class User(ABC):
         """
         f = XMLFile(f'{tempdir}/User.xml')
         f.gen_tree('SixerrData')
-        f.write({'type': type(self).__name__, **self.__dict__})
+        f.write({'type': type(self).__name__, **Database.fields(self)})
         f.indent()
         return f.path.absolute
 
+    @singleflight # Concurrent exports of the same user share the file
+    @timed(name='export', labels={'kind': 'user'})
     def export_user(self) -> str:
         """
         Gets user's info and exports it to a ZIP file with a .csv, .pdf, and .xml files inside.
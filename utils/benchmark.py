@@ -0,0 +1,294 @@
+# <==================================================================================================>
+
+#   ██████╗ ███████╗███╗   ██╗ ██████╗██╗  ██╗███╗   ███╗ █████╗ ██████╗ ██╗  ██╗   ██████╗ ██╗   ██╗
+#   ██╔══██╗██╔════╝████╗  ██║██╔════╝██║  ██║████╗ ████║██╔══██╗██╔══██╗██║ ██╔╝   ██╔══██╗╚██╗ ██╔╝
+#   ██████╔╝█████╗  ██╔██╗ ██║██║     ███████║██╔████╔██║███████║██████╔╝█████╔╝    ██████╔╝ ╚████╔╝
+#   ██╔══██╗██╔══╝  ██║╚██╗██║██║     ██╔══██║██║╚██╔╝██║██╔══██║██╔══██╗██╔═██╗    ██╔═══╝   ╚██╔╝
+#   ██████╔╝███████╗██║ ╚████║╚██████╗██║  ██║██║ ╚═╝ ██║██║  ██║██║  ██║██║  ██╗██╗██║        ██║
+#   ╚═════╝ ╚══════╝╚═╝  ╚═══╝ ╚═════╝╚═╝  ╚═╝╚═╝     ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝╚═╝╚═╝        ╚═╝
+
+# <==================================================================================================>
+#                   Module implementing benchmarks for the cryptographic algorithms
+# <==================================================================================================>
+#                                    @Author: Stefano Bia Carrasco
+# <==================================================================================================>
+#  IMPORTS
+# <==============================================================================================>
+from typing import Any, Callable
+from time import perf_counter
+from statistics import median
+from datetime import datetime
+import platform
+import json
+from . import crypto as cy
+# <==============================================================================================>
+#  CONSTANTS
+# <==============================================================================================>
+#  Message sizes in bytes benchmarked by default, from one block to 16MiB
+# <==============================================================================================>
+SIZES: tuple[int, ...] = (16, 256, 4 << 10, 64 << 10, 1 << 20, 16 << 20)
+# <==============================================================================================>
+#  Largest message size benchmarked with the reference functions, which are too slow beyond it
+# <==============================================================================================>
+REFERENCE_MAX: int = 4 << 10
+# <==============================================================================================>
+#  Number of iterations benchmarked for power hashes
+# <==============================================================================================>
+PW_ITERATIONS: int = 8
+# <==============================================================================================>
+#  Fixed key used to benchmark encryption
+# <==============================================================================================>
+KEY: bytes = bytes(range(32))
+# <==============================================================================================>
+#  TYPES
+# <==============================================================================================>
+type Case = Callable[[int], Callable[[], Any]]
+type Result = dict[str, Any]
+# <==============================================================================================>
+#  FUNCTIONS
+# <==============================================================================================>
+def message(size: int) -> bytes:
+    """
+    Get a deterministic message to benchmark with
+
+    :param size: (int) Length of the message in bytes
+    :returns: (bytes) The message
+    """
+    return bytes(i % 251 for i in range(size))
+
+def cases() -> dict[str, dict[str, tuple[Case, bool]]]:
+    """
+    Get the benchmark cases
+
+    Each case builds, for a message size, the call to measure. Inputs are prepared beforehand,
+    but the reference functions modify their inputs, so the copies they need are measured too.
+
+    :returns: (dict[str, dict[str, tuple[Case, bool]]]) By function name and backend, the case and whether it depends on the message size
+    """
+    mt = cy.mix_tables(cy.XAE_SPREAD_MATRIX, cy.XAE_GALOIS_BYTE)
+    sbox = bytes(cy.XAE_SBOX)
+    # Ciphertext of a message, for decryption
+    def _encrypted(size: int) -> bytes:
+        return bytes(cy.fast_encrypt(message(size), KEY))
+    return {
+        'sub_bytes': {
+            'reference': (lambda size: (lambda m=list(message(16)): cy.sub_bytes(list(m), cy.XAE_SBOX)), False),
+            'fast': (lambda size: (lambda m=message(16): m.translate(sbox)), False),
+        },
+        'mix_columns': {
+            'reference': (lambda size: (lambda m=list(message(16)): cy.mix_columns(list(m), cy.XAE_SPREAD_MATRIX, cy.XAE_GALOIS_BYTE)), False),
+            'fast': (lambda size: (lambda m=message(16): cy.translate_rows(m, mt, cy.XAE_ORDER)), False),
+        },
+        'expand_key': {
+            'reference': (lambda size: (lambda: cy.expand_key(list(KEY), cy.XAE_ORDER, cy.XAE_ROUNDS)), False),
+        },
+        'expand_skey': {
+            'reference': (lambda size: (lambda m=list(message(64)): cy.expand_skey(list(m), cy.XWH_ORDER, cy.XWH_ROUNDS)), False),
+            'fast': (lambda size: (lambda m=message(64): cy.fast_expand_skey(m)), False),
+        },
+        'encrypt': {
+            'reference': (lambda size: (lambda m=message(size): cy.encrypt(bytearray(m), list(KEY))), True),
+            'fast': (lambda size: (lambda m=message(size): cy.fast_encrypt(m, KEY)), True),
+            'context': (lambda size: (lambda m=message(size): cy.cipher(KEY).encrypt(m)), True),
+        },
+        'decrypt': {
+            'reference': (lambda size: (lambda c=_encrypted(size): cy.decrypt(bytearray(c), list(KEY))), True),
+            'fast': (lambda size: (lambda c=_encrypted(size): cy.fast_decrypt(c, KEY)), True),
+            'context': (lambda size: (lambda c=_encrypted(size): cy.cipher(KEY).decrypt(c)), True),
+        },
+        'hash': {
+            'reference': (lambda size: (lambda m=message(size): cy.hash(bytearray(m))), True),
+            'fast': (lambda size: (lambda m=message(size): cy.fast_hash(m)), True),
+        },
+        'pw_hash': {
+            'reference': (lambda size: (lambda m=message(16): cy.pw_hash(bytearray(m), PW_ITERATIONS)), False),
+            'fast': (lambda size: (lambda m=message(16): cy.fast_pw_hash(m, PW_ITERATIONS)), False),
+        },
+    }
+
+def measure(func: Callable[[], Any], warmup: int=1, repeat: int=5, min_time: float=0.1) -> dict[str, float]:
+    """
+    Measure the time a call takes
+
+    After the warmup calls, the number of calls per repeat is doubled until a repeat lasts at least
+    the minimum time, so fast calls are not drowned by timer resolution. The best repeat is the
+    least disturbed by the rest of the system, so it gives the reported rate.
+
+    :param func: (Callable[[], Any]) Call to measure
+    :param warmup: (int) Number of calls made before measuring, defaults to 1
+    :param repeat: (int) Number of measured repeats, defaults to 5
+    :param min_time: (float) Minimum seconds a repeat should last, defaults to 0.1
+    :returns: (dict[str, float]) Calls per repeat, best and median seconds per call, and calls per second
+    """
+    for _ in range(warmup):
+        func()
+    # Calibrate calls per repeat
+    number = 1
+    while True:
+        st = perf_counter()
+        for _ in range(number):
+            func()
+        if ((perf_counter() - st) >= min_time) or (number >= (1 << 20)):
+            break
+        number *= 2
+    # Measure repeats
+    times = []
+    for _ in range(repeat):
+        st = perf_counter()
+        for _ in range(number):
+            func()
+        times.append((perf_counter() - st) / number)
+    return {'number': number, 'best': min(times), 'median': median(times), 'ops': 1 / min(times)}
+
+def run(names: tuple[str, ...] | None=None, backends: tuple[str, ...] | None=None, sizes: tuple[int, ...]=SIZES, reference_max: int=REFERENCE_MAX, warmup: int=1, repeat: int=5, min_time: float=0.1, log: Callable[[str], Any] | None=print) -> Result:
+    """
+    Run the benchmarks
+
+    Functions that do not depend on the message size run once, on their natural input.
+
+    :param names: (tuple[str, ...] | None) Functions to benchmark, defaults to every one
+    :param backends: (tuple[str, ...] | None) Backends to benchmark ('reference', 'fast', 'context'), defaults to every one
+    :param sizes: (tuple[int, ...]) Message sizes in bytes, defaults to 16B to 16MiB
+    :param reference_max: (int) Largest message size benchmarked with the reference backend, defaults to 4KiB
+    :param warmup: (int) Number of calls made before measuring, defaults to 1
+    :param repeat: (int) Number of measured repeats, defaults to 5
+    :param min_time: (float) Minimum seconds a repeat should last, defaults to 0.1
+    :param log: (Callable[[str], Any] | None) Function to report each result with as it is measured, defaults to print, None to not report
+    :returns: (Result) Environment of the run and the list of results
+    :raises ValueError: When a function name is unknown
+    """
+    cs = cases()
+    # Check names
+    for name in (names or ()):
+        if name not in cs:
+            raise ValueError(f'Unknown benchmark \'{name}\'!')
+    results = []
+    for name, impls in cs.items():
+        if names and (name not in names):
+            continue
+        for backend, (case, sized) in impls.items():
+            if backends and (backend not in backends):
+                continue
+            for size in (sizes if sized else (None,)):
+                if sized and (backend == 'reference') and (size > reference_max):
+                    continue
+                m = measure(case(size or 0), warmup, repeat, min_time)
+                result = {'name': name, 'backend': backend, 'size': size, **m, 'mbps': (size * m['ops'] / 1e6) if size else None}
+                results.append(result)
+                if log:
+                    log(render(result))
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': cy.np.__version__ if cy.np else None,
+        'results': results,
+    }
+
+def key(result: Result) -> str:
+    """
+    Get the identifier of a result, used to match it against a baseline
+
+    :param result: (Result) The result
+    :returns: (str) Function name, backend and message size
+    """
+    return f'{result['name']}/{result['backend']}/{result['size'] or '-'}'
+
+def render(result: Result, base: Result | None=None) -> str:
+    """
+    Render a result as a line of text
+
+    :param result: (Result) The result
+    :param base: (Result | None) Matching baseline result, to show the change in rate, defaults to none
+    :returns: (str) The result line
+    """
+    line = f'{key(result):<32}{result['ops']:>14.1f} ops/s'
+    line += f'{result['mbps']:>12.3f} MB/s' if result['mbps'] is not None else ' ' * 17
+    if base:
+        line += f'{(result['ops'] / base['ops'] - 1) * 100:>+9.1f}%'
+    return line.rstrip()
+
+def compare(current: Result, baseline: Result, threshold: float=0.1) -> list[tuple[Result, Result]]:
+    """
+    Compare a run against a baseline run
+
+    Results are matched by function name, backend and message size. Results without a match are ignored.
+
+    :param current: (Result) The run to check
+    :param baseline: (Result) The run to check against
+    :param threshold: (float) Fraction of the baseline rate a result can lose before being a regression, defaults to 0.1
+    :returns: (list[tuple[Result, Result]]) Regressed results with their baseline result
+    """
+    base = {key(result): result for result in baseline['results']}
+    return [
+        (result, base[key(result)]) for result in current['results']
+        if (key(result) in base) and (result['ops'] < base[key(result)]['ops'] * (1 - threshold))
+    ]
+
+def save(run: Result, path: str) -> None:
+    """
+    Store a run as JSON
+
+    :param run: (Result) The run to store
+    :param path: (str) Path of the JSON file
+    """
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2)
+
+def load(path: str) -> Result:
+    """
+    Load a run stored as JSON
+
+    :param path: (str) Path of the JSON file
+    :returns: (Result) The stored run
+    """
+    with open(path) as f:
+        return json.load(f)
+
+def parse_size(s: str) -> int:
+    """
+    Parse a size in bytes, with an optional K or M suffix for KiB and MiB
+
+    :param s: (str) The size, like '16', '4K' or '16M'
+    :returns: (int) The size in bytes
+    """
+    s = s.strip().upper()
+    return int(s[:-1]) << {'K': 10, 'M': 20}[s[-1]] if s[-1] in 'KM' else int(s)
+# <==============================================================================================>
+#  SCRIPT EXECUTION
+# <==============================================================================================>
+# If executing as a script
+# <==============================================================================================>
+if (__name__ == '__main__'):
+    from argparse import ArgumentParser
+    parser = ArgumentParser(prog='python -m utils.benchmark', description='Benchmark the cryptographic algorithms')
+    parser.add_argument('names', nargs='*', help='functions to benchmark, defaults to every one')
+    parser.add_argument('--backend', action='append', choices=('reference', 'fast', 'context'), help='backend to benchmark, can be repeated, defaults to every one')
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)), help='comma separated message sizes, with K or M suffixes')
+    parser.add_argument('--reference-max', default=str(REFERENCE_MAX), help='largest message size for the reference backend')
+    parser.add_argument('--warmup', type=int, default=1, help='calls made before measuring')
+    parser.add_argument('--repeat', type=int, default=5, help='measured repeats')
+    parser.add_argument('--min-time', type=float, default=0.1, help='minimum seconds per repeat')
+    parser.add_argument('--output', help='JSON file to store the results in')
+    parser.add_argument('--baseline', help='JSON file with results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='fraction of the baseline rate that can be lost before failing')
+    args = parser.parse_args()
+    current = run(
+        tuple(args.names) or None, tuple(args.backend or ()) or None,
+        tuple(parse_size(s) for s in args.sizes.split(',')), parse_size(args.reference_max),
+        args.warmup, args.repeat, args.min_time,
+        log=None if args.baseline else print
+    )
+    if args.output:
+        save(current, args.output)
+    if args.baseline:
+        baseline = load(args.baseline)
+        base = {key(result): result for result in baseline['results']}
+        for result in current['results']:
+            print(render(result, base.get(key(result))))
+        regressions = compare(current, baseline, args.threshold)
+        for result, _ in regressions:
+            print(f'Regression: {key(result)}')
+        # Usable as a regression check
+        raise SystemExit(1 if regressions else 0)
+# <==============================================================================================>
@@ -14,13 +14,20 @@
 # <==============================================================>
 #  IMPORTS
 # <==============================================================>
-from typing import Self, Iterator, Any, KeysView, ValuesView, ItemsView
+from typing import Self, Iterator, Any, Callable, KeysView, ValuesView, ItemsView
+from collections import OrderedDict
+from sys import getsizeof
+from threading import Event, Lock
+from time import monotonic
 # <==============================================================>
 #  CLASSES
 # <==============================================================>
 class LRUCache[K, V]:
     """
     LRU (Least Recently Used) cache container class
+
+    Entries are kept in a linked hash map ordered from least to most recently used,
+    so every access, insertion, deletion and eviction is O(1) whatever the size.
     """
     def __init__(self, size: int) -> None:
         """
@@ -33,10 +40,13 @@ class LRUCache[K, V]:
         if (size <= 1):
             raise ValueError('Invalid \'size\' for LRU cache!')
         # Initialize attributes
-        # First history element is last discarded cache key
-        self.__history: list[K, ...] = [None for _ in range(size+1)] # Preload with None, fixed-size array
-        self.__cache: dict[K, V] = {}
+        # First entry is least recently used, last entry is most recently used
+        self.__cache: OrderedDict[K, V] = OrderedDict()
         self.__size: int = size
+        # Statistics
+        self.__hits: int = 0
+        self.__misses: int = 0
+        self.__evictions: int = 0
 
     def __len__(self) -> int:
         """
@@ -65,13 +75,17 @@ class LRUCache[K, V]:
         :returns: (V) The key's corresponding value, if any
         :raises KeyError: If the key is not found in the cache
         """
-        if (key in self.__cache):
-            # Update access history
-            self.__update_history(key)
+        try:
             # Get value for key
-            return self.__cache[key]
-        # Throw error if key not found
-        raise KeyError(f'Key \'{key}\' not found in LRU cache!')
+            value = self.__cache[key]
+        except KeyError:
+            # Throw error if key not found
+            self.__misses += 1
+            raise KeyError(f'Key \'{key}\' not found in LRU cache!')
+        # Update access history
+        self.__cache.move_to_end(key)
+        self.__hits += 1
+        return value
 
     def __setitem__(self, key: K, value: V) -> None:
         """
@@ -81,13 +95,13 @@ class LRUCache[K, V]:
         """
         # Ignore None
         if (key != None):
-            # Update access history
-            self.__update_history(key)
-            # Delete first history element, which represents last discarded cache key
-            if (self.__history[0] in self.__cache):
-                del self.__cache[self.__history[0]]
-            # Set value for key
+            # Set value for key and update access history
             self.__cache[key] = value
+            self.__cache.move_to_end(key)
+            # Discard least recently used entry when full
+            if (len(self.__cache) > self.__size):
+                self.__cache.popitem(last=False)
+                self.__evictions += 1
 
     def __delitem__(self, key: K) -> None:
         """
@@ -97,12 +111,8 @@ class LRUCache[K, V]:
         
         :param key: (K) The key to delete the value for
         """
-        if (key in self.__cache):
-            # Gets the index of key, if this raises an error I should quit programming
-            ix = self.__history.index(key)
-            # Delete the cache and history entries
-            del self.__cache[self.__history[ix]]
-            self.__history[ix] = None
+        # Removes both the entry and its place in the access history
+        self.__cache.pop(key, None)
 
     def __eq__(self, other: Self) -> bool:
         """
@@ -114,14 +124,14 @@ class LRUCache[K, V]:
         :param other: (Self) Other instance to compare to
         :returns: (bool) Whether the two caches are equal
         """
-        return (self.__history == other.__history) \
-            and (self.__cache == other.__cache)
+        return (self.__size == other.__size) \
+            and (self.__cache == other.__cache) # Order sensitive between ordered dicts
 
     def __iter__(self) -> Iterator[K]:
         """
         Get an iterator for the cache
 
-        :returns: (Iterator[K]) The iterator for the cache
+        :returns: (Iterator[K]) The iterator for the cache, from least to most recently used key
         """
         return self.__cache.__iter__() # Delegates work to dict
 
@@ -131,7 +141,7 @@ class LRUCache[K, V]:
 
         :returns: (str) String representation of the cache
         """
-        return f'({self.__size}){self.__history}{self.__cache}'
+        return f'({self.__size}){dict(self.__cache)}'
 
     @property
     def size(self) -> int:
@@ -145,6 +155,48 @@ class LRUCache[K, V]:
         """
         return self.__size
 
+    @property
+    def hits(self) -> int:
+        """
+        Get the number of successful lookups
+
+        :returns: (int) Number of lookups that found their key
+        """
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """
+        Get the number of failed lookups
+
+        :returns: (int) Number of lookups that did not find their key
+        """
+        return self.__misses
+
+    @property
+    def evictions(self) -> int:
+        """
+        Get the number of discarded entries
+
+        :returns: (int) Number of entries discarded to make room for new ones
+        """
+        return self.__evictions
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        Get the cache statistics
+
+        :returns: (dict[str, int]) Hits, misses, evictions, current length and size of the cache
+        """
+        return {
+            'hits': self.__hits,
+            'misses': self.__misses,
+            'evictions': self.__evictions,
+            'length': len(self.__cache),
+            'size': self.__size
+        }
+
     def get(self, key: K, default: V | Any=None) -> V | Any:
         """
         Get the corresponding value for a key
@@ -153,7 +205,10 @@ class LRUCache[K, V]:
         :param default: (V | Any) The default value to return if key not in cache
         :returns: (V | Any) The value for the key or the default value in its abscence
         """
-        return self.__cache.get(key, default) # Delegates work to dict
+        try:
+            return self[key]
+        except KeyError:
+            return default
 
     def keys(self) -> KeysView[K]:
         """
@@ -183,13 +238,12 @@ class LRUCache[K, V]:
         """
         Clear the cache
 
-        Clears the cache and resets its access history.
+        Clears the cache and resets its access history and statistics.
         """
-        # Set all elements of history to None
-        for i in range(len(self.__history)):
-            self.__history[i] = None
-        # Clear cache
+        # Clear cache and history at once
         self.__cache.clear() # Delegates work to dict
+        # Reset statistics
+        self.__hits = self.__misses = self.__evictions = 0
 
     def copy(self) -> Self:
         """
@@ -200,25 +254,482 @@ class LRUCache[K, V]:
         # Create new empty instance
         copy = type(self).__new__(type(self))
         # Initialize attributes with copies
-        copy.__history = self.__history.copy()
         copy.__cache = self.__cache.copy()
         copy.__size = self.__size
+        copy.__hits = self.__hits
+        copy.__misses = self.__misses
+        copy.__evictions = self.__evictions
         return copy
+# <==============================================================>
+class TTLCache[K, V]:
+    """
+    Time and weight bounded LRU (Least Recently Used) cache container class
+
+    Entries expire after their time to live, and the least recently used ones are
+    discarded while the total weight of the entries, as measured by the sizer,
+    exceeds the maximum weight. Expired entries are dropped lazily when accessed
+    and periodically on insertion, or on demand trough :py:meth:`expire`.
+    """
+    def __init__(self, size: int | None=None, ttl: float | None=None, weight: int | None=None, sizer: Callable[[V], int]=getsizeof, interval: float=60.0) -> None:
+        """
+        TTLCache object constructor
+
+        :param size: (int | None) Maximum number of entries, must be greater than one, defaults to unbounded
+        :param ttl: (float | None) Default seconds an entry lives, defaults to never expiring
+        :param weight: (int | None) Maximum total weight of the entries (e.g. bytes), defaults to unbounded
+        :param sizer: (Callable[[V], int]) Function that gives the weight of a value, defaults to its shallow size in bytes
+        :param interval: (float) Minimum seconds between full expiry sweeps made on insertion, defaults to 60.0
+        :raises ValueError: When the values of size, ttl or weight are invalid, or there is neither size nor weight
+        """
+        # Check bounds
+        if (size is None) and (weight is None):
+            raise ValueError('TTL cache needs a \'size\' or a \'weight\' bound!')
+        if (size is not None) and (size <= 1):
+            raise ValueError('Invalid \'size\' for TTL cache!')
+        if (ttl is not None) and (ttl <= 0):
+            raise ValueError('Invalid \'ttl\' for TTL cache!')
+        if (weight is not None) and (weight <= 0):
+            raise ValueError('Invalid \'weight\' for TTL cache!')
+        # Initialize attributes
+        # Entries as (value, expiry, weight), first is least recently used
+        self.__cache: OrderedDict[K, tuple[V, float | None, int]] = OrderedDict()
+        self.__size: int | None = size
+        self.__ttl: float | None = ttl
+        self.__max_weight: int | None = weight
+        self.__sizer: Callable[[V], int] = sizer
+        self.__interval: float = interval
+        self.__weight: int = 0
+        self.__sweep: float = monotonic()
+        # Statistics
+        self.__hits: int = 0
+        self.__misses: int = 0
+        self.__evictions: int = 0
+        self.__expirations: int = 0
+
+    def __len__(self) -> int:
+        """
+        Get the length of the cache
+
+        The length of the cache is the number of elements currently stored, expired ones included until dropped.
+
+        :returns: (int) The cache length
+        """
+        return self.__cache.__len__() # Delegates work to dict
+
+    def __contains__(self, key: K) -> bool:
+        """
+        Check if the cache has a live key
+
+        :param key: (K) The key to check for
+        :returns: (bool) Whether the cache has an unexpired entry for the key or not
+        """
+        entry = self.__cache.get(key)
+        return bool(entry) and not self.__expired(key, entry, monotonic())
+
+    def __getitem__(self, key: K) -> V:
+        """
+        Get the corresponding value for a key
+
+        :param key: (K) The key to get the value for
+        :returns: (V) The key's corresponding value, if any
+        :raises KeyError: If the key is not found in the cache or has expired
+        """
+        entry = self.__cache.get(key)
+        # Not found or expired
+        if not entry or self.__expired(key, entry, monotonic()):
+            self.__misses += 1
+            raise KeyError(f'Key \'{key}\' not found in TTL cache!')
+        # Update access history
+        self.__cache.move_to_end(key)
+        self.__hits += 1
+        return entry[0]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        """
+        Set the corresponding value for a key with the default time to live
+
+        :param key: (K) The key to set the value for, ignores None
+        """
+        self.set(key, value)
+
+    def __delitem__(self, key: K) -> None:
+        """
+        Delete the corresponding value for a key
+
+        If the key is not found in the cache the operation fails silently.
+
+        :param key: (K) The key to delete the value for
+        """
+        if (entry := self.__cache.pop(key, None)):
+            self.__weight -= entry[2]
+
+    def __iter__(self) -> Iterator[K]:
+        """
+        Get an iterator for the cache
+
+        :returns: (Iterator[K]) The iterator for the cache, from least to most recently used key
+        """
+        return self.__cache.__iter__() # Delegates work to dict
+
+    def __str__(self) -> str:
+        """
+        Get a string representation of the cache
+
+        :returns: (str) String representation of the cache
+        """
+        return f'({self.__size}, {self.__weight}/{self.__max_weight}){ {k: v[0] for k,v in self.__cache.items()} }'
+
+    @property
+    def size(self) -> int | None:
+        """
+        Get the size of the cache
+
+        :returns: (int | None) Maximum number of entries, None if unbounded
+        """
+        return self.__size
+
+    @property
+    def ttl(self) -> float | None:
+        """
+        Get the default time to live of the entries
+
+        :returns: (float | None) Seconds an entry lives, None if never expiring
+        """
+        return self.__ttl
+
+    @property
+    def weight(self) -> int:
+        """
+        Get the current weight of the cache
+
+        :returns: (int) Total weight of the stored entries
+        """
+        return self.__weight
+
+    @property
+    def max_weight(self) -> int | None:
+        """
+        Get the maximum weight of the cache
+
+        :returns: (int | None) Maximum total weight of the entries, None if unbounded
+        """
+        return self.__max_weight
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        Get the cache statistics
+
+        :returns: (dict[str, int]) Hits, misses, evictions, expirations, current length and weight of the cache
+        """
+        return {
+            'hits': self.__hits,
+            'misses': self.__misses,
+            'evictions': self.__evictions,
+            'expirations': self.__expirations,
+            'length': len(self.__cache),
+            'weight': self.__weight
+        }
+
+    def set(self, key: K, value: V, ttl: float | None=None) -> None:
+        """
+        Set the corresponding value for a key
+
+        Values heavier than the maximum weight are not stored.
+
+        :param key: (K) The key to set the value for, ignores None
+        :param value: (V) The value to set
+        :param ttl: (float | None) Seconds the entry lives, defaults to the cache time to live
+        """
+        # Ignore None
+        if (key == None):
+            return
+        now = monotonic()
+        # Sweep expired entries every interval
+        if (now - self.__sweep >= self.__interval):
+            self.expire()
+        # Replace previous entry
+        del self[key]
+        weight = self.__sizer(value)
+        # Too heavy to ever fit
+        if (self.__max_weight is not None) and (weight > self.__max_weight):
+            return
+        ttl = self.__ttl if (ttl is None) else ttl
+        self.__cache[key] = (value, (now + ttl) if (ttl is not None) else None, weight)
+        self.__weight += weight
+        # Discard least recently used entries until within bounds
+        while ((self.__size is not None) and (len(self.__cache) > self.__size)) \
+            or ((self.__max_weight is not None) and (self.__weight > self.__max_weight)):
+            self.__weight -= self.__cache.popitem(last=False)[1][2]
+            self.__evictions += 1
+
+    def get(self, key: K, default: V | Any=None) -> V | Any:
+        """
+        Get the corresponding value for a key
+
+        :param key: (K) The key to get the value for
+        :param default: (V | Any) The default value to return if key not in cache
+        :returns: (V | Any) The value for the key or the default value in its abscence
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> KeysView[K]:
+        """
+        Get the keys of the cache
+
+        :returns: (KeysView[K]) Set-like object providing view of cache's keys
+        """
+        return self.__cache.keys() # Delegates work to dict
+
+    def values(self) -> ValuesView[V]:
+        """
+        Get the values of the cache
+
+        :returns: (ValuesView[V]) Set-like object providing view of cache's values
+        """
+        return {k: v[0] for k,v in self.__cache.items()}.values()
+
+    def items(self) -> ItemsView[K, V]:
+        """
+        Get the items of the cache
+
+        :returns: (ItemsView[K, V]) Set-like object providing view of cache's items
+        """
+        return {k: v[0] for k,v in self.__cache.items()}.items()
+
+    def expire(self) -> int:
+        """
+        Drop every expired entry
+
+        :returns: (int) Number of entries dropped
+        """
+        now = self.__sweep = monotonic()
+        n = len(self.__cache)
+        # Copy keys as the dict shrinks while looping
+        for key, entry in list(self.__cache.items()):
+            self.__expired(key, entry, now)
+        return n - len(self.__cache)
+
+    def clear(self) -> None:
+        """
+        Clear the cache
+
+        Clears the cache and resets its weight and statistics.
+        """
+        self.__cache.clear() # Delegates work to dict
+        self.__weight = 0
+        # Reset statistics
+        self.__hits = self.__misses = self.__evictions = self.__expirations = 0
+
+    def __expired(self, key: K, entry: tuple[V, float | None, int], now: float) -> bool:
+        """
+        Check if an entry has expired, dropping it if so
+
+        :param key: (K) Key of the entry
+        :param entry: (tuple[V, float | None, int]) The entry as (value, expiry, weight)
+        :param now: (float) Current monotonic time
+        :returns: (bool) Whether the entry has expired
+        """
+        if (entry[1] is not None) and (entry[1] <= now):
+            del self[key]
+            self.__expirations += 1
+            return True
+        return False
+# <==============================================================>
+class ConcurrentCache[K, V]:
+    """
+    Thread-safe cache container class with lock striping
+
+    Keys are spread by hash over several stripes, each one an independent
+    :py:class:`LRUCache` (or :py:class:`TTLCache` when bounded by time or weight)
+    guarded by its own lock, so threads working on different stripes never wait for each other.
+    Recency and bounds are kept per stripe.
+    """
+    def __init__(self, size: int | None=None, stripes: int=16, ttl: float | None=None, weight: int | None=None, sizer: Callable[[V], int]=getsizeof) -> None:
+        """
+        ConcurrentCache object constructor
+
+        :param size: (int | None) Maximum number of entries, split among stripes, defaults to unbounded if bounded by weight
+        :param stripes: (int) Number of independently locked stripes, defaults to 16
+        :param ttl: (float | None) Default seconds an entry lives, defaults to never expiring
+        :param weight: (int | None) Maximum total weight of the entries (e.g. bytes), split among stripes, defaults to unbounded
+        :param sizer: (Callable[[V], int]) Function that gives the weight of a value, defaults to its shallow size in bytes
+        :raises ValueError: When the values of stripes, size, ttl or weight are invalid
+        """
+        # Check stripes
+        if (stripes <= 0):
+            raise ValueError('Invalid \'stripes\' for concurrent cache!')
+        # Bounds of each stripe, rounded up
+        ssize = max(2, -(-size // stripes)) if (size is not None) else None
+        sweight = -(-weight // stripes) if (weight is not None) else None
+        # Initialize attributes
+        # Stripes as (lock, cache, keys being computed)
+        self.__stripes: tuple[tuple[Lock, LRUCache[K, V] | TTLCache[K, V], dict[K, Event]], ...] = tuple(
+            (
+                Lock(),
+                TTLCache(ssize, ttl, sweight, sizer) if (ttl is not None) or (weight is not None) else LRUCache(ssize), # Throws error if size invalid
+                {}
+            )
+            for _ in range(stripes)
+        )
+
+    def __len__(self) -> int:
+        """
+        Get the length of the cache
+
+        :returns: (int) Number of elements currently stored across all stripes
+        """
+        return sum(len(cache) for _, cache, _ in self.__stripes)
+
+    def __contains__(self, key: K) -> bool:
+        """
+        Check if the cache has a key
+
+        :param key: (K) The key to check for
+        :returns: (bool) Whether the cache has an entry for the key or not
+        """
+        lock, cache, _ = self.__stripe(key)
+        with lock:
+            return key in cache
+
+    def __getitem__(self, key: K) -> V:
+        """
+        Get the corresponding value for a key
+
+        :param key: (K) The key to get the value for
+        :returns: (V) The key's corresponding value, if any
+        :raises KeyError: If the key is not found in the cache
+        """
+        lock, cache, _ = self.__stripe(key)
+        with lock:
+            return cache[key]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        """
+        Set the corresponding value for a key
+
+        :param key: (K) The key to set the value for, ignores None
+        """
+        lock, cache, _ = self.__stripe(key)
+        with lock:
+            cache[key] = value
+
+    def __delitem__(self, key: K) -> None:
+        """
+        Delete the corresponding value for a key
+
+        If the key is not found in the cache the operation fails silently.
+
+        :param key: (K) The key to delete the value for
+        """
+        lock, cache, _ = self.__stripe(key)
+        with lock:
+            del cache[key]
+
+    def __iter__(self) -> Iterator[K]:
+        """
+        Get an iterator for the cache
+
+        :returns: (Iterator[K]) Iterator over a snapshot of the keys, stripe by stripe
+        """
+        keys = []
+        for lock, cache, _ in self.__stripes:
+            with lock:
+                keys += cache.keys()
+        return keys.__iter__() # Delegates work to list
+
+    @property
+    def stripes(self) -> int:
+        """
+        Get the number of stripes of the cache
+
+        :returns: (int) The number of stripes
+        """
+        return len(self.__stripes)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        Get the cache statistics
+
+        :returns: (dict[str, int]) Statistics of the stripes added up
+        """
+        stats: dict[str, int] = {}
+        for lock, cache, _ in self.__stripes:
+            with lock:
+                for k,v in cache.stats.items():
+                    stats[k] = stats.get(k, 0) + (v or 0)
+        return stats
+
+    def get(self, key: K, default: V | Any=None) -> V | Any:
+        """
+        Get the corresponding value for a key
+
+        :param key: (K) The key to get the value for
+        :param default: (V | Any) The default value to return if key not in cache
+        :returns: (V | Any) The value for the key or the default value in its abscence
+        """
+        lock, cache, _ = self.__stripe(key)
+        with lock:
+            return cache.get(key, default)
+
+    def get_or_compute(self, key: K, compute: Callable[[], V]) -> V:
+        """
+        Get the corresponding value for a key, computing and storing it if missing
+
+        Only one thread computes a missing key, other threads asking for it meanwhile
+        wait for its value. The stripe is not locked while computing, so other keys are served.
+        If the computation raises, waiting threads retry it themselves.
+
+        :param key: (K) The key to get the value for
+        :param compute: (Callable[[], V]) Function that computes the value
+        :returns: (V) The key's corresponding value
+        """
+        lock, cache, pending = self.__stripe(key)
+        while True:
+            with lock:
+                try:
+                    return cache[key]
+                except KeyError:
+                    pass
+                # Claim the computation or join the one in flight
+                if (event := pending.get(key)) is None:
+                    event = pending[key] = Event()
+                    break
+            # Wait for the computing thread and look again
+            event.wait()
+        try:
+            value = compute()
+            with lock:
+                cache[key] = value
+            return value
+        finally:
+            # Release waiting threads
+            with lock:
+                del pending[key]
+            event.set()
+
+    def clear(self) -> None:
+        """
+        Clear the cache
+
+        Clears every stripe and resets their statistics.
+        """
+        for lock, cache, _ in self.__stripes:
+            with lock:
+                cache.clear()
 
-    def __update_history(self, key: K) -> None:
+    def __stripe(self, key: K) -> tuple[Lock, LRUCache[K, V] | TTLCache[K, V], dict[K, Event]]:
         """
-        Update the access history of the cache
+        Get the stripe that owns a key
 
-        :param key: (K) Key of the access to record
+        :param key: (K) The key to get the stripe for
+        :returns: (tuple[Lock, LRUCache[K, V] | TTLCache[K, V], dict[K, Event]]) The stripe lock, cache and keys being computed
         """
-        # Index of the key in history or 0
-        ix = self.__history.index(key) \
-            if (key in self.__history) else 0
-        # Move all elements from history[ix:] one position downwards
-        for i,value in enumerate(self.__history[1+ix:], ix):
-            self.__history[i] = value
-        # After making space, add key to end of history
-        self.__history[-1] = key
+        return self.__stripes[hash(key) % len(self.__stripes)]
 # <==============================================================>
 #  SCRIPT EXECUTION
 # <==============================================================>
@@ -15,6 +15,24 @@
 #  XAE: eXtreme Advanced Encryption -> Custom AES variant
 #  XWH: eXtreme Whirpool Hash -> Custom Whirpool variant
 # <=========================================================================>
+#  IMPORTS
+# <=========================================================================>
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Lock
+from typing import Any, Iterable
+from os import cpu_count, getpid, fstat, urandom, PathLike
+from collections import deque
+from hashlib import blake2b
+from .cache import ConcurrentCache
+from .executor import METHOD
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+# <=========================================================================>
 #  CONSTANTS
 # <=========================================================================>
 #  eXtreme Advanced Encryption parameters
@@ -22,6 +40,14 @@
 XAE_ORDER: int = 4
 XAE_ROUNDS: int = 14
 # <=========================================================================>
+#  Minimum number of XAE blocks processed with NumPy when available
+# <=========================================================================>
+XAE_VECTOR_BLOCKS: int = 64
+# <=========================================================================>
+#  Length in bytes of the nonce of XAE in counter mode, the rest of a block is the counter
+# <=========================================================================>
+XAE_NONCE_SIZE: int = 8
+# <=========================================================================>
 #  eXtreme Whirpool Hash parameters
 # <=========================================================================>
 XWH_ORDER: int = 8
@@ -142,15 +168,17 @@ XWH_SBOX: tuple = (
 # <=========================================================================>
 #  ATOMIC FUNCTIONS
 # <=========================================================================>
-def sub_bytes(s: list, sx: list | tuple) -> list:
+def sub_bytes(s: list, sx: list | tuple, si: int = 0, se: int | None = None) -> list:
     """
-    Substitute bytes of a list
+    Substitute bytes of a list, in place
 
-    :param s: List of bytes to be substituted
+    :param s: List of bytes to be substituted [list, bytearray or memoryview]
     :param sx: Substitution box defining the substitution for each possible byte value
+    :param si: Index of the first byte to substitute => (0)
+    :param se: Index after the last byte to substitute => (Length of s)
     :return: The passed list (s) with each byte substituted according to (sx) substitution box
     """
-    for i in range(len(s)):
+    for i in range(si, len(s) if (se is None) else se):
         s[i] = sx[s[i]]
     return s
 # <=========================================================================>
@@ -167,18 +195,30 @@ def shift_row(s: list, i: int = 1, dx: int = 1) -> list:
     s = s[i:] + s[:i]
     return s
 # <=========================================================================>
-def shift_rows(s: list, dx: int = 1) -> list:
+def shift_rows(s: list, dx: int = 1, si: int = 0, ox: int | None = None, bx: memoryview | None = None) -> list:
     """
-    Shift rows of a matrix by row index (0..R) positions
+    Shift rows of a matrix by row index (0..R) positions, in place
 
-    :param s: Matrix to be shifted [Square matrix]
+    The matrix is copied to a scratch buffer and each row written back in two slices,
+    so passing a preallocated buffer makes the shift allocate no new lists.
+
+    :param s: Matrix to be shifted [Square matrix, list, bytearray or memoryview]
     :param dx: The direction of the shift [1, -1] => (1)
+    :param si: Index of the first byte of the matrix in (s) => (0)
+    :param ox: Order of the matrix => (Square root of the length of s)
+    :param bx: Scratch buffer to copy the matrix to [memoryview, SizeOf ox^2] => (New copy)
     :return: The passed matrix (s) with the elements shifted by row index (0..R) positions in (dx) direction
     """
-    ox, si, se = int(len(s)**(1/2)), 0, 0
+    ox = ox or int(len(s)**(1/2))
+    sx = ox**2
+    if (bx is None):
+        bx = s[si:si+sx]
+    else:
+        bx[:sx] = s[si:si+sx]
     for i in range(ox):
-        si, se = i*ox, (i+1)*ox
-        s[si:se] = shift_row(s[si:se], i, dx)
+        ri, ix = si+(i*ox), (i*dx) % ox
+        s[ri:ri+ox-ix] = bx[(i*ox)+ix:(i+1)*ox]
+        s[ri+ox-ix:ri+ox] = bx[i*ox:(i*ox)+ix]
     return s
 # <=========================================================================>
 def galois_mult(ax: int, bx: int, mx: int) -> int:
@@ -201,25 +241,27 @@ def galois_mult(ax: int, bx: int, mx: int) -> int:
         bx >>= 1
     return (sx % 256)
 # <=========================================================================>
-def mix_columns(s: list, mx: list | tuple, gx: int) -> list:
+def mix_columns(s: list, mx: list | tuple, gx: int, si: int = 0, ox: int | None = None) -> list:
     """
-    Mix the columns of a matrix using a matrix
+    Mix the columns of a matrix using a matrix, in place
+
+    Each byte is mixed with the row of (mx) for its position, from its own previous
+    value only, so no copy of the column is needed.
 
-    :param s: Matrix to mix columns of [Square matrix]
+    :param s: Matrix to mix columns of [Square matrix, list, bytearray or memoryview]
     :param mx: Matrix to mix columns with [Square matrix]
     :param gx: Galois modulo to use in galois multiplication
+    :param si: Index of the first byte of the matrix in (s) => (0)
+    :param ox: Order of the matrix => (Square root of the length of s)
     :return: The passed matrix (s) with the columns mixed
     """
-    ox, si = int(len(s)**(1/2)), 0
-    cx = [0 for _ in range(ox)]
+    ox = ox or int(len(s)**(1/2))
     for i in range(ox):
         for ix in range(ox):
-            cx[ix] = s[(ox*ix)+i]
-        for ix in range(ox):
-            si = (ox*ix)+i
-            s[si] = 0x00
+            sj = si+(ox*ix)+i
+            cx, s[sj] = s[sj], 0x00
             for ixx in range(ox):
-                s[si] ^= galois_mult(mx[(si-i)+ixx], cx[ix], gx)
+                s[sj] ^= galois_mult(mx[(ox*ix)+ixx], cx, gx)
     return s
 # <=========================================================================>
 def rconst(i: int, rx: list | tuple) -> tuple:
@@ -234,28 +276,32 @@ def rconst(i: int, rx: list | tuple) -> tuple:
     """
     return (rx[i-1], 0, 0, 0, 0, 0, 0, 0)
 # <=========================================================================>
-def add_rows(ax: list, bx: list | tuple) -> list:
+def add_rows(ax: list, bx: list | tuple, ai: int = 0, bi: int = 0, n: int | None = None) -> list:
     """
-    Add two lists with elements in the Galois field GF(2^8)
+    Add two lists with elements in the Galois field GF(2^8), in place
 
     :param ax: First list to be added [SizeOf (bx)]
     :param bx: Second list to be added [SizeOf (ax)]
+    :param ai: Index of the first element to add to in (ax) => (0)
+    :param bi: Index of the first element to add in (bx) => (0)
+    :param n: Number of elements to add => (Length of ax from ai)
     :return: The passed list (ax) with (bx) added
     """
-    for i in range(len(ax)):
-        ax[i] ^= bx[i]
+    for i in range((len(ax) - ai) if (n is None) else n):
+        ax[ai+i] ^= bx[bi+i]
     return ax
 # <=========================================================================>
-def add_asym(ax: list, bx: list | tuple) -> list:
+def add_asym(ax: list, bx: list | tuple, ai: int = 0) -> list:
     """
-    Add two lists with different lengths and elements in the Galois field GF(2^8)
+    Add two lists with different lengths and elements in the Galois field GF(2^8), in place
 
     :param ax: First list to be added [SizeOf (bx)]
     :param bx: Second list to be added [SizeOf (ax)]
+    :param ai: Index of the first element to add to in (ax) => (0)
     :return: The passed list (ax) with (bx) added
     """
-    for i in range(min(len(ax), len(bx))):
-        ax[i] ^= bx[i]
+    for i in range(min(len(ax) - ai, len(bx))):
+        ax[ai+i] ^= bx[i]
     return ax
 # <=========================================================================>
 def expand_key(s: list, ox: int, rx: int) -> tuple:
@@ -285,65 +331,83 @@ def expand_key(s: list, ox: int, rx: int) -> tuple:
         s[-ox::] = add_rows(s[-ox::], s[si:si+ox])
     return tuple(s)
 # <=========================================================================>
-def expand_skey(s: list, ox: int, rx: int) -> tuple:
+def expand_skey(s: list, ox: int, rx: int, kx: memoryview | None = None, bx: memoryview | None = None) -> bytearray | memoryview:
     """
     Expand key generating one key schedule
 
+    Each round key is derived in place from the previous one, inside (kx).
+
     :param s: List representing the initial key to be expanded
     :param ox: Order of the matrix to which the key will be applied
     :param rx: Number of rounds the key will be expanded for
-    :return: The passed list (s) as a tuple, now representing the expanded key schedule
+    :param kx: Buffer to write the key schedule to [memoryview, SizeOf (rx+1)*ox^2] => (New bytearray)
+    :param bx: Scratch buffer for shift_rows [memoryview, SizeOf ox^2] => (New copy on each shift)
+    :return: The buffer (kx) representing the expanded key schedule
     """
-    sx, si, se, sf = ox**2, 0, 0, 0
+    sx = ox**2
+    kx = bytearray((rx+1)*sx) if (kx is None) else kx
+    kx[:sx] = s[:sx]
     for i in range(rx):
-        si, se, sf = i*sx, (i+1)*sx, (i+2)*sx
-        s += s[si:se]
-        s[se:sf] = sub_bytes(s[se:sf], XWH_SBOX)
-        s[se:sf] = shift_rows(s[se:sf], 1)
-        s[se:sf] = mix_columns(s[se:sf], XWH_SPREAD_MATRIX, XWH_GALOIS_BYTE)
-        s[se:sf] = add_asym(s[se:sf], XWH_RCONST)
-    return tuple(s)
+        si, se = (i+1)*sx, (i+2)*sx
+        kx[si:se] = kx[si-sx:si]
+        sub_bytes(kx, XWH_SBOX, si, se)
+        shift_rows(kx, 1, si, ox, bx)
+        mix_columns(kx, XWH_SPREAD_MATRIX, XWH_GALOIS_BYTE, si, ox)
+        add_asym(kx, XWH_RCONST, si)
+    return kx
 # <=========================================================================>
 #  MOLECULAR FUNCTIONS
 # <=========================================================================>
-def xae_round(s: list, rx: list | tuple) -> list:
+def xae_round(s: list, rx: list | tuple, si: int = 0, ri: int = 0, bx: memoryview | None = None) -> list:
     """
-    Perform a single round of the XAE encryption algorithm
+    Perform a single round of the XAE encryption algorithm, in place
 
     :param s: State matrix to be transformed [4x4]
     :param rx: Round key to be added to the state [256bit]
+    :param si: Index of the first byte of the state in (s) => (0)
+    :param ri: Index of the first byte of the round key in (rx) => (0)
+    :param bx: Scratch buffer for shift_rows [memoryview, SizeOf 16] => (New copy)
     :return: The passed state (s) after the transformations
     """
-    sub_bytes(s, XAE_SBOX)
-    shift_rows(s, 1)
-    mix_columns(s, XAE_SPREAD_MATRIX, XAE_GALOIS_BYTE)
-    return add_rows(s, rx)
+    ox, sx = XAE_ORDER, XAE_ORDER**2
+    sub_bytes(s, XAE_SBOX, si, si+sx)
+    shift_rows(s, 1, si, ox, bx)
+    mix_columns(s, XAE_SPREAD_MATRIX, XAE_GALOIS_BYTE, si, ox)
+    return add_rows(s, rx, si, ri, sx)
 # <=========================================================================>
-def xae_inv_round(s: list, rx: list | tuple) -> list:
+def xae_inv_round(s: list, rx: list | tuple, si: int = 0, ri: int = 0, bx: memoryview | None = None) -> list:
     """
-    Perform a single round of the XAE decryption algorithm
+    Perform a single round of the XAE decryption algorithm, in place
 
     :param s: State matrix to be transformed [4x4]
     :param rx: Round key to be added to the state [256bit]
+    :param si: Index of the first byte of the state in (s) => (0)
+    :param ri: Index of the first byte of the round key in (rx) => (0)
+    :param bx: Scratch buffer for shift_rows [memoryview, SizeOf 16] => (New copy)
     :return: The passed state (s) after the transformations
     """
-    add_rows(s, rx)
-    mix_columns(s, XAE_FOLD_MATRIX, XAE_GALOIS_BYTE)
-    shift_rows(s, -1)
-    return sub_bytes(s, XAE_INV_SBOX)
+    ox, sx = XAE_ORDER, XAE_ORDER**2
+    add_rows(s, rx, si, ri, sx)
+    mix_columns(s, XAE_FOLD_MATRIX, XAE_GALOIS_BYTE, si, ox)
+    shift_rows(s, -1, si, ox, bx)
+    return sub_bytes(s, XAE_INV_SBOX, si, si+sx)
 # <=========================================================================>
-def xwh_round(s: list, rx: list | tuple) -> list:
+def xwh_round(s: list, rx: list | tuple, si: int = 0, ri: int = 0, bx: memoryview | None = None) -> list:
     """
-    Perform a single round of the XWH hash algorithm
+    Perform a single round of the XWH hash algorithm, in place
 
     :param s: State matrix to be transformed [8x8]
     :param rx: Round key to be added to the state [512bit]
+    :param si: Index of the first byte of the state in (s) => (0)
+    :param ri: Index of the first byte of the round key in (rx) => (0)
+    :param bx: Scratch buffer for shift_rows [memoryview, SizeOf 64] => (New copy)
     :return: The passed state (s) after the transformations
     """
-    sub_bytes(s, XWH_SBOX)
-    shift_rows(s, 1)
-    mix_columns(s, XWH_SPREAD_MATRIX, XWH_GALOIS_BYTE)
-    return add_rows(s, rx)
+    ox, sx = XWH_ORDER, XWH_ORDER**2
+    sub_bytes(s, XWH_SBOX, si, si+sx)
+    shift_rows(s, 1, si, ox, bx)
+    mix_columns(s, XWH_SPREAD_MATRIX, XWH_GALOIS_BYTE, si, ox)
+    return add_rows(s, rx, si, ri, sx)
 # <=========================================================================>
 #  CRYPTOGRAPHIC FUNCTIONS
 # <=========================================================================>
@@ -355,15 +419,16 @@ def encrypt(s: list, k: list) -> list:
     :param k: Symmetric key used for encryption [256bit]
     :return: The encrypted input as a list [bytearray]
     """
-    si, xi, se, xe = 0, 0, 0, 0
     ox, sx, rx = XAE_ORDER, XAE_ORDER**2, XAE_ROUNDS
     l = pad_bytes(s, ox)
     k = expand_key(k, ox, rx)
-    for i in range(len(s)//sx):
-        si, se = i*sx, (i+1)*sx
-        for ii in range(rx+1):
-            xi, xe = ii*sx, (ii+1)*sx
-            s[si:se] = xae_round(s[si:se], k[xi:xe])
+    # Rounds work in place on each block through a view, with one scratch buffer
+    bx, cx = s if isinstance(s, bytearray) else bytearray(s), memoryview(bytearray(sx))
+    with memoryview(bx) as mx:
+        for i in range(len(bx)//sx):
+            for ii in range(rx+1):
+                xae_round(mx, k, i*sx, ii*sx, cx)
+    s[:] = bx
     s.append(l)
     return s
 # <=========================================================================>
@@ -375,15 +440,16 @@ def decrypt(s: list, k: list) -> list:
     :param k: Symmetric key used for decryption [256bit]
     :return: The decrypted input as a list [bytearray]
     """
-    si, xi, se, xe = 0, 0, 0, 0
     ox, sx, rx = XAE_ORDER, XAE_ORDER**2, XAE_ROUNDS
     l = s.pop()
     k = expand_key(k, ox, rx)
-    for i in range(len(s)//sx):
-        si, se = i*sx, (i+1)*sx
-        for ii in range(rx+1):
-            xi, xe = (rx-ii)*sx, (rx-ii+1)*sx
-            s[si:se] = xae_inv_round(s[si:se], k[xi:xe])
+    # Rounds work in place on each block through a view, with one scratch buffer
+    bx, cx = s if isinstance(s, bytearray) else bytearray(s), memoryview(bytearray(sx))
+    with memoryview(bx) as mx:
+        for i in range(len(bx)//sx):
+            for ii in range(rx+1):
+                xae_inv_round(mx, k, i*sx, (rx-ii)*sx, cx)
+    s[:] = bx
     return s[:-l]
 # <=========================================================================>
 def hash(s: list | tuple) -> list:
@@ -393,18 +459,19 @@ def hash(s: list | tuple) -> list:
     :param s: Input list to hash [bytearray]
     :return: The hashed input as a list [bytearray]
     """
-    sa, si, xi, se, xe = 0, 0, 0, 0, 0
-    ox, sx, rx, cx = XWH_ORDER, XWH_ORDER**2, XWH_ROUNDS, []
+    ox, sx, rx = XWH_ORDER, XWH_ORDER**2, XWH_ROUNDS
     s = bytearray(XWH_IV) + str_to_bytes(str(len(s))) + bytearray(s)
     pad_bytes(s, ox)
-    for i in range(1, (len(s)//sx)+1):
-        sa, si, se = (i-1)*sx, i*sx, (i+1)*sx
-        k = expand_skey(s[sa:si], ox, rx)
-        cx = s[si:se]
-        for ii in range(rx+1):
-            xi, xe = ii*sx, (ii+1)*sx
-            cx = xwh_round(cx, k[xi:xe])
-        s[si:se] = add_rows(add_rows(s[si:se], s[sa:si]), cx)
+    # Key schedule, state and shift scratch buffers, reused by every block
+    kx, cx, bx = memoryview(bytearray((rx+1)*sx)), memoryview(bytearray(sx)), memoryview(bytearray(sx))
+    with memoryview(s) as mx:
+        for i in range(1, len(s)//sx):
+            sa, si, se = (i-1)*sx, i*sx, (i+1)*sx
+            expand_skey(mx[sa:si], ox, rx, kx, bx)
+            cx[:] = mx[si:se]
+            for ii in range(rx+1):
+                xwh_round(cx, kx, 0, ii*sx, bx)
+            add_rows(add_rows(mx, mx, si, sa, sx), cx, si, 0, sx)
     return s[-sx:]
 # <=========================================================================>
 def halve_hash(s: list | tuple) -> list:
@@ -434,6 +501,447 @@ def pw_hash(s: list | tuple, ix: int) -> list:
         s = hash(s)
     return s
 # <=========================================================================>
+#  TABLE FUNCTIONS
+# <=========================================================================>
+def galois_tables(mx: list | tuple, gx: int) -> dict[int, bytes]:
+    """
+    Precompute the Galois field GF(2^8) multiplication tables of a matrix
+
+    :param mx: Matrix whose coefficients get a table [Square matrix]
+    :param gx: Galois modulo to use in galois multiplication
+    :return: Dict with each distinct coefficient of (mx) as key and the products of every byte by it as value [256 bytes]
+    """
+    return {c: bytes(galois_mult(c, b, gx) for b in range(256)) for c in set(mx)}
+# <=========================================================================>
+def mix_tables(mx: list | tuple, gx: int) -> tuple:
+    """
+    Precompute the substitution done by mix_columns on each row of a matrix
+
+    Every byte mix_columns writes only depends on the byte previously in its
+    position and the row of the matrix (mx) for that position, so the whole
+    operation is one substitution table per row.
+
+    :param mx: Matrix to mix columns with [Square matrix]
+    :param gx: Galois modulo to use in galois multiplication
+    :return: Tuple with the substitution table of each row [256 bytes]
+    """
+    ox, gt = int(len(mx)**(1/2)), galois_tables(mx, gx)
+    tx = []
+    for i in range(ox):
+        t = bytearray(256)
+        for ii in range(ox):
+            t = bytearray(a ^ b for a, b in zip(t, gt[mx[(ox*i)+ii]]))
+        tx.append(bytes(t))
+    return tuple(tx)
+# <=========================================================================>
+def round_tables(*tx: bytes | tuple) -> bytes | tuple:
+    """
+    Combine substitution tables applied one after the other into one table per row
+
+    Substitution boxes (bytes) and row tables (tuples of bytes) can be mixed.
+    When every row ends up with the same table, the single table is returned.
+
+    :param tx: Substitution tables or tuples of row tables, in order of application
+    :return: The combined table, or a tuple with the combined table of each row [256 bytes]
+    """
+    ox = max((len(t) for t in tx if isinstance(t, tuple)), default=1)
+    rows = []
+    for i in range(ox):
+        r = bytes(range(256))
+        for t in tx:
+            r = r.translate(t[i] if isinstance(t, tuple) else t)
+        rows.append(r)
+    return rows[0] if (len(set(rows)) == 1) else tuple(rows)
+# <=========================================================================>
+def shift_table(ox: int, dx: int = 1) -> tuple:
+    """
+    Precompute the permutation done by shift_rows on a matrix
+
+    :param ox: Order of the matrix
+    :param dx: The direction of the shift [1, -1] => (1)
+    :return: Tuple with the source position of each position after the shift
+    """
+    return tuple((ox*i)+((ii+(i*dx)) % ox) for i in range(ox) for ii in range(ox))
+# <=========================================================================>
+#  TABLES
+# <=========================================================================>
+#  Combined sub_bytes and mix_columns substitution of a round, by row
+#  (shift_rows keeps bytes in their row, so they can be substituted first)
+# <=========================================================================>
+XAE_ROUND_TABLES: bytes | tuple = round_tables(bytes(XAE_SBOX), mix_tables(XAE_SPREAD_MATRIX, XAE_GALOIS_BYTE))
+XAE_INV_ROUND_TABLES: bytes | tuple = round_tables(mix_tables(XAE_FOLD_MATRIX, XAE_GALOIS_BYTE), bytes(XAE_INV_SBOX))
+# <=========================================================================>
+XWH_ROUND_TABLES: bytes | tuple = round_tables(bytes(XWH_SBOX), mix_tables(XWH_SPREAD_MATRIX, XWH_GALOIS_BYTE))
+# <=========================================================================>
+#  Source positions of the shift_rows permutations
+# <=========================================================================>
+XAE_SHIFT: tuple = shift_table(XAE_ORDER, 1)
+XAE_INV_SHIFT: tuple = shift_table(XAE_ORDER, -1)
+# <=========================================================================>
+XWH_SHIFT: tuple = shift_table(XWH_ORDER, 1)
+# <=========================================================================>
+#  Round constant added to each XWH key schedule, as an integer
+# <=========================================================================>
+XWH_RCONST_INT: int = int.from_bytes(bytes(XWH_RCONST) + bytes((XWH_ORDER**2) - len(XWH_RCONST)))
+# <=========================================================================>
+#  FAST ATOMIC FUNCTIONS
+# <=========================================================================>
+def translate_rows(s: bytes, tx: bytes | tuple, ox: int) -> bytes:
+    """
+    Substitute bytes of consecutive matrices using one table per row
+
+    :param s: Bytes of the matrices to be substituted [SizeOf multiple of ox^2]
+    :param tx: Substitution table for every row, or tuple with the table of each row [256 bytes]
+    :param ox: Order of the matrices
+    :return: New bytes with each byte substituted according to the table of its row
+    """
+    if isinstance(tx, bytes):
+        return s.translate(tx)
+    sx, bx = ox**2, bytearray(s)
+    for i in range(sx):
+        bx[i::sx] = bx[i::sx].translate(tx[i//ox])
+    return bytes(bx)
+# <=========================================================================>
+def permute(s: bytes, px: tuple) -> bytes:
+    """
+    Permute bytes of consecutive matrices
+
+    :param s: Bytes of the matrices to be permuted [SizeOf multiple of SizeOf (px)]
+    :param px: Source position of each position in a matrix
+    :return: New bytes with the bytes of every matrix permuted
+    """
+    sx = len(px)
+    # Single matrix, one lookup per byte
+    if (len(s) == sx):
+        return bytes(itemgetter(*px)(s))
+    # Many matrices, one strided copy per position
+    bx = bytearray(len(s))
+    for i in range(sx):
+        bx[i::sx] = s[px[i]::sx]
+    return bytes(bx)
+# <=========================================================================>
+def xor_bytes(ax: bytes, bx: bytes) -> bytes:
+    """
+    Add two byte strings with elements in the Galois field GF(2^8)
+
+    The byte strings are added as integers, so the work is done in C.
+
+    :param ax: First byte string to be added
+    :param bx: Second byte string to be added [SizeOf (ax)]
+    :return: New bytes with (ax) and (bx) added
+    """
+    return (int.from_bytes(ax) ^ int.from_bytes(bx)).to_bytes(len(ax))
+# <=========================================================================>
+def xor_fold(s: bytes) -> int:
+    """
+    Add every byte of a byte string in the Galois field GF(2^8)
+
+    The byte string is folded in halves as an integer, so the work is done in C.
+
+    :param s: Byte string to be folded
+    :return: The sum of every byte of (s) [0, 255]
+    """
+    x, n = int.from_bytes(s), len(s)
+    while n > 1:
+        h = n // 2
+        x = (x >> (8*(n-h))) ^ (x & ((1 << (8*(n-h))) - 1))
+        n -= h
+    return x
+# <=========================================================================>
+def fast_pad_bytes(bx: bytearray, ox: int) -> int:
+    """
+    Pad a byte array until its length is a multiple of a given matrix order, as pad_bytes
+
+    :param bx: Byte array to be padded
+    :param ox: Order to which the byte array should be padded
+    :return: The number of padding bytes added to the byte array
+    """
+    ox **= 2
+    px, lx = PADDING_BYTE ^ xor_fold(bx), ox - (len(bx) % ox)
+    bx += bytes((px,)) * lx
+    return lx
+# <=========================================================================>
+#  VECTOR FUNCTIONS
+# <=========================================================================>
+def vector_translate(a: 'np.ndarray', tx: bytes | tuple, ox: int) -> 'np.ndarray':
+    """
+    Substitute bytes of an array of matrices using one table per row, as translate_rows
+
+    :param a: Array of matrices to be substituted [(n, ox^2) uint8]
+    :param tx: Substitution table for every row, or tuple with the table of each row [256 bytes]
+    :param ox: Order of the matrices
+    :return: New array with each byte substituted according to the table of its row
+    """
+    if isinstance(tx, bytes):
+        return np.frombuffer(tx, np.uint8)[a]
+    return np.frombuffer(b''.join(tx), np.uint8).reshape(ox, 256)[np.arange(ox**2)//ox, a]
+# <=========================================================================>
+def vector_encrypt(s: bytes, k: bytes) -> bytes:
+    """
+    Encrypt padded blocks with an expanded key using XAE, every block at once
+
+    :param s: Padded input bytes to encrypt [SizeOf multiple of 16]
+    :param k: Expanded key, as given by expand_key [(rounds + 1) * 16 bytes]
+    :return: The encrypted blocks, without the padding length
+    """
+    ox, sx, rx = XAE_ORDER, XAE_ORDER**2, XAE_ROUNDS
+    a = np.frombuffer(s, np.uint8).reshape(-1, sx)
+    kx = np.frombuffer(k, np.uint8).reshape(rx+1, sx)
+    px = np.array(XAE_SHIFT)
+    for ii in range(rx+1):
+        a = vector_translate(a, XAE_ROUND_TABLES, ox)[:, px] ^ kx[ii]
+    return a.tobytes()
+# <=========================================================================>
+def vector_decrypt(s: bytes, k: bytes) -> bytes:
+    """
+    Decrypt blocks with an expanded key using XAE, every block at once
+
+    :param s: Encrypted bytes to decrypt, without the padding length [SizeOf multiple of 16]
+    :param k: Expanded key, as given by expand_key [(rounds + 1) * 16 bytes]
+    :return: The decrypted blocks, still padded
+    """
+    ox, sx, rx = XAE_ORDER, XAE_ORDER**2, XAE_ROUNDS
+    a = np.frombuffer(s, np.uint8).reshape(-1, sx)
+    kx = np.frombuffer(k, np.uint8).reshape(rx+1, sx)
+    px = np.array(XAE_INV_SHIFT)
+    for ii in range(rx+1):
+        a = vector_translate(a ^ kx[rx-ii], XAE_INV_ROUND_TABLES, ox)[:, px]
+    return a.tobytes()
+# <=========================================================================>
+#  FAST CRYPTOGRAPHIC FUNCTIONS
+# <=========================================================================>
+def fast_encrypt_blocks(s: bytes, k: bytes) -> bytes:
+    """
+    Encrypt whole blocks with an expanded key using XAE, without padding
+
+    Every block goes trough each round at once, with table substitutions.
+    Long inputs are vectorized with NumPy when it is installed.
+
+    :param s: Input bytes to encrypt [SizeOf multiple of 16]
+    :param k: Expanded key, as given by expand_key [(rounds + 1) * 16 bytes]
+    :return: The encrypted blocks
+    """
+    ox, sx, rx = XAE_ORDER, XAE_ORDER**2, XAE_ROUNDS
+    n = len(s)//sx
+    if (np is not None) and (n >= XAE_VECTOR_BLOCKS):
+        return vector_encrypt(s, k)
+    for ii in range(rx+1):
+        s = xor_bytes(permute(translate_rows(s, XAE_ROUND_TABLES, ox), XAE_SHIFT), k[ii*sx:(ii+1)*sx]*n)
+    return s
+# <=========================================================================>
+def fast_encrypt(s: bytes | list, k: bytes | list) -> bytearray:
+    """
+    Encrypt a list of bytes with a key using XAE, as encrypt
+
+    The input is not modified.
+
+    :param s: Input bytes to encrypt [bytearray]
+    :param k: Symmetric key used for encryption [256bit]
+    :return: The encrypted input as a new bytearray
+    """
+    ox, rx = XAE_ORDER, XAE_ROUNDS
+    bx = bytearray(s)
+    l = fast_pad_bytes(bx, ox)
+    bx = bytearray(fast_encrypt_blocks(bytes(bx), bytes(expand_key(list(k), ox, rx))))
+    bx.append(l)
+    return bx
+# <=========================================================================>
+def fast_decrypt_blocks(s: bytes, k: bytes) -> bytes:
+    """
+    Decrypt whole blocks with an expanded key using XAE, keeping the padding
+
+    Every block goes trough each round at once, with table substitutions.
+    Long inputs are vectorized with NumPy when it is installed.
+
+    :param s: Input bytes to decrypt [SizeOf multiple of 16]
+    :param k: Expanded key, as given by expand_key [(rounds + 1) * 16 bytes]
+    :return: The decrypted blocks
+    """
+    ox, sx, rx = XAE_ORDER, XAE_ORDER**2, XAE_ROUNDS
+    n = len(s)//sx
+    if (np is not None) and (n >= XAE_VECTOR_BLOCKS):
+        return vector_decrypt(s, k)
+    for ii in range(rx+1):
+        s = permute(translate_rows(xor_bytes(s, k[(rx-ii)*sx:(rx-ii+1)*sx]*n), XAE_INV_ROUND_TABLES, ox), XAE_INV_SHIFT)
+    return s
+# <=========================================================================>
+def fast_decrypt(s: bytes | list, k: bytes | list) -> bytearray:
+    """
+    Decrypt a list of bytes with a key using XAE, as decrypt
+
+    The input is not modified.
+
+    :param s: Input bytes to decrypt [bytearray]
+    :param k: Symmetric key used for decryption [256bit]
+    :return: The decrypted input as a new bytearray
+    """
+    l = s[-1]
+    x = fast_decrypt_blocks(bytes(s[:-1]), bytes(expand_key(list(k), XAE_ORDER, XAE_ROUNDS)))
+    return bytearray(x[:-l])
+# <=========================================================================>
+def fast_expand_skey(s: bytes) -> tuple:
+    """
+    Expand key generating one XWH key schedule, as expand_skey
+
+    :param s: Initial key to be expanded [512bit]
+    :return: Tuple with the key of each round as an integer
+    """
+    ox, rx = XWH_ORDER, XWH_ROUNDS
+    kx = [int.from_bytes(s)]
+    for _ in range(rx):
+        s = (int.from_bytes(permute(translate_rows(s, XWH_ROUND_TABLES, ox), XWH_SHIFT)) ^ XWH_RCONST_INT).to_bytes(len(s))
+        kx.append(int.from_bytes(s))
+    return tuple(kx)
+# <=========================================================================>
+def fast_compress(cv: bytes, bx: bytes) -> bytes:
+    """
+    Chain one block into an XWH chaining value, as each block of hash
+
+    :param cv: Chaining value, the previous block once chained [512bit]
+    :param bx: Block to be chained [512bit]
+    :return: The block once chained, next chaining value [512bit]
+    """
+    ox, sx = XWH_ORDER, XWH_ORDER**2
+    cx = bytes(bx)
+    for rk in fast_expand_skey(cv):
+        cx = (int.from_bytes(permute(translate_rows(cx, XWH_ROUND_TABLES, ox), XWH_SHIFT)) ^ rk).to_bytes(sx)
+    return (int.from_bytes(bx) ^ int.from_bytes(cv) ^ int.from_bytes(cx)).to_bytes(sx)
+# <=========================================================================>
+def fast_hash(s: bytes | list) -> bytearray:
+    """
+    Hash a list of bytes using XWH, as hash
+
+    :param s: Input bytes to hash [bytearray]
+    :return: The hashed input as a new bytearray
+    """
+    ox, sx = XWH_ORDER, XWH_ORDER**2
+    bx = bytearray(XWH_IV) + str_to_bytes(str(len(s))) + bytearray(s)
+    fast_pad_bytes(bx, ox)
+    bx = bytes(bx)
+    # Chaining value, starting with the first block
+    cv = bx[:sx]
+    for i in range(1, len(bx)//sx):
+        cv = fast_compress(cv, bx[i*sx:(i+1)*sx])
+    return bytearray(cv)
+# <=========================================================================>
+def fast_pw_hash(s: bytes | list, ix: int) -> bytearray:
+    """
+    Hash a list of bytes multiple times, as pw_hash
+
+    :param s: Bytes to be hashed
+    :param ix: Number of times to apply the hash function
+    :return: Final hashed bytes after the specified number of iterations
+    """
+    for _ in range(ix):
+        s = fast_hash(s)
+    return bytearray(s)
+# <=========================================================================>
+#  CIPHER CONTEXTS
+# <=========================================================================>
+class XAE:
+    """
+    XAE cipher context, holding the key schedule of one key
+
+    The key gets expanded once and kept as bytes, so encrypting many messages with
+    the same key does not pay for the expansion on each one. Batches of messages are
+    processed in a single pass over every block of every message.
+    """
+    def __init__(self, k: bytes | list) -> None:
+        """
+        XAE object constructor
+
+        :param k: Symmetric key [256bit]
+        :raise ValueError: When the key length is invalid
+        """
+        if (len(k) != 2*(XAE_ORDER**2)):
+            raise ValueError('Invalid key length for XAE!')
+        self.__k: bytes = bytes(expand_key(list(k), XAE_ORDER, XAE_ROUNDS))
+
+    @property
+    def key(self) -> bytes:
+        """
+        Get the key schedule
+
+        :return: The expanded key, as given by expand_key [(rounds + 1) * 16 bytes]
+        """
+        return self.__k
+
+    def encrypt(self, s: bytes | list) -> bytearray:
+        """
+        Encrypt a list of bytes, as fast_encrypt
+
+        :param s: Input bytes to encrypt [bytearray]
+        :return: The encrypted input as a new bytearray
+        """
+        return self.encrypt_many((s,))[0]
+
+    def decrypt(self, s: bytes | list) -> bytearray:
+        """
+        Decrypt a list of bytes, as fast_decrypt
+
+        :param s: Input bytes to decrypt [bytearray]
+        :return: The decrypted input as a new bytearray
+        """
+        return self.decrypt_many((s,))[0]
+
+    def encrypt_many(self, sx: Iterable) -> list:
+        """
+        Encrypt many lists of bytes at once, as fast_encrypt on each one
+
+        :param sx: Input bytes to encrypt [Iterable[bytearray]]
+        :return: The encrypted inputs, in the same order [list[bytearray]]
+        """
+        bx, lx = bytearray(), []
+        for s in sx:
+            # Pad each message on its own
+            mx = bytearray(s)
+            lx.append((len(bx), fast_pad_bytes(mx, XAE_ORDER)))
+            bx += mx
+        x, cx = fast_encrypt_blocks(bytes(bx), self.__k), []
+        for i, (st, l) in enumerate(lx):
+            se = lx[i+1][0] if (i+1 < len(lx)) else len(x)
+            c = bytearray(x[st:se])
+            c.append(l)
+            cx.append(c)
+        return cx
+
+    def decrypt_many(self, sx: Iterable) -> list:
+        """
+        Decrypt many lists of bytes at once, as fast_decrypt on each one
+
+        :param sx: Input bytes to decrypt [Iterable[bytearray]]
+        :return: The decrypted inputs, in the same order [list[bytearray]]
+        """
+        bx, lx = bytearray(), []
+        for s in sx:
+            lx.append((len(bx), len(s) - 1, s[-1]))
+            bx += s[:-1]
+        x = fast_decrypt_blocks(bytes(bx), self.__k)
+        return [bytearray(x[st:st+n-l]) for st, n, l in lx]
+# <=========================================================================>
+#  Cipher contexts of the most recently used keys, by key fingerprint
+# <=========================================================================>
+XAE_CONTEXTS: ConcurrentCache = ConcurrentCache(64, stripes=4)
+# <=========================================================================>
+def fingerprint(k: bytes | list) -> bytes:
+    """
+    Get the fingerprint of a key, identifying it without keeping it
+
+    :param k: Key to get the fingerprint of
+    :return: The fingerprint [128bit]
+    """
+    return blake2b(bytes(k), digest_size=16, person=b'XAE-context').digest()
+# <=========================================================================>
+def cipher(k: bytes | list) -> XAE:
+    """
+    Get the cipher context of a key, reusing it while it is among the most recently used
+
+    :param k: Symmetric key [256bit]
+    :return: The cipher context
+    :raise ValueError: When the key length is invalid
+    """
+    return XAE_CONTEXTS.get_or_compute(fingerprint(k), lambda: XAE(k))
+# <=========================================================================>
 #  CRYPTOGRAPHIC WRAPPER FUNCTIONS
 # <=========================================================================>
 def encrypt_str(s: str, k: str) -> str:
@@ -445,9 +953,8 @@ def encrypt_str(s: str, k: str) -> str:
     :return: The encrypted input as a string [hex -> str]
     """
     return bytes_to_hex(
-        encrypt(
-            str_to_bytes(s),
-            hex_to_bytes(k)
+        cipher(hex_to_bytes(k)).encrypt(
+            str_to_bytes(s)
         )
     )
 # <=========================================================================>
@@ -460,9 +967,8 @@ def decrypt_str(s: str, k: str) -> str:
     :return: The decrypted input as a string [str]
     """
     return bytes_to_str(
-        decrypt(
-            hex_to_bytes(s),
-            hex_to_bytes(k)
+        cipher(hex_to_bytes(k)).decrypt(
+            hex_to_bytes(s)
         )
     )
 # <=========================================================================>
@@ -474,7 +980,7 @@ def hash_str(s: str) -> str:
     :return: The hashed input as a string [hex -> str]
     """
     return bytes_to_hex(
-        hash(
+        fast_hash(
             str_to_bytes(s)
         )
     )
@@ -508,11 +1014,362 @@ def pw_hash_str(s: str, ix: int) -> str:
     :return: Final hashed value after the specified number of iterations [hex -> str]
     """
     return bytes_to_hex(
-        pw_hash(
+        fast_pw_hash(
             str_to_bytes(s), ix
         )
     )
 # <=========================================================================>
+#  BATCH FUNCTIONS
+# <=========================================================================>
+#  Long-lived process pool reused by batch functions, created on demand
+# <=========================================================================>
+HASH_POOL: ProcessPoolExecutor | None = None
+HASH_POOL_WORKERS: int = 0
+HASH_POOL_PID: int = 0
+HASH_POOL_LOCK: Lock = Lock()
+# <=========================================================================>
+def hash_chunk(sx: list) -> list:
+    """
+    Hash a chunk of strings using XWH, as hash_str
+
+    Runs in the worker processes of hash_many.
+
+    :param sx: Input strings to hash [list[str]]
+    :return: The hashed inputs, in the same order [list[hex -> str]]
+    """
+    return [bytes_to_hex(fast_hash(str_to_bytes(s))) for s in sx]
+# <=========================================================================>
+def hash_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Get the long-lived process pool used by batch functions
+
+    The pool is created on first use, and created again when a different number
+    of workers is asked for or when used from a forked child, which cannot use
+    the pool of its parent.
+
+    :param workers: Number of worker processes => (Current pool size, or one per CPU)
+    :return: The process pool
+    """
+    global HASH_POOL, HASH_POOL_WORKERS, HASH_POOL_PID
+    with HASH_POOL_LOCK:
+        # Pool of the parent process, forget it without shutting it down
+        if (HASH_POOL_PID != getpid()):
+            HASH_POOL = None
+        if HASH_POOL and workers and (workers != HASH_POOL_WORKERS):
+            HASH_POOL.shutdown(wait=True)
+            HASH_POOL = None
+        if not HASH_POOL:
+            HASH_POOL_WORKERS = workers or cpu_count() or 1
+            # Workers are not forked, forking is unsafe once threads are running
+            HASH_POOL = ProcessPoolExecutor(HASH_POOL_WORKERS, mp_context=get_context(METHOD))
+            HASH_POOL_PID = getpid()
+        return HASH_POOL
+# <=========================================================================>
+def close_hash_pool() -> None:
+    """
+    Shut down the long-lived process pool used by batch functions
+
+    If there is no pool the operation fails silently.
+    """
+    global HASH_POOL
+    with HASH_POOL_LOCK:
+        if HASH_POOL and (HASH_POOL_PID == getpid()):
+            HASH_POOL.shutdown(wait=True)
+        HASH_POOL = None
+# <=========================================================================>
+def hash_many(sx: Iterable, workers: int | None = None, reuse: bool = False, chunksize: int | None = None) -> list:
+    """
+    Hash many strings using XWH, spreading them across worker processes
+
+    Strings are split in chunks, about four per worker, so each process gets
+    enough work to outweigh sending it. The results keep the input order.
+    With a single worker or a single chunk the strings are hashed in this process.
+
+    :param sx: Input strings to hash [Iterable[str]]
+    :param workers: Number of worker processes => (One per CPU, or the size of the long-lived pool)
+    :param reuse: Use the long-lived pool from hash_pool instead of a new one => (False)
+    :param chunksize: Number of strings sent to a worker at once => (Four chunks per worker)
+    :return: The hashed inputs, in the same order [list[hex -> str]]
+    """
+    sx = list(sx)
+    if (workers is not None) and (workers <= 0):
+        raise ValueError('Invalid \'workers\' for hash_many!')
+    if (chunksize is not None) and (chunksize <= 0):
+        raise ValueError('Invalid \'chunksize\' for hash_many!')
+    if not sx:
+        return []
+    pool = hash_pool(workers) if reuse else None
+    workers = HASH_POOL_WORKERS if reuse else (workers or cpu_count() or 1)
+    chunksize = chunksize or -(-len(sx) // (workers*4))
+    cx = [sx[i:i+chunksize] for i in range(0, len(sx), chunksize)]
+    if (workers == 1) or (len(cx) == 1):
+        return hash_chunk(sx)
+    if pool:
+        return [h for c in pool.map(hash_chunk, cx) for h in c]
+    with ProcessPoolExecutor(workers, mp_context=get_context(METHOD)) as pool:
+        return [h for c in pool.map(hash_chunk, cx) for h in c]
+# <=========================================================================>
+#  STREAMING CLASSES
+# <=========================================================================>
+class XWH:
+    """
+    Incremental XWH hash object, with the interface of hashlib objects
+
+    Blocks are chained as data arrives, so memory use does not depend on the message length.
+    hash puts the message length before the message, so digests only match hash when the
+    length is given up front. Otherwise the length is put after the message instead, giving
+    a different digest for the same message.
+    """
+    name: str = 'xwh'
+    digest_size: int = XWH_ORDER**2
+    block_size: int = XWH_ORDER**2
+
+    def __init__(self, data: bytes = b'', length: int | None = None) -> None:
+        """
+        XWH object constructor
+
+        :param data: First bytes of the message => (b'')
+        :param length: Length of the whole message, to get the same digest as hash => (Unknown)
+        """
+        self.__length: int | None = length
+        self.__count: int = 0
+        # Chaining value, starting with the first block
+        self.__cv: bytes = bytes(XWH_IV)
+        self.__buffer: bytearray = bytearray()
+        # Sum of every byte, needed by the padding
+        self.__xor: int = xor_fold(self.__cv)
+        if (length is not None):
+            self.__feed(str_to_bytes(str(length)))
+        self.update(data)
+
+    def update(self, data: bytes) -> None:
+        """
+        Add bytes to the message
+
+        :param data: Next bytes of the message [bytes-like]
+        """
+        self.__count += len(data)
+        self.__feed(data)
+
+    def copy(self) -> 'XWH':
+        """
+        Copy the hash object, to get digests of messages sharing a prefix
+
+        :return: A new hash object with the same state
+        """
+        cx = XWH.__new__(XWH)
+        cx.__length, cx.__count, cx.__cv, cx.__xor = self.__length, self.__count, self.__cv, self.__xor
+        cx.__buffer = bytearray(self.__buffer)
+        return cx
+
+    def digest(self) -> bytes:
+        """
+        Get the digest of the message so far, the hash object can still be updated
+
+        :return: The hashed message [512bit]
+        :raise ValueError: When the message length differs from the length given up front
+        """
+        sx = type(self).block_size
+        if (self.__length is not None) and (self.__count != self.__length):
+            raise ValueError(f'Message length is {self.__count}, not {self.__length}!')
+        cx = self.copy()
+        if (self.__length is None):
+            cx.__feed(str_to_bytes(str(self.__count)))
+        # Same padding as pad_bytes
+        bx = cx.__buffer + bytes((PADDING_BYTE ^ cx.__xor,)) * (sx - (len(cx.__buffer) % sx))
+        cv = cx.__cv
+        for i in range(0, len(bx), sx):
+            cv = fast_compress(cv, bx[i:i+sx])
+        return cv
+
+    def hexdigest(self) -> str:
+        """
+        Get the digest of the message so far as a string, as hash_str
+
+        :return: The hashed message as a string [hex -> str]
+        """
+        return bytes_to_hex(self.digest())
+
+    def __feed(self, data: bytes) -> None:
+        """
+        Chain every complete block, keeping the rest buffered
+
+        :param data: Bytes to be chained [bytes-like]
+        """
+        sx = type(self).block_size
+        self.__xor ^= xor_fold(data)
+        bx = self.__buffer
+        bx += data
+        n = len(bx) - (len(bx) % sx)
+        for i in range(0, n, sx):
+            self.__cv = fast_compress(self.__cv, bx[i:i+sx])
+        del bx[:n]
+# <=========================================================================>
+def hash_file(path: str | PathLike, size: int = 1 << 16) -> str:
+    """
+    Hash a file using XWH, reading it in chunks into a reusable buffer
+
+    The file size is given to the hash object, so the result is the same as hash_str
+    on the contents would give.
+
+    :param path: Path of the file to hash
+    :param size: Size of the read buffer in bytes => (64KiB)
+    :return: The hashed file contents as a string [hex -> str]
+    """
+    bx = bytearray(size)
+    mx = memoryview(bx)
+    with open(path, 'rb') as f:
+        hx = XWH(length=fstat(f.fileno()).st_size)
+        while (n := f.readinto(bx)):
+            hx.update(mx[:n])
+    return hx.hexdigest()
+# <=========================================================================>
+def ctr_xor(s: bytes, k: bytes, nonce: bytes, offset: int) -> bytes:
+    """
+    En/decrypt bytes at any position of a stream using XAE in counter mode
+
+    Each block of keystream is the encryption of the nonce followed by the block
+    number, so any part of the stream can be processed on its own.
+
+    :param s: Input bytes to en/decrypt
+    :param k: Expanded key, as given by expand_key [(rounds + 1) * 16 bytes]
+    :param nonce: Nonce of the stream [XAE_NONCE_SIZE bytes]
+    :param offset: Position of the input in the stream, in bytes
+    :return: The en/decrypted input
+    """
+    sx = XAE_ORDER**2
+    bi, si = divmod(offset, sx)
+    cx = b''.join(nonce + (bi+i).to_bytes(sx - len(nonce)) for i in range(-(-(si + len(s)) // sx)))
+    return xor_bytes(s, fast_encrypt_blocks(cx, k)[si:si+len(s)])
+# <=========================================================================>
+class XAECTR:
+    """
+    Stream cipher object using XAE in counter mode
+
+    Encrypting and decrypting are the same operation, so update does both.
+    Memory use does not depend on the stream length, and the stream can be processed
+    in any order with seek. Counter mode gives no integrity, a modified ciphertext
+    decrypts to modified plaintext without error. A nonce must never be reused with the same key.
+    """
+    def __init__(self, k: bytes | list, nonce: bytes | None = None) -> None:
+        """
+        XAECTR object constructor
+
+        :param k: Symmetric key [256bit]
+        :param nonce: Nonce of the stream [XAE_NONCE_SIZE bytes] => (Random)
+        :raise ValueError: When the nonce length is invalid
+        """
+        nonce = urandom(XAE_NONCE_SIZE) if (nonce is None) else bytes(nonce)
+        if (len(nonce) != XAE_NONCE_SIZE):
+            raise ValueError('Invalid \'nonce\' for XAECTR!')
+        self.__k: bytes = cipher(k).key
+        self.__nonce: bytes = nonce
+        self.__offset: int = 0
+
+    @property
+    def nonce(self) -> bytes:
+        """
+        Get the nonce of the stream, needed to decrypt it
+
+        :return: The nonce [XAE_NONCE_SIZE bytes]
+        """
+        return self.__nonce
+
+    @property
+    def offset(self) -> int:
+        """
+        Get the position in the stream
+
+        :return: The number of bytes before the next one to process
+        """
+        return self.__offset
+
+    def seek(self, offset: int) -> None:
+        """
+        Move to a position in the stream
+
+        :param offset: The number of bytes before the next one to process
+        """
+        self.__offset = offset
+
+    def update(self, data: bytes) -> bytes:
+        """
+        En/decrypt the next bytes of the stream
+
+        :param data: Next bytes of the stream [bytes-like]
+        :return: The en/decrypted bytes
+        """
+        cx = ctr_xor(bytes(data), self.__k, self.__nonce, self.__offset)
+        self.__offset += len(data)
+        return cx
+
+    def file(self, fin: Any, fout: Any, size: int = 1 << 20, workers: int | None = None) -> int:
+        """
+        En/decrypt a file object into another, from the current position in the stream
+
+        Reads go into a reusable buffer. With many workers, chunks are processed in the
+        long-lived pool from hash_pool, with at most two chunks in flight per worker.
+
+        :param fin: Binary file object to read from
+        :param fout: Binary file object to write to
+        :param size: Size of the chunks in bytes => (1MiB)
+        :param workers: Number of worker processes => (None, in this process)
+        :return: The number of bytes processed
+        """
+        bx, st = bytearray(size), self.__offset
+        mx = memoryview(bx)
+        # Process sequentially
+        if not workers or (workers == 1):
+            while (n := fin.readinto(bx)):
+                fout.write(self.update(mx[:n]))
+            return self.__offset - st
+        # Process in parallel, writing in order
+        pool, fx = hash_pool(workers), deque()
+        while (n := fin.readinto(bx)):
+            fx.append(pool.submit(ctr_xor, bytes(mx[:n]), self.__k, self.__nonce, self.__offset))
+            self.__offset += n
+            if (len(fx) >= 2*workers):
+                fout.write(fx.popleft().result())
+        while fx:
+            fout.write(fx.popleft().result())
+        return self.__offset - st
+# <=========================================================================>
+def encrypt_file(src: str | PathLike, dst: str | PathLike, k: bytes | list, size: int = 1 << 20, workers: int | None = None) -> bytes:
+    """
+    Encrypt a file using XAE in counter mode, with a random nonce
+
+    The nonce is written first, then the ciphertext, which has the length of the file.
+
+    :param src: Path of the file to encrypt
+    :param dst: Path of the encrypted file
+    :param k: Symmetric key used for encryption [256bit]
+    :param size: Size of the chunks in bytes => (1MiB)
+    :param workers: Number of worker processes => (None, in this process)
+    :return: The nonce used [XAE_NONCE_SIZE bytes]
+    """
+    cx = XAECTR(k)
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        fout.write(cx.nonce)
+        cx.file(fin, fout, size, workers)
+    return cx.nonce
+# <=========================================================================>
+def decrypt_file(src: str | PathLike, dst: str | PathLike, k: bytes | list, size: int = 1 << 20, workers: int | None = None) -> None:
+    """
+    Decrypt a file encrypted with encrypt_file
+
+    :param src: Path of the encrypted file
+    :param dst: Path of the decrypted file
+    :param k: Symmetric key used for decryption [256bit]
+    :param size: Size of the chunks in bytes => (1MiB)
+    :param workers: Number of worker processes => (None, in this process)
+    :raise ValueError: When the file is too short to hold a nonce
+    """
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        nonce = fin.read(XAE_NONCE_SIZE)
+        if (len(nonce) != XAE_NONCE_SIZE):
+            raise ValueError('Encrypted file has no nonce!')
+        XAECTR(k, nonce).file(fin, fout, size, workers)
+# <=========================================================================>
 #  DATA UTILS
 # <=========================================================================>
 def pad_bytes(bx: list, ox: int) -> int:
@@ -594,6 +1451,11 @@ def tests() -> None:
     - Determinism of hash operation (hash)
     - Correctness of power hash operation (pw_hash)
     - Determinism of power hash operation (pw_hash)
+    - Equality of the fast functions and the reference functions (fast_*)
+    - Equality of the vectorized functions and the reference functions (vector_*)
+    - Equality of streaming, file and batch hashing and the hash of a string (XWH, hash_*)
+    - Equality of seeking and sequential counter mode streams (XAECTR)
+    - Inversion of parallel counter mode file encryption (de/encrypt_file)
 
     The tests use predefined input values and check that the transformations return the expected results.
     If an assertion fails, it indicates a discrepancy in the implementation of the functions being tested.
@@ -680,6 +1542,89 @@ def tests() -> None:
 
     # Power hash determinism test
     assert list_eq(pw_hash(list(tx), 5), pw_hash(list(tx), 5))
+
+    # Fast encryption equality test, from a single block to many
+    for mx in (tx, tx*2, tx*8):
+        assert list_eq(
+            encrypt(list(mx), list(kx)),
+            fast_encrypt(mx, kx)
+        )
+        assert list_eq(
+            decrypt(encrypt(list(mx), list(kx)), list(kx)),
+            fast_decrypt(fast_encrypt(mx, kx), kx)
+        )
+
+    # Vectorized encryption equality test, enough blocks for NumPy plus a partial block
+    mx = tx*((XAE_VECTOR_BLOCKS*XAE_ORDER**2)//len(tx) + 4)
+    assert (len(mx) // XAE_ORDER**2 >= XAE_VECTOR_BLOCKS) and (len(mx) % XAE_ORDER**2)
+    cx = encrypt(list(mx), list(kx))
+    assert list_eq(cx, fast_encrypt(mx, kx))
+    assert list_eq(decrypt(list(cx), list(kx)), fast_decrypt(cx, kx))
+    assert list_eq(mx, fast_decrypt(fast_encrypt(mx, kx), kx))
+
+    # Fast hash equality test, from a single block to many
+    assert list_eq(hx, fast_hash(tx))
+    assert list_eq(hash(list(tx*16)), fast_hash(tx*16))
+
+    # Fast power hash equality test
+    assert list_eq(h5x, fast_pw_hash(tx, 5))
+
+    # Cipher context equality test, one message and many at once
+    assert list_eq(encrypt(list(tx), list(kx)), cipher(kx).encrypt(tx))
+    for cx, mx in zip(cipher(kx).encrypt_many((tx, tx*2, b'')), (tx, tx*2, b'')):
+        assert list_eq(encrypt(list(mx), list(kx)), cx)
+        assert list_eq(mx, cipher(kx).decrypt_many((cx,))[0])
+
+    # Streaming hash equality test, in chunks of any size with and without the length up front
+    from tempfile import TemporaryDirectory
+    from os.path import join
+    ms = 'TestsPassed'*50
+    mx, hs = str_to_bytes(ms), hash_str(ms)
+    hu = XWH(mx).hexdigest()
+    for n in (1, 7, XWH.block_size, 100, len(mx)):
+        hx, ux = XWH(length=len(mx)), XWH()
+        for i in range(0, len(mx), n):
+            hx.update(mx[i:i+n])
+            ux.update(mx[i:i+n])
+        assert (hx.hexdigest() == hs)
+        assert (ux.hexdigest() == hu)
+    assert (XWH(mx, length=len(mx)).hexdigest() == hs)
+
+    # File hash equality test, with a read buffer that does not fill whole blocks
+    with TemporaryDirectory() as dx:
+        with open(join(dx, 'src'), 'wb') as f:
+            f.write(mx)
+        assert (hash_file(join(dx, 'src'), size=37) == hs)
+
+    # Batch hash equality test, across new and long-lived worker pools
+    sx = [ms[:i] for i in range(0, len(ms), 25)]
+    hx = [hash_str(s) for s in sx]
+    assert (hash_many(sx, workers=2) == hx)
+    assert (hash_many(sx, workers=2, reuse=True) == hx)
+    assert (hash_many(sx, reuse=True, chunksize=1) == hx)
+
+    # Counter mode seek test, from the middle of a block against the sequential keystream
+    nx = bytes(range(XAE_NONCE_SIZE))
+    ks = XAECTR(kx, nx).update(bytes(1000))
+    cx = XAECTR(kx, nx)
+    cx.seek(37)
+    assert list_eq(ks[37:537], cx.update(bytes(500)))
+    assert list_eq(ks[537:], cx.update(bytes(463)))
+
+    # Counter mode file inversion test, in chunks that do not fill whole blocks across workers
+    with TemporaryDirectory() as dx:
+        src, enc, dec = join(dx, 'src'), join(dx, 'enc'), join(dx, 'dec')
+        with open(src, 'wb') as f:
+            f.write(urandom(10000))
+        nx = encrypt_file(src, enc, kx, size=999, workers=2)
+        with open(src, 'rb') as f, open(enc, 'rb') as g:
+            mx, cx = f.read(), g.read()
+        assert list_eq(nx, cx[:XAE_NONCE_SIZE])
+        assert list_eq(XAECTR(kx, nx).update(mx), cx[XAE_NONCE_SIZE:])
+        decrypt_file(enc, dec, kx, size=999, workers=2)
+        with open(dec, 'rb') as f:
+            assert list_eq(mx, f.read())
+    close_hash_pool()
 # <=========================================================================>
 #  SCRIPT EXECUTION
 # <=========================================================================>
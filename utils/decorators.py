@@ -14,10 +14,20 @@
 # <=====================================================================================>
 #  IMPORTS
 # <=====================================================================================>
-from typing import Any, Callable, Concatenate
+from typing import Any, Callable, Concatenate, Hashable
 from functools import wraps, update_wrapper
+from types import MethodType
+from threading import Lock, get_ident
+from concurrent.futures import Future
+from inspect import iscoroutinefunction
+import asyncio
+from weakref import WeakSet
 from time import perf_counter as clock
-from .cache import LRUCache
+from .cache import ConcurrentCache
+from .metrics import REGISTRY, Registry, Labels
+from random import random
+import re
+from sys import getsizeof
 # <=====================================================================================>
 #  TYPES
 # <=====================================================================================>
@@ -25,6 +35,12 @@ type AnyCallable = Callable[..., Any]
 type Decorator = Callable[[AnyCallable], AnyCallable]
 type ParamDecorator[**P] = Callable[Concatenate[AnyCallable, P], AnyCallable]
 # <=====================================================================================>
+#  GLOBALS
+# <=====================================================================================>
+#  Every memoized function, used for memory accounting
+# <=====================================================================================>
+MEMOIZED: WeakSet['memoize'] = WeakSet()
+# <=====================================================================================>
 #  DECORATORS
 # <=====================================================================================>
 def dec_wparams[**P](dec: ParamDecorator[P]) -> Callable[Concatenate[AnyCallable, P], AnyCallable | Decorator]:
@@ -45,22 +61,125 @@ def dec_wparams[**P](dec: ParamDecorator[P]) -> Callable[Concatenate[AnyCallable
         return _decorator_wrapper
     return decorator_wrapper
 # <=====================================================================================>
-def timed[O, **P](func: Callable[P, O]) -> Callable[P, O]:
+@dec_wparams # Decorating a decorator...
+def timed[O, **P](func: Callable[P, O], name: str | None=None, labels: Labels={}, sample: float=1.0, registry: Registry=REGISTRY, log: bool=False) -> Callable[P, O]:
     """
     Times a function's calls
 
-    Works as a decorator and returns the passed function
-    wrapped in another function that times the function's calls.
+    Works as a decorator and returns the passed function wrapped in another function
+    that records the duration of the function's calls in a '<name>_seconds' histogram
+    and counts them in a '<name>_calls_total' counter of a metrics registry.
+    Hot functions can be timed on a random sample of their calls, every call is still counted.
+    The histogram of a sampled function is named '<name>_sampled_seconds' instead, as its count
+    and sum only cover the sample, the exact number of calls being the counter's.
 
     :param func: (Callable[P, O]) Function to time calls for
+    :param name: (str | None) Base name of the metrics, defaults to the function's module and qualified name
+    :param labels: (Labels) Labels of the metrics, if any
+    :param sample: (float) Fraction of the calls that get timed, between 0 and 1, defaults to 1.0
+    :param registry: (Registry) Registry to record to, defaults to the application registry
+    :param log: (bool) Whether to also print every timed call, defaults to False
     :returns: (Callable[P, O]) Wrapped function with timing functionality
     """
+    # Metric names only allow alphanumerics and underscores
+    name = name or re.sub(r'[^a-zA-Z0-9_]', '_', f'{func.__module__}_{func.__qualname__}')
+    if (sample < 1.0):
+        histogram = registry.histogram(f'{name}_sampled_seconds', f'Duration of a {sample:g} sample of {func.__qualname__} calls', labels)
+    else:
+        histogram = registry.histogram(f'{name}_seconds', f'Duration of {func.__qualname__} calls', labels)
+    calls = registry.counter(f'{name}_calls_total', f'Number of {func.__qualname__} calls', labels)
     @wraps(func) # Mimic wrapped function signature
     def _wrapper(*args: P.args, **kwargs: P.kwargs) -> O:
-        # Compute time before and after function call
-        st, result, et = clock(), func(*args, **kwargs), clock()
-        print(f'<Call {func.__name__}{args}{kwargs} -> took {et - st:.6f} seconds>')
-        return result
+        calls.inc()
+        # Not sampled, skip timing
+        if (sample < 1.0) and (random() >= sample):
+            return func(*args, **kwargs)
+        # Compute time before and after function call, even if it raises
+        st = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            et = clock()
+            histogram.observe(et - st)
+            if log:
+                print(f'<Call {func.__name__}{args}{kwargs} -> took {et - st:.6f} seconds>')
+    return _wrapper
+# <=====================================================================================>
+@dec_wparams # Decorating a decorator...
+def singleflight[O, **P](func: Callable[P, O], key: Callable[P, Hashable] | None=None) -> Callable[P, O]:
+    """
+    Coalesces concurrent calls of a function
+
+    Works as a decorator and returns the passed function wrapped in another function
+    that lets only one caller per key compute at a time. Callers arriving while a call
+    with the same key is in flight wait for it and share its result, or its exception.
+    Nothing is kept once the call finishes, so a later call computes again.
+    Coroutine functions are coalesced per event loop, a waiter being cancelled does not cancel the shared call.
+
+    :param func: (Callable[P, O]) Function to coalesce calls of, may be a coroutine function
+    :param key: (Callable[P, Hashable] | None) Function that gives the key of a call from its arguments, defaults to the arguments themselves
+    :returns: (Callable[P, O]) Wrapped function with coalescing functionality
+    """
+    # Calls in flight by key, with the thread computing them
+    flights: dict[Hashable, tuple[Future | asyncio.Task, int]] = {}
+    lock = Lock()
+    def _key(*args: P.args, **kwargs: P.kwargs) -> Hashable | None:
+        # Key of the call, None if it cannot be hashed
+        k = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+        try:
+            hash(k)
+            return k
+        except TypeError:
+            return None
+    # Coroutine functions
+    if iscoroutinefunction(func):
+        @wraps(func) # Mimic wrapped function signature
+        async def _awrapper(*args: P.args, **kwargs: P.kwargs) -> O:
+            # Unhashable call, cannot be coalesced
+            if (k := _key(*args, **kwargs)) is None:
+                return await func(*args, **kwargs)
+            # Loops in other threads do not share tasks
+            loop = asyncio.get_running_loop()
+            k = (id(loop), k)
+            with lock:
+                if (flight := flights.get(k)) is None:
+                    # First caller, schedule the shared call
+                    task = loop.create_task(func(*args, **kwargs))
+                    flight = flights[k] = (task, get_ident())
+                    task.add_done_callback(lambda _: flights.pop(k, None))
+            # Wait for it, without cancelling it for everyone else
+            return await asyncio.shield(flight[0])
+        return _awrapper
+    @wraps(func) # Mimic wrapped function signature
+    def _wrapper(*args: P.args, **kwargs: P.kwargs) -> O:
+        # Unhashable call, cannot be coalesced
+        if (k := _key(*args, **kwargs)) is None:
+            return func(*args, **kwargs)
+        with lock:
+            flight = flights.get(k)
+            # First caller, or a recursive call of the computing thread which would wait for itself
+            if leader := (flight is None):
+                flight = flights[k] = (Future(), get_ident())
+            elif (flight[1] == get_ident()):
+                leader, flight = None, None
+        # Wait for the call in flight
+        if (leader is False):
+            return flight[0].result()
+        if (leader is None):
+            return func(*args, **kwargs)
+        # Compute and share result, or exception
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            flight[0].set_exception(e)
+            raise
+        else:
+            flight[0].set_result(result)
+            return result
+        finally:
+            # Later calls compute again
+            with lock:
+                del flights[k]
     return _wrapper
 # <=====================================================================================>
 @dec_wparams # Decorating a decorator...
@@ -70,6 +189,7 @@ def readonly[C](cls: C, attrs: set[str, ...]) -> C:
 
     Works as a decorator and returns the passed class
     with a modified __setattr__ magic function.
+    Classes may keep their attributes in a __dict__ or in __slots__.
 
     :param cls: (C) Class to manage readonly attributes for
     :param attrs: (tuple[str, ...]) Tuple of attributes to make readonly
@@ -89,10 +209,10 @@ def readonly[C](cls: C, attrs: set[str, ...]) -> C:
         :raises ValueError: When trying to change readonly attributes
         """
         # If readonly attribute and already set
-        if (name in attrs) and (name in self.__dict__) and (self.__dict__[name] != None):
+        if (name in attrs) and (getattr(self, name, None) != None):
             raise ValueError(f'Cannot change readonly attribute {type(self).__name__}.{name}!')
-        # Else work properly
-        self.__dict__[name] = value
+        # Else work properly, trough the instance dict or slot descriptors
+        object.__setattr__(self, name, value)
     # Assing function to magic method
     cls.__setattr__ = _readonly
     # Return class
@@ -104,28 +224,70 @@ class memoize[O, **P]:
     Memoization decorator class
 
     Transforms the functions it decorates into memoized functions.
+    Results are indexed by a tuple of the arguments, so arguments must be hashable or
+    made of dicts, lists, tuples and sets of hashables. Calls with other arguments are not cached.
+    Equal arguments of different types, such as 1, 1.0 and True, are cached apart unless typed is off.
+    Methods, those whose first parameter is self, keep a separate cache in each instance.
+    Caches are thread-safe and a result being computed is never computed again by other threads.
     """
-    def __init__(self, func: Callable[P, O], xparams: tuple[str, ...]=(), size: int=8) -> None:
+    # Marker for mapped parameters not passed
+    __missing: object = object()
+
+    def __init__(self, func: Callable[P, O], xparams: tuple[str, ...]=(), size: int | None=8, ttl: float | None=None, weight: int | None=None, sizer: Callable[[O], int]=getsizeof, stripes: int=4, typed: bool=True) -> None:
         """
         Memoize object constructor
 
+        Results are kept in a :py:class:`utils.cache.ConcurrentCache` whose stripes are LRU caches,
+        or TTL caches when results should expire or be bounded by weight.
+
         :param func: (Callable[P, O]) Function to memoize
         :param xparams: (tuple[str, ...]) Tuple containing function's parameter names of arguments to use for result indexing, default is () which uses all params
-        :param size: (int) Size of the memoization cache, must be greater than one, default is 8
-        :raises ValueError: When the value of size is invalid
+        :param size: (int | None) Size of the memoization cache, must be greater than one, default is 8, None only when bounded by weight
+        :param ttl: (float | None) Seconds a result is kept, default is None which keeps it until discarded
+        :param weight: (int | None) Maximum total weight of the cached results (e.g. bytes), default is None which bounds only by size
+        :param sizer: (Callable[[O], int]) Function that gives the weight of a result, default is its shallow size in bytes
+        :param stripes: (int) Maximum number of independently locked stripes of each cache, default is 4, less if they would hold under two results
+        :param typed: (bool) Whether the types of the arguments are part of the key, as in functools.lru_cache, default is True
+        :raises ValueError: When the values of size, ttl, weight or stripes are invalid
         """
         # Mimic wrapped function signature
         update_wrapper(self, func)
         # Memoized function
         self.__func: Callable[P, O] = func
-        # Memoization cache
-        self.__cache: LRUCache[str, O] = LRUCache(size) # Throws error if size <= 1
+        # Memoization cache factory
+        stripes = max(1, min(stripes, size // 2)) if (size is not None) else stripes
+        self.__factory: Callable[[], ConcurrentCache[tuple, O]] = lambda: ConcurrentCache(size, stripes, ttl, weight, sizer)
+        # Memoization cache, shared by non-method calls
+        self.__cache: ConcurrentCache[tuple, O] = self.__factory() # Throws error if size <= 1
+        # Caches of the instances, as long as they live
+        self.__caches: WeakSet[ConcurrentCache[tuple, O]] = WeakSet()
+        MEMOIZED.add(self)
+        # Get name of func's parameters
+        params = func.__code__.co_varnames[:func.__code__.co_argcount]
+        # Methods keep a cache per instance, under this instance attribute
+        self.__method: bool = bool(params) and (params[0] == 'self')
+        self.__attr: str = f'__memoize_{func.__name__}__'
         # Dict with indexing parameter names as keys and parameter positions as values
         self.__map: dict[str, int] = {
             v:i
-            for i,v in enumerate(func.__code__.co_varnames[:func.__code__.co_argcount]) # Get name of func's parameters
-            if (v in xparams) or (len(xparams) == 0) # If in indexing param list
+            for i,v in enumerate(params)
+            if ((v in xparams) or (len(xparams) == 0)) # If in indexing param list
+                and not (self.__method and (i == 0)) # Instance is not part of the key
         }
+        # Whether positional arguments can be used as the key as they are
+        self.__whole: bool = (len(self.__map) == len(params) - self.__method)
+        # Whether argument types are part of the key
+        self.__typed: bool = typed
+
+    def __get__(self, instance: Any, owner: type | None=None) -> Callable[P, O]:
+        """
+        Bind the memoized function to an instance when accessed as a method
+
+        :param instance: (Any) Instance the function is accessed trough, None when accessed trough the class
+        :param owner: (type | None) Class the function is accessed trough
+        :returns: (Callable[P, O]) Bound method, or the memoized function itself when accessed trough the class
+        """
+        return self if (instance is None) else MethodType(self, instance)
 
     def __call__(self, *args: P.args, **kwargs: P.kwargs) -> O:
         """
@@ -139,34 +301,106 @@ class memoize[O, **P]:
         """
         # Compute function call key
         key = self.__get_indexkey(*args, **kwargs)
-        # If not in cache
-        if not (key in self.__cache):
-            # Save it to cache and return it
-            self.__cache[key] = self.__func(*args, **kwargs)
-        # Else return it from cache
-        return self.__cache[key]
+        # Unhashable arguments, cannot be cached
+        if key is None:
+            return self.__func(*args, **kwargs)
+        # Cache of the instance or shared cache
+        cache = self.__get_cache(args[0]) if (self.__method and args) else self.__cache
+        # Instances without a dict share the cache, distinguished by the instance
+        if self.__method and args and (cache is self.__cache):
+            key = (args[0], key)
+        # Return it from cache, or compute and save it to cache once
+        return cache.get_or_compute(key, lambda: self.__func(*args, **kwargs))
+
+    def cache_info(self, instance: Any=None) -> dict[str, int]:
+        """
+        Get the statistics of the memoization cache
 
-    def __get_indexkey(self, *args: P.args, **kwargs: P.kwargs) -> str:
+        :param instance: (Any) Instance whose cache to get the statistics for, defaults to the shared cache
+        :returns: (dict[str, int]) The cache statistics
+        """
+        return (self.__get_cache(instance) if (instance is not None) else self.__cache).stats
+
+    def cache_clear(self, instance: Any=None) -> None:
+        """
+        Clear the memoization cache
+
+        :param instance: (Any) Instance whose cache to clear, defaults to the shared cache
+        """
+        (self.__get_cache(instance) if (instance is not None) else self.__cache).clear()
+
+    def caches(self) -> tuple[ConcurrentCache[tuple, O], ...]:
+        """
+        Get every memoization cache
+
+        :returns: (tuple[ConcurrentCache[tuple, O], ...]) The shared cache followed by the caches of living instances
+        """
+        return (self.__cache, *self.__caches)
+
+    def __get_cache(self, instance: Any) -> ConcurrentCache[tuple, O]:
+        """
+        Get the memoization cache of an instance
+
+        The cache is created on first use. Instances without a dict use the shared cache.
+
+        :param instance: (Any) Instance to get the cache for
+        :returns: (ConcurrentCache[tuple, O]) The instance cache
+        """
+        try:
+            return instance.__dict__[self.__attr]
+        except KeyError:
+            # Bypass __setattr__, which may be readonly or storing, first thread wins
+            cache = instance.__dict__.setdefault(self.__attr, self.__factory())
+            self.__caches.add(cache)
+            return cache
+        except AttributeError:
+            return self.__cache
+
+    def __get_indexkey(self, *args: P.args, **kwargs: P.kwargs) -> tuple | None:
         """
         Get the indexing key for a set of arguments
 
         :param args: (P.args) Variadic positional arguments
         :param kwargs: (P.kwargs) Variadic keyword arguments
-        :returns: (str) The indexing key for the set of arguments
-        """
-        skey = ['/']
-        # Loop trough mapped args
-        for i in self.__map.values(): # Loop trough this as it has static order
-            # If mapped parameter is an argument
-            if (i < len(args)):
-                skey.append(f'{args[i]}/')
-        # Loop trough mapped kwargs
-        for k in self.__map.keys(): # Loop trough this as it has static order
-            # If mapped parameter is an argument
-            if (k in kwargs):
-                skey.append(f'{kwargs[k]}/')
-        # Join and return
-        return ''.join(skey)
+        :returns: (tuple | None) The indexing key for the set of arguments or None if they are not hashable
+        """
+        if self.__whole and not kwargs:
+            # Positional arguments as they are, fast path
+            key = args[1:] if self.__method else args
+        else:
+            # Mapped arguments by position or name, in static order
+            n = len(args)
+            key = tuple([args[i] if (i < n) else kwargs.get(k, type(self).__missing) for k,i in self.__map.items()])
+        # Equal values of different types hash the same, tell them apart
+        if self.__typed:
+            key = (*key, *[type(v) for v in key])
+        try:
+            hash(key)
+            return key
+        except TypeError:
+            # Hashable equivalent of containers
+            try:
+                key = type(self).__freeze(key)
+                hash(key)
+                return key
+            except TypeError:
+                return None
+
+    @classmethod
+    def __freeze(cls, value: Any) -> Any:
+        """
+        Get a hashable equivalent of a value
+
+        :param value: (Any) Value to freeze
+        :returns: (Any) Tuples and frozensets tagged with the original container type, or the value itself
+        """
+        if isinstance(value, dict):
+            return (dict, tuple([(k, cls.__freeze(v)) for k,v in value.items()]))
+        if isinstance(value, (list, tuple)):
+            return (type(value), tuple([cls.__freeze(v) for v in value]))
+        if isinstance(value, (set, frozenset)):
+            return (frozenset, frozenset([cls.__freeze(v) for v in value]))
+        return value
 # <=====================================================================================>
 #  SCRIPT EXECUTION
 # <=====================================================================================>
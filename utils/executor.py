@@ -0,0 +1,257 @@
+# <========================================================================================>
+
+#   ███████╗██╗  ██╗███████╗ ██████╗██╗   ██╗████████╗ ██████╗ ██████╗    ██████╗ ██╗   ██╗
+#   ██╔════╝╚██╗██╔╝██╔════╝██╔════╝██║   ██║╚══██╔══╝██╔═══██╗██╔══██╗   ██╔══██╗╚██╗ ██╔╝
+#   █████╗   ╚███╔╝ █████╗  ██║     ██║   ██║   ██║   ██║   ██║██████╔╝   ██████╔╝ ╚████╔╝
+#   ██╔══╝   ██╔██╗ ██╔══╝  ██║     ██║   ██║   ██║   ██║   ██║██╔══██╗   ██╔═══╝   ╚██╔╝
+#   ███████╗██╔╝ ██╗███████╗╚██████╗╚██████╔╝   ██║   ╚██████╔╝██║  ██║██╗██║        ██║
+#   ╚══════╝╚═╝  ╚═╝╚══════╝ ╚═════╝ ╚═════╝    ╚═╝    ╚═════╝ ╚═╝  ╚═╝╚═╝╚═╝        ╚═╝
+
+# <========================================================================================>
+#                    Module implementing a bounded process pool executor
+# <========================================================================================>
+#                               @Author: Stefano Bia Carrasco
+# <========================================================================================>
+#  IMPORTS
+# <========================================================================================>
+from typing import Any, Callable
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from multiprocessing import get_context, get_all_start_methods
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+from os import cpu_count, getpid
+from .metrics import REGISTRY, Registry
+# <========================================================================================>
+#  GLOBALS
+# <========================================================================================>
+#  Start method of the worker processes, forking is unsafe once threads are running
+# <========================================================================================>
+METHOD: str = 'forkserver' if ('forkserver' in get_all_start_methods()) else 'spawn'
+# <========================================================================================>
+#  CLASSES
+# <========================================================================================>
+class Overloaded(Exception):
+    """
+    Exception raised when an executor has no room for a task in time
+    """
+    def __init__(self, name: str, timeout: float) -> None:
+        """
+        Overloaded exception constructor
+
+        :param name: (str) Name of the executor
+        :param timeout: (float) Seconds waited for room
+        """
+        super().__init__(name, timeout)
+        self.name = name
+        self.timeout = timeout
+
+    def __str__(self) -> str:
+        """
+        Gives the string representation of the exception
+
+        :returns: (str) String representation of the exception
+        """
+        return f'Executor {self.name} overloaded, no room after {self.timeout}s'
+# <========================================================================================>
+class TimedOut(Overloaded):
+    """
+    Exception raised when an executor gives no result for a task in time
+    """
+    def __str__(self) -> str:
+        """
+        Gives the string representation of the exception
+
+        :returns: (str) String representation of the exception
+        """
+        return f'Executor {self.name} overloaded, no result after {self.timeout}s'
+# <========================================================================================>
+class BoundedExecutor:
+    """
+    Process pool executor class with a bounded queue
+
+    At most one task per worker runs and a fixed number more wait queued. Submitting past that
+    blocks the caller until a task finishes, up to a timeout, so callers get backpressure instead
+    of an ever growing queue. Tasks run in processes, so CPU-bound work never holds the GIL
+    of the submitting process and its other threads keep serving.
+    Workers get started from a fork server, or spawned where there is none, never forked from
+    the submitting process, as forking a process with running threads may copy their locks held.
+    """
+    def __init__(self, name: str='executor', workers: int | None=None, queue: int=64, timeout: float | None=5.0, wait: float | None=30.0, registry: Registry | None=REGISTRY) -> None:
+        """
+        BoundedExecutor object constructor
+
+        The worker processes are started on first use.
+
+        :param name: (str) Name of the executor, used in metrics, defaults to 'executor'
+        :param workers: (int | None) Number of worker processes, defaults to one per CPU
+        :param queue: (int) Number of tasks allowed to wait for a worker, defaults to 64
+        :param timeout: (float | None) Maximum seconds to wait for room when full, defaults to 5.0, None to wait indefinitely
+        :param wait: (float | None) Maximum seconds run waits for a result, defaults to 30.0, None to wait indefinitely
+        :param registry: (Registry | None) Registry to record to as 'executor_queue_depth', 'executor_task_seconds', 'executor_rejected_total' and 'executor_timeouts_total', defaults to the application registry, None to not record
+        :raises ValueError: When the values of workers, queue, timeout or wait are invalid
+        """
+        # Check workers, queue, timeout and wait
+        if (workers is not None) and (workers <= 0):
+            raise ValueError('Invalid \'workers\' for executor!')
+        if (queue < 0):
+            raise ValueError('Invalid \'queue\' for executor!')
+        if (timeout is not None) and (timeout < 0):
+            raise ValueError('Invalid \'timeout\' for executor!')
+        if (wait is not None) and (wait <= 0):
+            raise ValueError('Invalid \'wait\' for executor!')
+        # Set attributes
+        self.__name: str = name
+        self.__workers: int = workers or cpu_count() or 1
+        self.__queue: int = queue
+        self.__timeout: float | None = timeout
+        self.__wait: float | None = wait
+        self.__registry: Registry | None = registry
+        self.__slots: BoundedSemaphore = BoundedSemaphore(self.__workers + queue)
+        self.__pending: int = 0
+        self.__executor: ProcessPoolExecutor | None = None
+        self.__lock: Lock = Lock()
+        # Process the pool belongs to
+        self.__pid: int = getpid()
+        if registry:
+            registry.gauge('executor_queue_depth', 'Number of tasks waiting for a worker', {'executor': name}, lambda: self.queue_depth)
+
+    @property
+    def workers(self) -> int:
+        """
+        Get the number of worker processes
+
+        :returns: (int) The number of workers
+        """
+        return self.__workers
+
+    @property
+    def pending(self) -> int:
+        """
+        Get the number of tasks submitted and not finished
+
+        :returns: (int) Tasks running or waiting for a worker
+        """
+        return self.__pending
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Get the number of tasks waiting for a worker
+
+        :returns: (int) Tasks submitted beyond the ones running
+        """
+        return max(0, self.__pending - self.__workers)
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        """
+        Submit a task to the executor
+
+        The function and its arguments get sent to a worker process, so they must be picklable.
+        Workers import the main module afresh, so it must not start anything on import but under a main guard.
+
+        :param func: (Callable[..., Any]) Function to run, defined at module level
+        :param args: (*Any) Arguments to call the function with
+        :returns: (Future) Future holding the result of the call
+        :raises Overloaded: When there is no room for the task before the timeout
+        """
+        # Pool of the parent process, unusable in a forked child
+        if (self.__pid != getpid()):
+            self.after_fork()
+        # Backpressure, wait for room
+        if not self.__slots.acquire(timeout=self.__timeout):
+            if self.__registry:
+                self.__registry.counter('executor_rejected_total', 'Number of tasks rejected for lack of room', {'executor': self.__name}).inc()
+            raise Overloaded(self.__name, self.__timeout)
+        st = monotonic()
+        try:
+            with self.__lock:
+                self.__pending += 1
+                # Create pool lazily
+                if not self.__executor:
+                    self.__executor = ProcessPoolExecutor(self.__workers, mp_context=get_context(METHOD))
+                future = self.__executor.submit(func, *args)
+        except BaseException:
+            self.__release()
+            raise
+        future.add_done_callback(lambda _: self.__release(st))
+        return future
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a task in the executor and wait for its result
+
+        A task still waiting for a worker when the wait runs out gets cancelled, a running one
+        is left to finish but its result is dropped.
+
+        :param func: (Callable[..., Any]) Function to run, defined at module level
+        :param args: (*Any) Arguments to call the function with
+        :returns: (Any) The result of the call
+        :raises Overloaded: When there is no room for the task before the timeout
+        :raises TimedOut: When there is no result for the task before the wait
+        """
+        future = self.submit(func, *args)
+        try:
+            return future.result(timeout=self.__wait)
+        except FutureTimeout:
+            # Only the result wait timed out, not the task itself
+            if not future.done():
+                future.cancel()
+                if self.__registry:
+                    self.__registry.counter('executor_timeouts_total', 'Number of tasks given up waiting for their result', {'executor': self.__name}).inc()
+                raise TimedOut(self.__name, self.__wait) from None
+            raise
+
+    def shutdown(self, wait: bool=True) -> None:
+        """
+        Stop the worker processes
+
+        They get started again on next use. If there are no workers the operation fails silently.
+
+        :param wait: (bool) Whether to wait for submitted tasks to finish, defaults to True
+        """
+        with self.__lock:
+            executor, self.__executor = self.__executor, None
+        # Outside the lock, finishing tasks take it to free their room
+        if executor and (self.__pid == getpid()):
+            executor.shutdown(wait=wait)
+
+    def after_fork(self) -> None:
+        """
+        Forget the worker processes and locks inherited from the parent process
+
+        The inherited pool belongs to the parent, so it is left untouched and a new one
+        gets created lazily in the child. If not in a forked child the operation fails silently.
+        """
+        if (self.__pid == getpid()):
+            return
+        self.__executor = None
+        self.__pending = 0
+        self.__slots = BoundedSemaphore(self.__workers + self.__queue)
+        self.__lock = Lock()
+        self.__pid = getpid()
+
+    def __release(self, st: float | None=None) -> None:
+        """
+        Free the room of a finished task
+
+        :param st: (float | None) Monotonic time the task was submitted at, records its latency when given
+        """
+        with self.__lock:
+            self.__pending -= 1
+        self.__slots.release()
+        if self.__registry and (st is not None):
+            self.__registry.histogram('executor_task_seconds', 'Time from submission to result of executor tasks', {'executor': self.__name}).observe(monotonic() - st)
+# <========================================================================================>
+#  GLOBALS
+# <========================================================================================>
+#  Executor for password hashing, so logins never stall the request threads
+# <========================================================================================>
+AUTH_EXECUTOR: BoundedExecutor = BoundedExecutor('auth', queue=64, timeout=2.0, wait=10.0)
+# <========================================================================================>
+#  SCRIPT EXECUTION
+# <========================================================================================>
+# If executing as a script
+# <========================================================================================>
+if (__name__ == '__main__'):
+    ...
+# <========================================================================================>
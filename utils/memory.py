@@ -0,0 +1,211 @@
+# <=============================================================================>
+
+#   ███╗   ███╗███████╗███╗   ███╗ ██████╗ ██████╗ ██╗   ██╗   ██████╗ ██╗   ██╗
+#   ████╗ ████║██╔════╝████╗ ████║██╔═══██╗██╔══██╗╚██╗ ██╔╝   ██╔══██╗╚██╗ ██╔╝
+#   ██╔████╔██║█████╗  ██╔████╔██║██║   ██║██████╔╝ ╚████╔╝    ██████╔╝ ╚████╔╝
+#   ██║╚██╔╝██║██╔══╝  ██║╚██╔╝██║██║   ██║██╔══██╗  ╚██╔╝     ██╔═══╝   ╚██╔╝
+#   ██║ ╚═╝ ██║███████╗██║ ╚═╝ ██║╚██████╔╝██║  ██║   ██║   ██╗██║        ██║
+#   ╚═╝     ╚═╝╚══════╝╚═╝     ╚═╝ ╚═════╝ ╚═╝  ╚═╝   ╚═╝   ╚═╝╚═╝        ╚═╝
+
+# <=============================================================================>
+#                     Module implementing memory accounting
+# <=============================================================================>
+#                         @Author: Stefano Bia Carrasco
+# <=============================================================================>
+#  IMPORTS
+# <=============================================================================>
+from typing import Any
+from types import ModuleType, FunctionType, BuiltinFunctionType, MethodType
+from sys import getsizeof
+from random import sample as rsample
+from threading import Lock
+from gc import get_referents
+import tracemalloc
+from .decorators import MEMOIZED
+# <=============================================================================>
+#  CONSTANTS
+# <=============================================================================>
+#  Objects shared by the whole process, never accounted to a container
+# <=============================================================================>
+SHARED: tuple[type, ...] = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+# <=============================================================================>
+#  FUNCTIONS
+# <=============================================================================>
+def deep_size(obj: Any, seen: set[int] | None=None) -> int:
+    """
+    Get the size of an object and everything it references
+
+    Classes, modules and functions are shared by the whole process, so they are not followed.
+    Objects already in seen are not counted again, so passing the same set to several
+    calls counts objects they share only once.
+
+    :param obj: (Any) Object to size
+    :param seen: (set[int] | None) Ids of the objects already counted, updated in place, defaults to a new set
+    :returns: (int) Size in bytes
+    """
+    seen = set() if (seen is None) else seen
+    size = 0
+    stack = [obj]
+    # Depth first, without recursion
+    while stack:
+        o = stack.pop()
+        if (id(o) in seen) or isinstance(o, SHARED):
+            continue
+        seen.add(id(o))
+        size += getsizeof(o)
+        stack += get_referents(o)
+    return size
+# <=============================================================================>
+def container_size(container: Any, sample: int | None=256) -> dict[str, int]:
+    """
+    Get the size of a container of objects
+
+    Containers with more entries than the sample get a random sample of them sized,
+    and the total is extrapolated from the sample mean. Each entry of a dict is its key and value.
+
+    :param container: (Any) Dict, set, list or any other sized iterable to size
+    :param sample: (int | None) Maximum number of entries to size, defaults to 256, None to size every entry
+    :returns: (dict[str, int]) Number of entries, entries sized and estimated bytes
+    """
+    # Copy entries, others may be modifying the container
+    entries = list(container.items() if isinstance(container, dict) else container)
+    sized = entries if (sample is None) or (len(entries) <= sample) else rsample(entries, sample)
+    # The container itself, not its entries
+    seen = {id(container)}
+    if isinstance(container, dict):
+        # Key and value, the pair tuple is not part of the container
+        size = sum(deep_size(k, seen) + deep_size(v, seen) for k, v in sized)
+    else:
+        size = sum(deep_size(entry, seen) for entry in sized)
+    return {
+        'entries': len(entries),
+        'sampled': len(sized),
+        'bytes': getsizeof(container) + (round(size * len(entries) / len(sized)) if sized else 0)
+    }
+# <=============================================================================>
+def memoized_size() -> dict[str, dict[str, int]]:
+    """
+    Get the size of every memoization cache
+
+    Caches are bounded, so they are sized whole.
+
+    :returns: (dict[str, dict[str, int]]) Number of caches, entries and estimated bytes by memoized function name
+    """
+    sizes = {}
+    for memo in list(MEMOIZED):
+        name = f'{memo.__module__}.{memo.__qualname__}'
+        total = sizes.setdefault(name, {'caches': 0, 'entries': 0, 'bytes': 0})
+        for cache in memo.caches():
+            total['caches'] += 1
+            total['entries'] += len(cache)
+            total['bytes'] += deep_size(cache)
+    return sizes
+# <=============================================================================>
+#  CLASSES
+# <=============================================================================>
+class MemoryTracker:
+    """
+    Allocation tracking class
+
+    Wraps tracemalloc to compare snapshots, so the code lines whose allocations
+    grew the most between two looks can be found. Tracing slows every allocation down,
+    so it is only on between start and stop.
+    """
+    def __init__(self, frames: int=1) -> None:
+        """
+        MemoryTracker object constructor
+
+        :param frames: (int) Number of frames stored per allocation traceback, defaults to 1
+        """
+        self.__frames: int = frames
+        self.__snapshot: tracemalloc.Snapshot | None = None
+        self.__lock: Lock = Lock()
+
+    @property
+    def tracing(self) -> bool:
+        """
+        Check if allocations are being traced
+
+        :returns: (bool) Whether tracemalloc is tracing
+        """
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        """
+        Start tracing allocations and take the first snapshot
+
+        If already tracing it fails silently.
+        """
+        with self.__lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.__frames)
+                self.__snapshot = self.__take()
+
+    def stop(self) -> None:
+        """
+        Stop tracing allocations and forget the last snapshot
+
+        If not tracing it fails silently.
+        """
+        with self.__lock:
+            tracemalloc.stop()
+            self.__snapshot = None
+
+    def diff(self, limit: int=10) -> dict[str, Any]:
+        """
+        Compare a new snapshot with the last one taken
+
+        The new snapshot becomes the last one, so each call reports the growth since the previous call.
+
+        :param limit: (int) Maximum number of code lines reported, defaults to 10
+        :returns: (dict[str, Any]) Current and peak traced bytes, and the lines with the largest allocation changes
+        :raises RuntimeError: When not tracing
+        """
+        with self.__lock:
+            if not (tracemalloc.is_tracing() and self.__snapshot):
+                raise RuntimeError('Memory tracker is not tracing!')
+            snapshot = self.__take()
+            stats = snapshot.compare_to(self.__snapshot, 'lineno')[:limit]
+            self.__snapshot = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'current': current,
+            'peak': peak,
+            'top': [
+                {
+                    'where': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                    'bytes': stat.size,
+                    'bytes_diff': stat.size_diff,
+                    'count': stat.count,
+                    'count_diff': stat.count_diff
+                }
+                for stat in stats
+            ]
+        }
+
+    @staticmethod
+    def __take() -> tracemalloc.Snapshot:
+        """
+        Take a snapshot without the allocations of the import machinery and tracemalloc itself
+
+        :returns: (tracemalloc.Snapshot) The filtered snapshot
+        """
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, tracemalloc.__file__)
+        ))
+# <=============================================================================>
+#  GLOBALS
+# <=============================================================================>
+#  Default tracker, the one exposed by the application
+# <=============================================================================>
+TRACKER: MemoryTracker = MemoryTracker()
+# <=============================================================================>
+#  SCRIPT EXECUTION
+# <=============================================================================>
+# If executing as a script
+# <=============================================================================>
+if (__name__ == '__main__'):
+    ...
+# <=============================================================================>
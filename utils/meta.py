@@ -1,12 +1,16 @@
 from typing import Self
+from os import getpid
 
 class Singleton[C: object](type):
     """
     Singleton metaclass
 
     Enforces the singleton pattern on a class.
+    The instance is shared with forked child processes, instances defining an after_fork
+    method get it called the first time they are requested from a new process.
     """
     __instances: dict[Self, C] = {}
+    __pids: dict[Self, int] = {}
 
     def __call__[**P](cls, *args: P.args, **kwargs: P.kwargs) -> C:
         """
@@ -16,4 +20,10 @@ class Singleton[C: object](type):
         """
         if not (cls in cls.__instances):
             cls.__instances[cls] = super().__call__(*args, **kwargs)
+            cls.__pids[cls] = getpid()
+        # Requested from a forked child for the first time
+        elif (cls.__pids[cls] != (pid := getpid())):
+            cls.__pids[cls] = pid
+            if callable(after_fork := getattr(cls.__instances[cls], 'after_fork', None)):
+                after_fork()
         return cls.__instances[cls]
\ No newline at end of file
@@ -0,0 +1,351 @@
+# <======================================================================>
+
+#   ███╗   ███╗███████╗████████╗██████╗ ██╗ ██████╗███████╗   ██████╗ ██╗   ██╗
+#   ████╗ ████║██╔════╝╚══██╔══╝██╔══██╗██║██╔════╝██╔════╝   ██╔══██╗╚██╗ ██╔╝
+#   ██╔████╔██║█████╗     ██║   ██████╔╝██║██║     ███████╗   ██████╔╝ ╚████╔╝
+#   ██║╚██╔╝██║██╔══╝     ██║   ██╔══██╗██║██║     ╚════██║   ██╔═══╝   ╚██╔╝
+#   ██║ ╚═╝ ██║███████╗   ██║   ██║  ██║██║╚██████╗███████║██╗██║        ██║
+#   ╚═╝     ╚═╝╚══════╝   ╚═╝   ╚═╝  ╚═╝╚═╝ ╚═════╝╚══════╝╚═╝╚═╝        ╚═╝
+
+# <======================================================================>
+#           Module implementing counters, gauges and histograms
+# <======================================================================>
+#                    @Author: Stefano Bia Carrasco
+# <======================================================================>
+#  IMPORTS
+# <======================================================================>
+from typing import Callable
+from threading import Lock
+from math import ceil
+import re
+# <======================================================================>
+#  CONSTANTS
+# <======================================================================>
+#  Quantiles reported for every histogram
+# <======================================================================>
+QUANTILES: tuple[float, ...] = (0.5, 0.95, 0.99)
+# <======================================================================>
+#  TYPES
+# <======================================================================>
+type Labels = dict[str, str]
+# <======================================================================>
+#  CLASSES
+# <======================================================================>
+class Counter:
+    """
+    Monotonically increasing metric class
+    """
+    def __init__(self) -> None:
+        """
+        Counter object constructor
+        """
+        self.__value: float = 0
+        self.__lock: Lock = Lock()
+
+    @property
+    def value(self) -> float:
+        """
+        Get the value of the counter
+
+        :returns: (float) The counter value
+        """
+        return self.__value
+
+    def inc(self, n: float=1) -> None:
+        """
+        Increase the counter
+
+        :param n: (float) Amount to increase by, must not be negative, defaults to 1
+        :raises ValueError: When the amount is negative
+        """
+        if (n < 0):
+            raise ValueError('Counters can only increase!')
+        with self.__lock:
+            self.__value += n
+# <======================================================================>
+class Gauge:
+    """
+    Metric class for values that go up and down
+    """
+    def __init__(self, func: Callable[[], float] | None=None) -> None:
+        """
+        Gauge object constructor
+
+        :param func: (Callable[[], float] | None) Function that gives the value when read, defaults to a value set by hand
+        """
+        self.__value: float = 0
+        self.__func: Callable[[], float] | None = func
+        self.__lock: Lock = Lock()
+
+    @property
+    def value(self) -> float:
+        """
+        Get the value of the gauge
+
+        :returns: (float) The gauge value
+        """
+        return self.__func() if self.__func else self.__value
+
+    def set(self, value: float) -> None:
+        """
+        Set the gauge to a value
+
+        :param value: (float) The new value
+        """
+        self.__value = value
+
+    def inc(self, n: float=1) -> None:
+        """
+        Increase the gauge
+
+        :param n: (float) Amount to increase by, defaults to 1
+        """
+        with self.__lock:
+            self.__value += n
+
+    def dec(self, n: float=1) -> None:
+        """
+        Decrease the gauge
+
+        :param n: (float) Amount to decrease by, defaults to 1
+        """
+        with self.__lock:
+            self.__value -= n
+# <======================================================================>
+class Histogram:
+    """
+    Metric class for distributions of observed values, like latencies
+
+    Count and sum cover every observation. Quantiles are computed on demand
+    over a window with the most recent observations, so they follow current behaviour.
+    """
+    def __init__(self, window: int=1024) -> None:
+        """
+        Histogram object constructor
+
+        :param window: (int) Number of recent observations quantiles are computed over, defaults to 1024
+        :raises ValueError: When the value of window is invalid
+        """
+        # Check window
+        if (window <= 0):
+            raise ValueError('Invalid \'window\' for histogram!')
+        # Ring buffer of recent observations
+        self.__window: list[float] = []
+        self.__size: int = window
+        self.__next: int = 0
+        self.__count: int = 0
+        self.__sum: float = 0.0
+        self.__lock: Lock = Lock()
+
+    @property
+    def count(self) -> int:
+        """
+        Get the number of observations
+
+        :returns: (int) The observation count
+        """
+        return self.__count
+
+    @property
+    def sum(self) -> float:
+        """
+        Get the sum of observations
+
+        :returns: (float) The observation sum
+        """
+        return self.__sum
+
+    def observe(self, value: float) -> None:
+        """
+        Record an observation
+
+        :param value: (float) The observed value
+        """
+        with self.__lock:
+            self.__count += 1
+            self.__sum += value
+            # Fill window, then overwrite oldest
+            if (len(self.__window) < self.__size):
+                self.__window.append(value)
+            else:
+                self.__window[self.__next] = value
+                self.__next = (self.__next + 1) % self.__size
+
+    def quantiles(self, qs: tuple[float, ...]=QUANTILES) -> dict[float, float]:
+        """
+        Get quantiles of the recent observations
+
+        :param qs: (tuple[float, ...]) Quantiles to compute, between 0 and 1, defaults to p50, p95 and p99
+        :returns: (dict[float, float]) Value of each quantile, NaN without observations
+        """
+        with self.__lock:
+            window = sorted(self.__window)
+        if not window:
+            return {q: float('nan') for q in qs}
+        # Nearest rank
+        return {q: window[min(len(window) - 1, max(0, ceil(q * len(window)) - 1))] for q in qs}
+# <======================================================================>
+class Registry:
+    """
+    Named metrics container class
+
+    Metrics are grouped in families by name, each family member being identified by its labels.
+    Asking for an existing family member returns it, so instrumentation can ask on every use.
+    """
+    # Exposition type of each metric class
+    TYPES: dict[type, str] = {Counter: 'counter', Gauge: 'gauge', Histogram: 'summary'}
+
+    def __init__(self) -> None:
+        """
+        Registry object constructor
+        """
+        # Families as {name: (class, help, {labels: metric})}
+        self.__families: dict[str, tuple[type, str, dict[tuple[tuple[str, str], ...], Counter | Gauge | Histogram]]] = {}
+        self.__lock: Lock = Lock()
+
+    def counter(self, name: str, help: str='', labels: Labels={}) -> Counter:
+        """
+        Get a counter, creating it if needed
+
+        :param name: (str) Name of the counter family, by convention ending in '_total'
+        :param help: (str) Description of the family, used when it is created
+        :param labels: (Labels) Labels identifying the counter inside its family
+        :returns: (Counter) The counter
+        :raises ValueError: When the name is invalid or already used by another metric type
+        """
+        return self.__get(Counter, name, help, labels, Counter)
+
+    def gauge(self, name: str, help: str='', labels: Labels={}, func: Callable[[], float] | None=None) -> Gauge:
+        """
+        Get a gauge, creating it if needed
+
+        :param name: (str) Name of the gauge family
+        :param help: (str) Description of the family, used when it is created
+        :param labels: (Labels) Labels identifying the gauge inside its family
+        :param func: (Callable[[], float] | None) Function that gives the value when read, used when the gauge is created
+        :returns: (Gauge) The gauge
+        :raises ValueError: When the name is invalid or already used by another metric type
+        """
+        return self.__get(Gauge, name, help, labels, lambda: Gauge(func))
+
+    def histogram(self, name: str, help: str='', labels: Labels={}, window: int=1024) -> Histogram:
+        """
+        Get a histogram, creating it if needed
+
+        :param name: (str) Name of the histogram family, by convention ending in the unit (e.g. '_seconds')
+        :param help: (str) Description of the family, used when it is created
+        :param labels: (Labels) Labels identifying the histogram inside its family
+        :param window: (int) Number of recent observations quantiles are computed over, used when the histogram is created
+        :returns: (Histogram) The histogram
+        :raises ValueError: When the name is invalid or already used by another metric type
+        """
+        return self.__get(Histogram, name, help, labels, lambda: Histogram(window))
+
+    def snapshot(self) -> dict[str, list[tuple[Labels, dict[str, float]]]]:
+        """
+        Get the current values of every metric
+
+        :returns: (dict[str, list[tuple[Labels, dict[str, float]]]]) Labels and values of each family member by family name
+        """
+        snapshot = {}
+        for name, (cls, _, members) in self.__items():
+            snapshot[name] = [(dict(labels), type(self).__values(metric)) for labels, metric in members]
+        return snapshot
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format
+
+        Histograms are exposed as summaries with p50, p95 and p99 quantiles.
+
+        :returns: (str) The exposition text
+        """
+        lines = []
+        for name, (cls, help, members) in self.__items():
+            lines.append(f'# HELP {name} {help.replace('\\', '\\\\').replace('\n', '\\n')}')
+            lines.append(f'# TYPE {name} {type(self).TYPES[cls]}')
+            for labels, metric in members:
+                if isinstance(metric, Histogram):
+                    for q, v in metric.quantiles().items():
+                        lines.append(f'{name}{type(self).__labels((*labels, ('quantile', str(q))))} {v}')
+                    lines.append(f'{name}_sum{type(self).__labels(labels)} {metric.sum}')
+                    lines.append(f'{name}_count{type(self).__labels(labels)} {metric.count}')
+                else:
+                    lines.append(f'{name}{type(self).__labels(labels)} {metric.value}')
+        return '\n'.join(lines) + '\n'
+
+    def __get[M](self, cls: type[M], name: str, help: str, labels: Labels, factory: Callable[[], M]) -> M:
+        """
+        Get a family member, creating it and its family if needed
+
+        :param cls: (type[M]) Metric class of the family
+        :param name: (str) Name of the family
+        :param help: (str) Description of the family
+        :param labels: (Labels) Labels identifying the member
+        :param factory: (Callable[[], M]) Function that creates the member
+        :returns: (M) The family member
+        :raises ValueError: When the name is invalid or already used by another metric type
+        """
+        key = tuple(sorted(labels.items()))
+        # Fast path, no lock needed to read
+        family = self.__families.get(name)
+        if family and (family[0] is cls) and (metric := family[2].get(key)):
+            return metric
+        with self.__lock:
+            if not (family := self.__families.get(name)):
+                # Check name
+                if not re.fullmatch(r'[a-zA-Z_:][a-zA-Z0-9_:]*', name):
+                    raise ValueError(f'Invalid metric name \'{name}\'!')
+                family = self.__families[name] = (cls, help, {})
+            if (family[0] is not cls):
+                raise ValueError(f'Metric \'{name}\' is already a {type(self).TYPES[family[0]]}!')
+            # Create member if missing
+            return family[2].setdefault(key, factory())
+
+    def __items(self) -> list[tuple[str, tuple[type, str, list[tuple[tuple[tuple[str, str], ...], Counter | Gauge | Histogram]]]]]:
+        """
+        Get a sorted snapshot of the families
+
+        :returns: (list[...]) Families by name, with their members as a list
+        """
+        with self.__lock:
+            return sorted((name, (cls, help, list(members.items()))) for name, (cls, help, members) in self.__families.items())
+
+    @staticmethod
+    def __values(metric: Counter | Gauge | Histogram) -> dict[str, float]:
+        """
+        Get the values of a metric
+
+        :param metric: (Counter | Gauge | Histogram) Metric to get the values of
+        :returns: (dict[str, float]) Value, or count, sum and quantiles for histograms
+        """
+        if isinstance(metric, Histogram):
+            return {'count': metric.count, 'sum': metric.sum, **{f'p{round(q * 100)}': v for q, v in metric.quantiles().items()}}
+        return {'value': metric.value}
+
+    @staticmethod
+    def __labels(labels: tuple[tuple[str, str], ...]) -> str:
+        """
+        Render a set of labels
+
+        :param labels: (tuple[tuple[str, str], ...]) Label names and values
+        :returns: (str) The labels between braces, or nothing without labels
+        """
+        if not labels:
+            return ''
+        # Escape backslashes, quotes and line breaks in values
+        return '{' + ','.join([f'{k}="{str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')}"' for k, v in labels]) + '}'
+# <======================================================================>
+#  GLOBALS
+# <======================================================================>
+#  Default registry, the one exposed by the application
+# <======================================================================>
+REGISTRY: Registry = Registry()
+# <======================================================================>
+#  SCRIPT EXECUTION
+# <======================================================================>
+# If executing as a script
+# <======================================================================>
+if (__name__ == '__main__'):
+    ...
+# <======================================================================>
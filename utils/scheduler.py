@@ -0,0 +1,350 @@
+# <==============================================================================================>
+
+#   ███████╗ ██████╗██╗  ██╗███████╗██████╗ ██╗   ██╗██╗     ███████╗██████╗    ██████╗ ██╗   ██╗
+#   ██╔════╝██╔════╝██║  ██║██╔════╝██╔══██╗██║   ██║██║     ██╔════╝██╔══██╗   ██╔══██╗╚██╗ ██╔╝
+#   ███████╗██║     ███████║█████╗  ██║  ██║██║   ██║██║     █████╗  ██████╔╝   ██████╔╝ ╚████╔╝
+#   ╚════██║██║     ██╔══██║██╔══╝  ██║  ██║██║   ██║██║     ██╔══╝  ██╔══██╗   ██╔═══╝   ╚██╔╝
+#   ███████║╚██████╗██║  ██║███████╗██████╔╝╚██████╔╝███████╗███████╗██║  ██║██╗██║        ██║
+#   ╚══════╝ ╚═════╝╚═╝  ╚═╝╚══════╝╚═════╝  ╚═════╝ ╚══════╝╚══════╝╚═╝  ╚═╝╚═╝╚═╝        ╚═╝
+
+# <==============================================================================================>
+#                          Module implementing a background job scheduler
+# <==============================================================================================>
+#                                  @Author: Stefano Bia Carrasco
+# <==============================================================================================>
+#  IMPORTS
+# <==============================================================================================>
+from typing import Any, Callable
+from threading import Condition, Thread
+from sys import is_finalizing
+from time import monotonic
+from random import uniform
+from heapq import heappush, heappop, heapify
+from itertools import count
+from .metrics import REGISTRY, Registry
+# <==============================================================================================>
+#  CLASSES
+# <==============================================================================================>
+class Job:
+    """
+    Periodic job class
+
+    Fixed-rate jobs start every interval from their first run, whatever their duration,
+    skipping the runs they fall behind on instead of bursting to catch up.
+    Fixed-delay jobs start an interval after their previous run finished.
+    """
+    def __init__(self, name: str, func: Callable[[], Any], interval: float, fixed_rate: bool=True, jitter: float=0.0) -> None:
+        """
+        Job object constructor
+
+        :param name: (str) Name of the job, used in statistics and metrics
+        :param func: (Callable[[], Any]) Function to run
+        :param interval: (float) Seconds between runs, must be greater than zero
+        :param fixed_rate: (bool) Whether the interval is counted from run start instead of run end, defaults to True
+        :param jitter: (float) Maximum seconds each run is randomly delayed by, so jobs with equal intervals spread out, defaults to 0.0
+        :raises ValueError: When the values of interval or jitter are invalid
+        """
+        # Check interval and jitter
+        if (interval <= 0):
+            raise ValueError('Invalid \'interval\' for job!')
+        if (jitter < 0):
+            raise ValueError('Invalid \'jitter\' for job!')
+        # Set attributes
+        self.__name: str = name
+        self.__func: Callable[[], Any] = func
+        self.__interval: float = interval
+        self.__fixed_rate: bool = fixed_rate
+        self.__jitter: float = jitter
+        self.__cancelled: bool = False
+        # Time the next run is due, without jitter
+        self.__due: float = 0.0
+        # Accumulated statistics
+        self.__stats: dict[str, float] = {'runs': 0, 'errors': 0, 'skipped': 0, 'total': 0.0, 'last': 0.0, 'max': 0.0, 'lag': 0.0}
+
+    @property
+    def name(self) -> str:
+        """
+        Get the name of the job
+
+        :returns: (str) The job name
+        """
+        return self.__name
+
+    @property
+    def interval(self) -> float:
+        """
+        Get the interval of the job
+
+        :returns: (float) Seconds between runs
+        """
+        return self.__interval
+
+    @property
+    def fixed_rate(self) -> bool:
+        """
+        Check if the job runs at a fixed rate
+
+        :returns: (bool) Whether the interval is counted from run start instead of run end
+        """
+        return self.__fixed_rate
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Check if the job is cancelled
+
+        :returns: (bool) Whether the job will not run again
+        """
+        return self.__cancelled
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """
+        Get the job statistics
+
+        Durations and lag (how late the last run started) are in seconds.
+
+        :returns: (dict[str, float]) Copy of the counters of runs, errors and skipped runs, and total, last, max, mean and lag timings
+        """
+        return {**self.__stats, 'mean': self.__stats['total'] / self.__stats['runs'] if self.__stats['runs'] else 0.0}
+
+    def cancel(self) -> None:
+        """
+        Cancel the job
+
+        A run in progress is finished, but the job does not run again.
+        """
+        self.__cancelled = True
+
+    def first(self, now: float, delay: float | None=None) -> float:
+        """
+        Plan the first run of the job
+
+        :param now: (float) Current monotonic time
+        :param delay: (float | None) Seconds until the first run, defaults to the interval
+        :returns: (float) Monotonic time the run should start at
+        """
+        self.__due = now + (self.__interval if (delay is None) else delay)
+        return self.__due + self.__spread()
+
+    def run(self, now: float) -> float:
+        """
+        Run the job and plan its next run
+
+        Exceptions are counted and reported, they never stop the job.
+
+        :param now: (float) Current monotonic time
+        :returns: (float) Monotonic time the next run should start at
+        """
+        self.__stats['lag'] = max(0.0, now - self.__due)
+        # Compute time before and after function call, even if it raises
+        st = monotonic()
+        try:
+            self.__func()
+        except Exception as e:
+            self.__stats['errors'] += 1
+            print(f'<Job {self.__name} failed -> {e}>')
+        et = monotonic()
+        # Record timings
+        self.__stats['runs'] += 1
+        self.__stats['last'] = et - st
+        self.__stats['total'] += et - st
+        self.__stats['max'] = max(self.__stats['max'], et - st)
+        # Plan next run
+        if self.__fixed_rate:
+            self.__due += self.__interval
+            # Fell behind, skip missed runs
+            if (self.__due <= et):
+                missed = int((et - self.__due) // self.__interval) + 1
+                self.__due += missed * self.__interval
+                self.__stats['skipped'] += missed
+        else:
+            self.__due = et + self.__interval
+        return self.__due + self.__spread()
+
+    def __spread(self) -> float:
+        """
+        Get a random delay for a run
+
+        :returns: (float) Seconds between zero and the jitter
+        """
+        return uniform(0.0, self.__jitter) if self.__jitter else 0.0
+
+    def __repr__(self) -> str:
+        """
+        Get the representation of the job
+
+        :returns: (str) The job representation
+        """
+        return f'<Job {self.__name} every {self.__interval}s ({'rate' if self.__fixed_rate else 'delay'}){' cancelled' if self.__cancelled else ''}>'
+# <==============================================================================================>
+class Scheduler:
+    """
+    Background job scheduler class
+
+    Every job runs on a single thread, in order of their next run time kept in a heap.
+    While waiting the thread sleeps on a condition until the next run is due or the jobs change,
+    so an idle scheduler uses no CPU. Jobs should be short, as a long run delays every other job.
+    """
+    def __init__(self, name: str='scheduler', registry: Registry | None=REGISTRY) -> None:
+        """
+        Scheduler object constructor
+
+        :param name: (str) Name of the scheduler thread, defaults to 'scheduler'
+        :param registry: (Registry | None) Registry to record run durations to as 'scheduler_job_seconds', defaults to the application registry, None to not record
+        """
+        self.__name: str = name
+        self.__registry: Registry | None = registry
+        # Heap of (next run time, sequence, job), the sequence breaks ties in scheduling order
+        self.__heap: list[tuple[float, int, Job]] = []
+        self.__seq = count()
+        self.__condition: Condition = Condition()
+        self.__thread: Thread | None = None
+        self.__stopping: bool = False
+
+    @property
+    def running(self) -> bool:
+        """
+        Check if the scheduler thread is running
+
+        :returns: (bool) Whether the scheduler thread is alive
+        """
+        return bool(self.__thread) and self.__thread.is_alive()
+
+    @property
+    def jobs(self) -> tuple[Job, ...]:
+        """
+        Get the scheduled jobs
+
+        :returns: (tuple[Job, ...]) Jobs not cancelled, by next run time
+        """
+        with self.__condition:
+            return tuple(job for _, _, job in sorted(self.__heap) if not job.cancelled)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """
+        Get the statistics of every scheduled job
+
+        :returns: (dict[str, dict[str, float]]) Job statistics by job name
+        """
+        return {job.name: job.stats for job in self.jobs}
+
+    def schedule(self, func: Callable[[], Any], interval: float, name: str | None=None, fixed_rate: bool=True, jitter: float=0.0, delay: float | None=None) -> Job:
+        """
+        Schedule a function to run periodically
+
+        :param func: (Callable[[], Any]) Function to run
+        :param interval: (float) Seconds between runs, must be greater than zero
+        :param name: (str | None) Name of the job, defaults to the function's qualified name
+        :param fixed_rate: (bool) Whether the interval is counted from run start instead of run end, defaults to True
+        :param jitter: (float) Maximum seconds each run is randomly delayed by, defaults to 0.0
+        :param delay: (float | None) Seconds until the first run, defaults to the interval
+        :returns: (Job) The scheduled job, which can be cancelled
+        :raises ValueError: When the values of interval or jitter are invalid
+        """
+        job = Job(name or getattr(func, '__qualname__', repr(func)), func, interval, fixed_rate, jitter)
+        with self.__condition:
+            heappush(self.__heap, (job.first(monotonic(), delay), next(self.__seq), job))
+            # Wake the thread, the new job may be due earlier
+            self.__condition.notify()
+        return job
+
+    def every(self, interval: float, name: str | None=None, fixed_rate: bool=True, jitter: float=0.0, delay: float | None=None) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+        """
+        Schedule a function to run periodically
+
+        Works as a decorator and returns the passed function, scheduled.
+
+        :param interval: (float) Seconds between runs, must be greater than zero
+        :param name: (str | None) Name of the job, defaults to the function's qualified name
+        :param fixed_rate: (bool) Whether the interval is counted from run start instead of run end, defaults to True
+        :param jitter: (float) Maximum seconds each run is randomly delayed by, defaults to 0.0
+        :param delay: (float | None) Seconds until the first run, defaults to the interval
+        :returns: (Callable[[Callable[[], Any]], Callable[[], Any]]) Decorator that schedules the function
+        """
+        def _decorator(func: Callable[[], Any]) -> Callable[[], Any]:
+            self.schedule(func, interval, name, fixed_rate, jitter, delay)
+            return func
+        return _decorator
+
+    def cancel(self, job: Job) -> None:
+        """
+        Cancel a scheduled job
+
+        A run in progress is finished, but the job does not run again.
+
+        :param job: (Job) The job to cancel
+        """
+        with self.__condition:
+            job.cancel()
+            # Drop it from the heap
+            self.__heap = [entry for entry in self.__heap if entry[2] is not job]
+            heapify(self.__heap)
+            self.__condition.notify()
+
+    def start(self) -> None:
+        """
+        Start the scheduler thread
+
+        If the thread is already running it fails silently.
+        """
+        if not self.running:
+            with self.__condition:
+                self.__stopping = False
+            self.__thread = Thread(target=self.__loop, name=self.__name, daemon=True)
+            self.__thread.start()
+
+    def stop(self, timeout: float | None=5.0) -> None:
+        """
+        Stop the scheduler thread gracefully
+
+        A run in progress is finished, no further runs are started. Jobs are kept, so the scheduler can be started again.
+        If the thread is not running it fails silently. While the interpreter is finalizing the thread is not waited for,
+        it is a daemon thread and may never get to run again.
+
+        :param timeout: (float | None) Maximum seconds to wait for the thread, defaults to 5.0, None to wait indefinitely
+        """
+        with self.__condition:
+            self.__stopping = True
+            self.__condition.notify()
+        if self.__thread:
+            if not is_finalizing():
+                self.__thread.join(timeout)
+            self.__thread = None
+
+    def __loop(self) -> None:
+        """
+        Run jobs as they become due until stopped
+        """
+        with self.__condition:
+            while not self.__stopping:
+                # Nothing scheduled, sleep until notified
+                if not self.__heap:
+                    self.__condition.wait()
+                    continue
+                at, _, job = self.__heap[0]
+                # Not yet due, sleep until due or notified
+                if (wait := at - monotonic()) > 0:
+                    self.__condition.wait(wait)
+                    continue
+                heappop(self.__heap)
+                # Run without holding the lock, so jobs can schedule and cancel
+                self.__condition.release()
+                try:
+                    st = monotonic()
+                    at = job.run(st)
+                    if self.__registry:
+                        self.__registry.histogram('scheduler_job_seconds', 'Duration of scheduled job runs', {'job': job.name}).observe(monotonic() - st)
+                finally:
+                    self.__condition.acquire()
+                # Plan next run, unless cancelled meanwhile
+                if not job.cancelled:
+                    heappush(self.__heap, (at, next(self.__seq), job))
+# <==============================================================================================>
+#  SCRIPT EXECUTION
+# <==============================================================================================>
+# If executing as a script
+# <==============================================================================================>
+if (__name__ == '__main__'):
+    ...
+# <==============================================================================================>